@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: arranque en frío de una corrida que sale entera del caché.
+
+Para cada sitio con grabación en benchmarks/fixtures hace un build completo
+(llena el caché) y después lanza varias corridas, cada una en un proceso
+nuevo, que no recalculan nada. De cada corrida toma el tiempo total del
+proceso (incluye levantar el intérprete), el de los imports y el del
+pipeline, y qué módulos pesados quedaron cargados (en una corrida con caché
+no debería aparecer ninguno).
+
+Uso:
+    python benchmarks/bench_arranque.py [--corridas 5] [--sitio aguas_vivas]
+"""
+import time
+
+T0 = time.perf_counter()
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Módulos que una corrida desde el caché no necesita
+PESADOS = ("cv2", "folium", "branca", "gspread", "google.auth", "pandas", "matplotlib", "pyarrow")
+META_S = 1.0  # objetivo para el total del proceso con todo en caché
+
+
+def corrida(nombre, carpeta):
+    """Se ejecuta en el proceso hijo: build desde el caché e informe en JSON por stdout."""
+    from bench_peso import cargar_sitios, construir
+    t_imports = time.perf_counter()
+
+    sitio = cargar_sitios()[nombre]
+    construir(sitio, carpeta)
+    t_fin = time.perf_counter()
+
+    return {
+        "imports_s": t_imports - T0,
+        "pipeline_s": t_fin - t_imports,
+        "pesados": [m for m in PESADOS if m in sys.modules],
+    }
+
+
+def medir(nombre, carpeta, corridas):
+    """Lanza `corridas` procesos y devuelve sus resultados con el tiempo total de cada uno."""
+    resultados = []
+    for _ in range(corridas):
+        t0 = time.perf_counter()
+        proceso = subprocess.run([sys.executable, os.path.abspath(__file__), "--corrida", nombre, carpeta],
+                                 capture_output=True, text=True, check=True)
+        total = time.perf_counter() - t0
+        resultados.append({"total_s": total, **json.loads(proceso.stdout.strip().splitlines()[-1])})
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corridas", type=int, default=5)
+    parser.add_argument("--sitio", help="solo este sitio")
+    parser.add_argument("--corrida", nargs=2, metavar=("SITIO", "CARPETA"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.corrida:
+        resultado = corrida(*args.corrida)
+        print(json.dumps(resultado))
+        return 0
+
+    from bench_peso import cargar_sitios, construir, ruta_fixture
+    sitios = {n: s for n, s in cargar_sitios().items()
+              if os.path.exists(ruta_fixture(s)) and args.sitio in (None, n)}
+    if not sitios:
+        print("⚠️ No hay grabaciones en benchmarks/fixtures (ver bench_peso.py --grabar).")
+        return 1
+
+    lento = False
+    print(f"{'Sitio':<22}{'total':>9}{'imports':>9}{'pipeline':>10}  módulos pesados")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, sitio in sitios.items():
+            carpeta = os.path.join(tmp, nombre)
+            with contextlib.redirect_stdout(io.StringIO()):
+                construir(sitio, carpeta)  # build completo: deja todo en caché
+            resultados = medir(nombre, carpeta, args.corridas)
+
+            mediana = {k: statistics.median(r[k] for r in resultados) for k in ("total_s", "imports_s", "pipeline_s")}
+            pesados = sorted({m for r in resultados for m in r["pesados"]})
+            lento |= mediana["total_s"] > META_S
+            print(f"{nombre:<22}{mediana['total_s']:>8.2f}s{mediana['imports_s']:>8.2f}s{mediana['pipeline_s']:>9.2f}s  "
+                  f"{', '.join(pesados) or '-'}")
+
+    print(f"\nMedianas de {args.corridas} corridas por sitio; objetivo: total < {META_S:.1f}s con todo en caché.")
+    return 1 if lento else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: viviendas dibujadas como SVG vs canvas (prefer_canvas) en una obra
+sintética (por defecto 2.000 casas: 20 manzanas × 100).
+
+Construye el mismo sitio con las dos opciones y reporta lo que se puede medir
+sin navegador: tiempo de build, bytes del HTML y elementos del DOM que crea la
+capa de viviendas (un <path> por casa en SVG, un solo <canvas> en canvas).
+
+Cuadros por segundo y memoria solo se miden en el navegador: cada HTML lleva
+una sonda que, al abrirlo con `#medir` al final de la URL (p. ej. en el
+teléfono de un supervisor), hace paneos y zooms durante ~15 s, re-estiliza
+todas las casas como al cambiar de vista y muestra FPS, cuadros lentos,
+memoria JS (Chrome) y nodos del DOM.
+
+Uso:
+    python benchmarks/bench_canvas.py [--manzanas 20] [--casas 100] [--salida CARPETA]
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_peso import construir
+from sintetico import generar_sitio
+
+# Sonda de medición: solo se activa con #medir en la URL
+SONDA = """
+<script>
+(function() {
+    if (location.hash.indexOf('medir') < 0) return;
+    window.addEventListener('load', function() {
+        var mapa = null;
+        for (var k in window) {
+            try { if (window[k] instanceof L.Map) { mapa = window[k]; break; } } catch (e) {}
+        }
+        if (!mapa) return;
+
+        var cuadros = [], previo = null, midiendo = true, pasos = 0, t0 = performance.now();
+        function cuadro(t) {
+            if (previo !== null) cuadros.push(t - previo);
+            previo = t;
+            if (midiendo) requestAnimationFrame(cuadro);
+        }
+        requestAnimationFrame(cuadro);
+
+        // 40 movimientos: paneos animados ida y vuelta y un zoom cada 10
+        var mover = setInterval(function() {
+            pasos++;
+            if (pasos % 10 === 0) mapa.setZoom(mapa.getZoom() + (pasos % 20 === 0 ? -1 : 1));
+            else mapa.panBy([pasos % 20 < 10 ? 120 : -120, 60 * (pasos % 2 ? 1 : -1)], {animate: true, duration: 0.25});
+            if (pasos >= 40) { clearInterval(mover); setTimeout(terminar, 1000); }
+        }, 350);
+
+        function terminar() {
+            midiendo = false;
+            var segundos = cuadros.reduce(function(a, b) { return a + b; }, 0) / 1000;
+            var ordenados = cuadros.slice().sort(function(a, b) { return a - b; });
+            var t1 = performance.now();
+            toggleVista();
+            // Cuenta hasta el cuadro siguiente: incluye el repintado de todas las casas
+            requestAnimationFrame(function() { requestAnimationFrame(function() {
+                var r = {
+                    fps: +(cuadros.length / segundos).toFixed(1),
+                    cuadros_lentos: cuadros.filter(function(c) { return c > 50; }).length,
+                    p95_ms: +ordenados[Math.floor(ordenados.length * 0.95)].toFixed(1),
+                    cambio_vista_ms: +(performance.now() - t1).toFixed(1),
+                    memoria_js_mb: performance.memory ? +(performance.memory.usedJSHeapSize / 1048576).toFixed(1) : null,
+                    nodos_dom: document.getElementsByTagName('*').length,
+                    paths_svg: document.querySelectorAll('path.leaflet-interactive').length,
+                    canvas: document.querySelectorAll('canvas.leaflet-zoom-animated').length
+                };
+                console.log('bench_canvas', JSON.stringify(r));
+                var el = document.createElement('pre');
+                el.style.cssText = 'position:fixed;top:8px;left:8px;z-index:20000;background:#fff;padding:8px;border:2px solid #e67e22;font-size:12px;';
+                el.textContent = JSON.stringify(r, null, 1);
+                document.body.appendChild(el);
+            }); });
+        }
+    });
+})();
+</script>
+"""
+
+
+def agregar_sonda(ruta_html):
+    with open(ruta_html, encoding="utf-8") as f:
+        html = f.read()
+    with open(ruta_html, "w", encoding="utf-8") as f:
+        f.write(html.replace("</body>", SONDA + "</body>", 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--manzanas", type=int, default=20)
+    parser.add_argument("--casas", type=int, default=100, help="casas por manzana")
+    parser.add_argument("--partidas", type=int, default=60)
+    parser.add_argument("--salida", default=os.path.join(tempfile.gettempdir(), "bench_canvas"),
+                        help="carpeta donde quedan los HTML para abrirlos en el navegador")
+    args = parser.parse_args(argv)
+
+    sitio, fixture = generar_sitio(args.salida, args.manzanas, args.casas, args.partidas)
+    n_casas = args.manzanas * args.casas
+
+    resultados = {}
+    for variante, canvas in (("svg", False), ("canvas", True)):
+        t0 = time.perf_counter()
+        ruta = construir(dataclasses.replace(sitio, canvas=canvas), os.path.join(args.salida, variante), fixture)
+        segundos = time.perf_counter() - t0
+        agregar_sonda(ruta)
+        resultados[variante] = {
+            "ruta": ruta,
+            "build_s": segundos,
+            "html_bytes": os.path.getsize(ruta),
+            # SVG: un <path> con sus eventos por casa; canvas: un solo <canvas> para todas
+            "elementos_capa": n_casas if not canvas else 1,
+        }
+
+    print(f"\n🧪 Obra sintética: {n_casas:,} casas ({args.manzanas} manzanas × {args.casas})")
+    print(f"{'':<18}{'SVG':>14}{'canvas':>14}")
+    for metrica in ("build_s", "html_bytes", "elementos_capa"):
+        svg, canvas = resultados["svg"][metrica], resultados["canvas"][metrica]
+        formato = "{:>14.2f}" if isinstance(svg, float) else "{:>14,}"
+        print(f"{metrica:<18}" + formato.format(svg) + formato.format(canvas))
+
+    print("\n📱 FPS y memoria se miden en el navegador: abrir cada HTML con '#medir' al final de la URL.")
+    for variante, r in resultados.items():
+        print(f"  {variante:<7} file://{os.path.abspath(r['ruta'])}#medir")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cómo escala el build con el tamaño de la obra.
+
+Para cada tamaño (por defecto 100, 1.000 y 5.000 casas) genera una obra
+sintética (benchmarks/sintetico.py), la construye desde cero con el pipeline
+y toma el tiempo real de cada etapa y de los tramos del mapa. Imprime una
+tabla etapa × tamaño con el exponente de escala de cada fila (pendiente en
+log-log: ~1 = lineal, ~2 = cuadrático).
+
+Las etapas hoja_* leen la grabación sintética: su tiempo no incluye la
+descarga desde Google Sheets.
+
+Uso:
+    python benchmarks/bench_escala.py [--casas 100 1000 5000] [--partidas 200] [--json escala.json]
+"""
+import argparse
+import dataclasses
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_peso import etapas_desde_fixture
+from obras.etapas import Pipeline
+from obras.pipeline import Contexto
+from sintetico import generar_sitio
+
+CASAS_POR_MANZANA = 50
+
+
+def medir(carpeta, n_casas, n_partidas):
+    """Build en frío de una obra de `n_casas`. Devuelve fila -> segundos (etapas, tramos y total)."""
+    casas_por_manzana = min(CASAS_POR_MANZANA, n_casas)
+    n_manzanas = math.ceil(n_casas / casas_por_manzana)
+    sitio, fixture = generar_sitio(carpeta, n_manzanas, casas_por_manzana, n_partidas)
+    sitio = dataclasses.replace(sitio, salida=os.path.join(carpeta, "salida", os.path.basename(sitio.salida)))
+    os.makedirs(os.path.dirname(sitio.salida), exist_ok=True)
+
+    t0 = time.perf_counter()
+    informe = Pipeline(etapas_desde_fixture(sitio, fixture), os.path.join(carpeta, "cache")).ejecutar(Contexto(sitio))
+    total = time.perf_counter() - t0
+
+    tiempos = {}
+    for nombre, fila in informe.items():
+        tiempos[nombre] = fila["segundos"]
+        for t in fila["tramos"]:
+            tiempos[f"{nombre} · {t['nombre']}"] = t["segundos"]
+    tiempos["TOTAL"] = total
+    return n_manzanas * casas_por_manzana, tiempos
+
+
+def exponente(tamanos, segundos):
+    """Pendiente de mínimos cuadrados de log(segundos) vs log(tamaño)."""
+    puntos = [(math.log(n), math.log(s)) for n, s in zip(tamanos, segundos) if s > 0]
+    if len(puntos) < 2: return None
+    mx = sum(x for x, _ in puntos) / len(puntos)
+    my = sum(y for _, y in puntos) / len(puntos)
+    var = sum((x - mx) ** 2 for x, _ in puntos)
+    return sum((x - mx) * (y - my) for x, y in puntos) / var if var else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--casas", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--partidas", type=int, default=200)
+    parser.add_argument("--json", metavar="RUTA", help="guarda los tiempos medidos en JSON")
+    args = parser.parse_args(argv)
+
+    tamanos, resultados = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.casas:
+            print(f"🔨 {n:,} casas, {args.partidas} partidas...")
+            casas, tiempos = medir(os.path.join(tmp, str(n)), n, args.partidas)
+            tamanos.append(casas)
+            resultados.append(tiempos)
+
+    filas = list(resultados[-1])
+    ancho = max(len(f) for f in filas) + 2
+    print(f"\n{'Etapa':<{ancho}}" + "".join(f"{f'{n:,} casas':>14}" for n in tamanos) + f"{'exponente':>11}")
+    for fila in filas:
+        segundos = [r.get(fila, 0.0) for r in resultados]
+        k = exponente(tamanos, segundos)
+        print(f"{fila:<{ancho}}" + "".join(f"{s:>13.2f}s" for s in segundos) + (f"{k:>11.2f}" if k is not None else f"{'-':>11}"))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"casas": tamanos, "partidas": args.partidas, "segundos": resultados}, f, indent=1, ensure_ascii=False)
+        print(f"\n💾 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
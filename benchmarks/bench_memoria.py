@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: pico de memoria (RSS) de un build en frío según el tamaño de la obra.
+
+Para cada tamaño genera una obra sintética (benchmarks/sintetico.py) y la
+construye desde cero en un proceso nuevo, así el pico de RSS del proceso es
+el de ese build y nada más. Imprime el pico total y, por etapa, el pico
+alcanzado hasta que terminó (muestra qué etapa lo sube).
+
+Uso:
+    python benchmarks/bench_memoria.py [--casas 1000 5000] [--partidas 200]
+"""
+import argparse
+import contextlib
+import dataclasses
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+CASAS_POR_MANZANA = 50
+
+
+def obra(carpeta, n_casas, n_partidas, escribir):
+    from sintetico import generar_sitio
+    casas_por_manzana = min(CASAS_POR_MANZANA, n_casas)
+    return generar_sitio(os.path.join(carpeta, "entrada"), math.ceil(n_casas / casas_por_manzana),
+                         casas_por_manzana, n_partidas, escribir=escribir)
+
+
+def corrida(carpeta, n_casas, n_partidas):
+    """Se ejecuta en el proceso hijo: build en frío e informe en JSON por stdout."""
+    from bench_peso import etapas_desde_fixture
+    from obras.etapas import Pipeline, pico_rss
+    from obras.pipeline import Contexto
+
+    # La obra ya está en disco (la generó el proceso padre): su generación no cuenta en el pico
+    sitio, fixture = obra(carpeta, n_casas, n_partidas, escribir=False)
+    sitio = dataclasses.replace(sitio, salida=os.path.join(carpeta, "salida", os.path.basename(sitio.salida)))
+    os.makedirs(os.path.dirname(sitio.salida), exist_ok=True)
+    antes = pico_rss()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        informe = Pipeline(etapas_desde_fixture(sitio, fixture), os.path.join(carpeta, "cache")).ejecutar(Contexto(sitio))
+    return {"antes": antes, "pico": pico_rss(), "etapas": {n: f.get("pico_rss") for n, f in informe.items()}}
+
+
+def mib(valor):
+    return "-" if valor is None else f"{valor / 2**20:,.0f} MiB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--casas", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--partidas", type=int, default=200)
+    parser.add_argument("--corrida", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.corrida:
+        carpeta, n_casas, n_partidas = args.corrida
+        print(json.dumps(corrida(carpeta, int(n_casas), int(n_partidas))))
+        return 0
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.casas:
+            print(f"🔨 {n:,} casas, {args.partidas} partidas...")
+            obra(os.path.join(tmp, str(n)), n, args.partidas, escribir=True)
+            proceso = subprocess.run([sys.executable, os.path.abspath(__file__), "--corrida",
+                                      os.path.join(tmp, str(n)), str(n), str(args.partidas)],
+                                     capture_output=True, text=True, check=True)
+            resultados[n] = json.loads(proceso.stdout.strip().splitlines()[-1])
+
+    etapas = list(resultados[args.casas[-1]]["etapas"])
+    ancho = max(len(e) for e in etapas) + 2
+    print(f"\n{'Pico de RSS':<{ancho}}" + "".join(f"{f'{n:,} casas':>14}" for n in args.casas))
+    print(f"{'(antes del build)':<{ancho}}" + "".join(f"{mib(resultados[n]['antes']):>14}" for n in args.casas))
+    for etapa in etapas:
+        print(f"{etapa:<{ancho}}" + "".join(f"{mib(resultados[n]['etapas'].get(etapa)):>14}" for n in args.casas))
+    print(f"{'TOTAL':<{ancho}}" + "".join(f"{mib(resultados[n]['pico']):>14}" for n in args.casas))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: dict_detalles_casas (lista de dicts por casa) vs modelo compacto.
+
+Construye una obra sintética (por defecto 1000 casas en 20 manzanas, ~200
+partidas) como grillas de get_all_values() y mide, para cada estructura,
+el tiempo de construcción y la memoria retenida (tracemalloc).
+
+Uso:
+    python benchmarks/bench_modelo.py [--casas 1000] [--partidas 200] [--repeticiones 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obras.llaves import RegistroLlaves, canon_manzana
+from obras.modelo import CatalogoPartidas, TuplasCompartidas, leer_hoja_avance
+
+
+def generar_hojas(n_casas, n_partidas, casas_por_manzana=50, semilla=1):
+    """Grillas sintéticas con el formato de las hojas 'MANZ.' del CR y filas del maestro."""
+    rnd = random.Random(semilla)
+    partidas = []
+    n_titulos = max(1, n_partidas // 50)
+    for t in range(n_titulos):
+        partidas.append((chr(65 + t % 26) + str(t // 26 or ""), f"TITULO {t}", False))
+        for s in range(5):
+            partidas.append((f"{t}.{s}", f"Subtitulo {t}.{s}", False))
+            for p in range(n_partidas // (n_titulos * 5)):
+                partidas.append((f"{t}.{s}.{p}", f"Partida {t}.{s}.{p} de la vivienda", True))
+    maestro = [[c, d] for c, d, real in partidas if real]
+
+    hojas = []
+    restantes = n_casas
+    mz = 0
+    while restantes > 0:
+        n = min(casas_por_manzana, restantes)
+        filas = [["VIVIENDA LOTE"] + [""] * (n + 1)]
+        filas.append(["ITEM", "DESCRIPCION"] + [str(i) for i in range(1, n + 1)])
+        for codigo, desc, real in partidas:
+            fila = [codigo, desc]
+            fila += ["x" if real and rnd.random() < 0.6 else "" for _ in range(n)]
+            filas.append(fila)
+        hojas.append((f"MANZ. M{mz}", filas))
+        restantes -= n
+        mz += 1
+    return maestro, hojas
+
+
+def construir_dicts(maestro, hojas):
+    """Referencia: construcción de dict_detalles_casas tal como era antes del modelo compacto."""
+    lista_maestra_llaves = {f"{str(f[0]).strip().upper()}-{str(f[1]).strip().upper()}" for f in maestro}
+    dict_detalles_casas = {}
+    for sheet_name, datos in hojas:
+        letra_mz = sheet_name.replace("MANZ.", "").replace("MANZ", "").strip().upper()
+        fila_item_idx = next((i for i, f in enumerate(datos[:50]) if f and str(f[0]).strip().upper() == "ITEM"), None)
+        columnas_casas = []
+        for i_s in range(max(0, fila_item_idx - 2), min(len(datos), fila_item_idx + 3)):
+            for c_idx, val in enumerate(datos[i_s]):
+                if c_idx > 1 and str(val).strip().isdigit():
+                    num_casa = int(str(val).strip())
+                    if not any(x[1] == num_casa for x in columnas_casas):
+                        columnas_casas.append((c_idx, num_casa))
+        titulo_act = sub_act = ""
+        for i in range(fila_item_idx + 1, len(datos)):
+            fila = datos[i]
+            if not fila or not str(fila[0]).strip(): continue
+            item_val = str(fila[0]).strip()
+            desc_val = str(fila[1]).strip()
+            if f"{item_val.upper()}-{desc_val.upper()}" not in lista_maestra_llaves:
+                if "." not in item_val:
+                    titulo_act, sub_act = desc_val, ""
+                else:
+                    sub_act = desc_val
+                continue
+            for col_idx, num_casa in columnas_casas:
+                v_celda = fila[col_idx] if col_idx < len(fila) else ""
+                terminado = (v_celda is not None and str(v_celda).strip() != "")
+                key = (letra_mz, num_casa)
+                if key not in dict_detalles_casas: dict_detalles_casas[key] = []
+                dict_detalles_casas[key].append({
+                    'titulo': titulo_act,
+                    'subtitulo': sub_act,
+                    'partida': f"[{item_val}] {desc_val}",
+                    'estado': "✅" if terminado else "❌",
+                    'tiene_obs': False,
+                    'comentario': ""
+                })
+    return dict_detalles_casas
+
+
+def construir_modelo(maestro, hojas):
+    llaves = RegistroLlaves()
+    lista_maestra_llaves = {llaves.partida(f[0], f[1]) for f in maestro}
+    catalogo = CatalogoPartidas()
+    tuplas = TuplasCompartidas()
+    detalles = {}
+    for sheet_name, datos in hojas:
+        leer_hoja_avance(datos, canon_manzana(sheet_name), llaves, lista_maestra_llaves,
+                         catalogo, tuplas, detalles)
+    return llaves, catalogo, detalles
+
+
+def medir(funcion, args, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    resultado = funcion(*args)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return min(tiempos), memoria
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--casas", type=int, default=1000)
+    parser.add_argument("--partidas", type=int, default=200)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    maestro, hojas = generar_hojas(args.casas, args.partidas)
+    print(f"Obra sintética: {args.casas} casas, {len(maestro)} partidas, {len(hojas)} hojas")
+
+    t_dict, m_dict = medir(construir_dicts, (maestro, hojas), args.repeticiones)
+    t_mod, m_mod = medir(construir_modelo, (maestro, hojas), args.repeticiones)
+
+    print(f"{'Estructura':<24}{'Tiempo (s)':>12}{'Memoria (MB)':>15}")
+    print(f"{'dict_detalles_casas':<24}{t_dict:>12.3f}{m_dict / 1e6:>15.2f}")
+    print(f"{'DetalleCasa + catálogo':<24}{t_mod:>12.3f}{m_mod / 1e6:>15.2f}")
+    print(f"Mejora: {t_dict / t_mod:.1f}x tiempo, {m_dict / max(m_mod, 1):.1f}x memoria")
+
+
+if __name__ == "__main__":
+    main()
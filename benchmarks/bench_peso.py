@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: peso de los planos generados, con presupuestos por métrica.
+
+Construye cada sitio (plano_*.py) con el pipeline a partir de planillas
+grabadas (benchmarks/fixtures/<sitio>.json.gz) en una carpeta temporal y
+mide: bytes del HTML, bytes con gzip, capas Leaflet, bytes de popups, bytes
+del plano, bytes del índice del buscador e imágenes incrustadas en el HTML. Si alguna métrica supera su
+presupuesto (benchmarks/presupuestos.json, o --presupuesto metrica=valor)
+termina con código 1.
+
+Uso:
+    python benchmarks/bench_peso.py [--sitio campos_del_sur_ii] [--presupuesto html_bytes=400000]
+    python benchmarks/bench_peso.py --grabar      # graba las planillas actuales (requiere credenciales)
+    python benchmarks/bench_peso.py --salidas .   # mide los HTML ya generados, sin construir
+
+Las grabaciones contienen datos reales de la obra (cuadrillas, precios) y no
+se versionan (.gitignore).
+"""
+import argparse
+import dataclasses
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from obras import sitios
+from obras.etapas import Archivo, Etapa, Pipeline
+from obras.pipeline import Contexto, definir_etapas
+
+CARPETA_FIXTURES = os.path.join(RAIZ, "benchmarks", "fixtures")
+PRESUPUESTOS = os.path.join(RAIZ, "benchmarks", "presupuestos.json")
+
+# Etapas que leen Google Sheets: son las que se graban y se reemplazan por la grabación
+ETAPAS_PLANILLAS = ("hoja_cr", "hoja_partidas", "hoja_pre_f1", "hoja_tratos", "hoja_asignacion")
+
+METRICAS = ("html_bytes", "html_gzip", "capas", "popups_bytes", "plano_bytes", "buscador_bytes", "imagen_inline_bytes")
+
+CAPAS_LEAFLET = re.compile(r"\bL\.(?:geoJson|imageOverlay|tileLayer|marker|circleMarker|circle|polygon|polyline|rectangle|featureGroup|layerGroup)\(")
+IMAGEN_INLINE = re.compile(r"data:image/[\w.+-]+;base64,[A-Za-z0-9+/=]+")
+
+
+def cargar_sitios():
+    """SITIO de cada script plano_*.py de la raíz: nombre -> Sitio (rutas absolutas)."""
+    return {nombre: dataclasses.replace(sitio, imagen=os.path.join(RAIZ, sitio.imagen))
+            for nombre, sitio in sitios.cargar_sitios(RAIZ).items()}
+
+
+def ruta_fixture(sitio):
+    return os.path.join(CARPETA_FIXTURES, f"{sitio.nombre}.json.gz")
+
+
+def grabar(sitio):
+    """Descarga las planillas del sitio (como las etapas hoja_*) y las guarda como fixture."""
+    contexto = Contexto(sitio)
+    etapas = {e.nombre: e for e in definir_etapas(sitio)}
+    grabacion = {nombre: etapas[nombre].funcion(contexto) for nombre in ETAPAS_PLANILLAS}
+    os.makedirs(CARPETA_FIXTURES, exist_ok=True)
+    with gzip.open(ruta_fixture(sitio), "wt", encoding="utf-8") as f:
+        json.dump(grabacion, f, ensure_ascii=False)
+    print(f"💾 Grabado {ruta_fixture(sitio)}")
+
+
+def leer_grabacion(fixture):
+    with gzip.open(fixture, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def etapas_desde_fixture(sitio, fixture):
+    """
+    Etapas del sitio con las hoja_* reemplazadas por la grabación `fixture`,
+    que se lee al calcular la etapa (si la grabación cambia, la etapa ve el cambio).
+    """
+    return [
+        Etapa(e.nombre, lambda ctx, n=e.nombre: leer_grabacion(fixture)[n], entradas=[Archivo(fixture)])
+        if e.nombre in ETAPAS_PLANILLAS else e
+        for e in definir_etapas(sitio)
+    ]
+
+
+def construir(sitio, carpeta, fixture=None):
+    """Construye el sitio en `carpeta` desde su fixture (o `fixture`). Devuelve la ruta del HTML."""
+    sitio = dataclasses.replace(sitio, salida=os.path.join(carpeta, os.path.basename(sitio.salida)))
+    etapas = etapas_desde_fixture(sitio, fixture or ruta_fixture(sitio))
+    Pipeline(etapas, os.path.join(carpeta, "cache")).ejecutar(Contexto(sitio))
+    return sitio.salida
+
+
+def medir(ruta_html):
+    """Métricas de peso de un HTML generado y de su carpeta de datos."""
+    from obras.mapa import carpeta_datos
+    with open(ruta_html, "rb") as f:
+        html = f.read()
+    texto = html.decode("utf-8")
+
+    # Cada feature de un L.geoJson es una capa más en Leaflet
+    capas = len(CAPAS_LEAFLET.findall(texto))
+    decodificador = json.JSONDecoder()
+    for m in re.finditer(r"\bL\.geoJson\(", texto):
+        try:
+            datos, _ = decodificador.raw_decode(texto, m.end())
+            capas += len(datos.get("features", []))
+        except ValueError:
+            pass
+
+    datos = carpeta_datos(ruta_html)
+    popups = glob.glob(os.path.join(datos, "popups_*.json"))
+    planos = glob.glob(os.path.join(datos, "plano.*"))
+    buscador = glob.glob(os.path.join(datos, "buscador.*.json"))
+
+    return {
+        "html_bytes": len(html),
+        "html_gzip": len(gzip.compress(html, mtime=0)),
+        "capas": capas,
+        "popups_bytes": sum(os.path.getsize(r) for r in popups),
+        "plano_bytes": sum(os.path.getsize(r) for r in planos),
+        "buscador_bytes": sum(os.path.getsize(r) for r in buscador),
+        "imagen_inline_bytes": sum(len(m) for m in IMAGEN_INLINE.findall(texto)),
+    }
+
+
+def leer_presupuestos(ruta, extra):
+    presupuestos = {}
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            presupuestos = json.load(f)
+    for par in extra:
+        metrica, _, valor = par.partition("=")
+        if metrica not in METRICAS:
+            raise SystemExit(f"Métrica desconocida '{metrica}'. Opciones: {', '.join(METRICAS)}")
+        presupuestos[metrica] = int(valor)
+    return presupuestos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sitio", action="append", help="sitio a medir (por defecto todos)")
+    parser.add_argument("--grabar", action="store_true", help="graba las planillas actuales como fixtures")
+    parser.add_argument("--salidas", metavar="CARPETA", help="mide los HTML ya generados en CARPETA en vez de construir")
+    parser.add_argument("--presupuestos", default=PRESUPUESTOS, help="JSON con metrica -> máximo")
+    parser.add_argument("--presupuesto", action="append", default=[], metavar="METRICA=VALOR",
+                        help="sobrescribe un presupuesto")
+    args = parser.parse_args(argv)
+
+    sitios = cargar_sitios()
+    elegidos = args.sitio or list(sitios)
+    for nombre in elegidos:
+        if nombre not in sitios:
+            raise SystemExit(f"Sitio desconocido '{nombre}'. Opciones: {', '.join(sitios)}")
+
+    if args.grabar:
+        for nombre in elegidos:
+            grabar(sitios[nombre])
+        return 0
+
+    presupuestos = leer_presupuestos(args.presupuestos, args.presupuesto)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre in elegidos:
+            sitio = sitios[nombre]
+            if args.salidas:
+                ruta = os.path.join(args.salidas, os.path.basename(sitio.salida))
+            elif os.path.exists(ruta_fixture(sitio)):
+                ruta = construir(sitio, os.path.join(tmp, nombre))
+            else:
+                print(f"⚠️ {nombre}: no hay fixture en {ruta_fixture(sitio)} (grábalo con --grabar)")
+                continue
+            resultados[nombre] = medir(ruta)
+
+    if not resultados:
+        return 1
+
+    excedidos = []
+    print(f"\n{'Métrica':<22}" + "".join(f"{n:>20}" for n in resultados) + f"{'Presupuesto':>14}")
+    for metrica in METRICAS:
+        tope = presupuestos.get(metrica)
+        fila = f"{metrica:<22}"
+        for nombre, valores in resultados.items():
+            excede = tope is not None and valores[metrica] > tope
+            fila += f"{valores[metrica]:>18,}{' ❌' if excede else '  '}"
+            if excede:
+                excedidos.append(f"{nombre}: {metrica} = {valores[metrica]:,} > {tope:,}")
+        print(fila + (f"{tope:>14,}" if tope is not None else f"{'-':>14}"))
+
+    if excedidos:
+        print("\n❌ Presupuesto excedido:\n  " + "\n  ".join(excedidos))
+        return 1
+    print("\n✅ Todo dentro del presupuesto.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
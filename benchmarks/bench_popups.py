@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: popups armados con f-strings y estilos en línea vs plantillas Jinja2 con clases.
+
+Usa la obra sintética de bench_modelo (por defecto 1000 casas, ~200
+partidas) más una hoja de tratos sintética, y mide para cada generador las
+casas por segundo y los bytes promedio por popup (crudo y gzip). Las
+plantillas agregan una sola vez la hoja de estilos a la página.
+
+Uso:
+    python benchmarks/bench_popups.py [--casas 1000] [--partidas 200] [--tratos 60] [--repeticiones 3]
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_modelo import generar_hojas, construir_modelo
+from obras.plata import PreciosTratos, sumar, formatear_plata
+from obras.popups import ESTILOS_POPUPS, SCRIPT_POPUPS, generar_html_popup, generar_html_popup_tratos, partida_aplica
+from obras.tratos import SIN_ESTADO_TRATO
+
+
+def generar_tratos(llaves, casas, n_tratos, semilla=2):
+    """Salida sintética de la etapa de tratos: precios, estructura, estado y cuadrillas por casa."""
+    rnd = random.Random(semilla)
+    precios = PreciosTratos()
+    estructura = []
+    for i in range(n_tratos):
+        id_trato = llaves.trato(f"TRATO {i} DE LA VIVIENDA")
+        precios.agregar(id_trato, {t: rnd.randrange(10, 500) * 1000 for t in precios.tipos})
+        estructura.append({"titulo": ("OBRA GRUESA", "OBRAS DE TERMINACIÓN", "INSTALACIONES")[i * 3 // n_tratos],
+                           "subtitulo": f"GRUPO {i // 6}", "id_trato": id_trato})
+    estado, cuadrillas = {}, {}
+    for id_casa in casas:
+        estado[id_casa], cuadrillas[id_casa] = {}, {}
+        for item in estructura:
+            hecho = rnd.random() < 0.5
+            estado[id_casa][item["id_trato"]] = {"terminada": hecho, "fecha": "01/02/2026" if hecho else "-"}
+            cuadrillas[id_casa][item["id_trato"]] = f"CUADRILLA {rnd.randrange(8)}" if hecho else "-"
+    return {"precios": precios, "estructura": estructura, "filas": precios.filas(e["id_trato"] for e in estructura),
+            "estado": estado, "cuadrillas": cuadrillas}
+
+
+# ========================================================
+# REFERENCIA (f-strings con estilos en línea)
+# ========================================================
+
+def popup_fisico_fstring(llaves, catalogo_partidas, id_casa, detalle, tipo_vivienda, avance):
+    """Referencia: popup de avance físico tal como se generaba antes de las plantillas."""
+    manzana, casa_num = llaves.etiqueta_casa(id_casa)
+    detalles = [
+        (p, terminada, tiene_obs, comentario)
+        for p, terminada, tiene_obs, comentario in detalle.items(catalogo_partidas)
+        if partida_aplica(p.nombre, tipo_vivienda, manzana, casa_num)
+    ]
+
+    resumen = {}
+    for p, terminada, tiene_obs, _ in detalles:
+        t, s = p.titulo, p.subtitulo
+        if t not in resumen: resumen[t] = {'total': 0, 'listo': 0, 'subs': {}, 'obs': False}
+        resumen[t]['total'] += 1
+        if terminada: resumen[t]['listo'] += 1
+        if tiene_obs: resumen[t]['obs'] = True
+        if s:
+            if s not in resumen[t]['subs']: resumen[t]['subs'][s] = {'total': 0, 'listo': 0, 'obs': False}
+            resumen[t]['subs'][s]['total'] += 1
+            if terminada: resumen[t]['subs'][s]['listo'] += 1
+            if tiene_obs: resumen[t]['subs'][s]['obs'] = True
+
+    html = f"""
+    <div style="font-family: 'Segoe UI', Arial; width: 520px; background: white; margin: -15px -10px -10px -10px;">
+        <div style="background: #2c3e50; color: white; padding: 15px 10px; display: flex; justify-content: space-between; align-items: center;">
+            <h4 style="margin: 0; font-size: 16px;">MZ {manzana} - Casa {casa_num} - {tipo_vivienda}</h4>
+            <div style="width: 160px;">
+                <div style="font-size: 12px; font-weight: bold; text-align: right;">{avance}%</div>
+                <div style="background: #dcdde1; border-radius: 6px; height: 8px; overflow: hidden;">
+                    <div style="width: {avance}%; height: 100%; background: linear-gradient(90deg, #2980b9, #27ae60);"></div>
+                </div>
+            </div>
+        </div>
+        <div style="display: flex; height: 380px;">
+            <div style="flex: 1.8; overflow-y: auto; padding: 10px; border-right: 1px solid #eee;" id="lista_partidas">
+                <table style="width: 100%; border-collapse: collapse; table-layout: fixed;">
+                    <colgroup><col style="width: 85%;"><col style="width: 15%;"></colgroup>
+    """
+    current_tit, current_sub = None, None
+    for p, terminada, tiene_obs, comentario in detalles:
+        if p.titulo != current_tit:
+            current_tit = p.titulo
+            anchor_tit = f"tit_{abs(hash(current_tit))}"
+            html += f'<tr id="{anchor_tit}" style="background: #edeff0;"><td colspan="2" style="padding: 10px 5px; font-weight: bold; color: #2c3e50; border-top: 2px solid #2c3e50;">{current_tit.upper()}</td></tr>'
+        if p.subtitulo != current_sub:
+            current_sub = p.subtitulo
+            if current_sub:
+                anchor_sub = f"sub_{abs(hash(current_sub))}"
+                html += f'<tr id="{anchor_sub}" style="background: #f9f9f9;"><td colspan="2" style="padding: 6px 8px; font-weight: bold; color: #7f8c8d; font-style: italic; border-bottom: 1px solid #eee;"> ↳ {current_sub}</td></tr>'
+
+        if tiene_obs:
+            color_st = "#d4a017"
+            icono_mostrado = "⚠️"
+            nombre_partida = f"""<div style="padding: 2px 0;"><b style="color: #d4a017;">{p.nombre}</b><details style="margin-top: 4px;"><summary style="cursor: pointer; color: #856404; font-size: 10px; font-weight: bold;">Ver nota [+]</summary><div style="margin-top: 4px; padding: 8px; background: #fff9e6; border-left: 3px solid #d4a017; color: #856404; font-size: 10px; line-height: 1.4;">{comentario}</div></details></div>"""
+        else:
+            color_st = "#27ae60" if terminada else "#e74c3c"
+            icono_mostrado = "✅" if terminada else "❌"
+            nombre_partida = f"<span style='color: #444; font-size: 11px;'>{p.nombre}</span>"
+        html += f"""<tr style="border-bottom: 1px solid #f2f2f2;"><td style="padding: 8px 10px; vertical-align: top;">{nombre_partida}</td><td style="padding: 8px 5px; text-align: center; color: {color_st}; font-weight: bold; font-size: 14px;">{icono_mostrado}</td></tr>"""
+
+    html += """</table></div><div style="flex: 1.2; background: #f4f7f8; padding: 10px; overflow-y: auto; border-left: 1px solid #ddd;"><div style="font-size: 11px; font-weight: bold; color: #95a5a6; margin-bottom: 10px; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px;">ÍNDICE DE CONTROL</div>"""
+    for tit, datos in resumen.items():
+        anchor_tit = f"tit_{abs(hash(tit))}"
+        bg_tit = "#fff3cd" if datos['obs'] else "#fff"
+        html += f"""<div onclick="document.getElementById('{anchor_tit}').scrollIntoView({{behavior:'smooth'}})" style="cursor: pointer; padding: 6px; background: {bg_tit}; border: 1px solid #dcdde1; border-radius: 4px; margin-bottom: 4px;"><div style="font-weight: bold; color: #2c3e50; font-size: 10px;">{tit}</div><div style="font-size: 9px; color: {'#856404' if datos['obs'] else '#27ae60'};">{datos['listo']}/{datos['total']} completados</div></div>"""
+        for subtit, sdatos in datos['subs'].items():
+            anchor_sub = f"sub_{abs(hash(subtit))}"
+            estilo_s = "color:#856404;font-weight:bold;" if sdatos['obs'] else "color:#636e72;"
+            html += f"""<div onclick="document.getElementById('{anchor_sub}').scrollIntoView({{behavior:'smooth'}})" style="cursor:pointer; padding:4px 6px 4px 15px; margin-bottom:3px; border-left:2px solid {'#f1c40f' if sdatos['obs'] else '#bdc3c7'}; font-size:9px; {estilo_s}">{subtit} {'(!)' if sdatos['obs'] else ''}</div>"""
+    html += "</div></div></div>"
+    return html
+
+
+def popup_tratos_fstring(llaves, tratos, id_casa, tipo_vivienda):
+    """Referencia: popup de tratos tal como se generaba antes de las plantillas."""
+    manzana, casa_num = llaves.etiqueta_casa(id_casa)
+    precios_tratos = tratos["precios"]
+    estructura_tratos = tratos["estructura"]
+    estado_casa = tratos["estado"].get(id_casa, {})
+    cuadrillas_casa = tratos["cuadrillas"].get(id_casa, {})
+    resumen = {}
+    detalles_html = ""
+    current_tit, current_sub = None, None
+
+    # Totales de la casa en pesos enteros (int64)
+    precios = precios_tratos.vector(tratos["filas"], tipo_vivienda)
+    estados = [estado_casa.get(item['id_trato'], SIN_ESTADO_TRATO) for item in estructura_tratos]
+    terminadas = np.fromiter((e["terminada"] for e in estados), dtype=bool, count=len(estados))
+    plata_total = sumar(precios)
+    plata_ganada = sumar(precios[terminadas])
+
+    for item, precio_partida, estado in zip(estructura_tratos, precios.tolist(), estados):
+        tit = item['titulo']
+        sub = item['subtitulo']
+        id_trato = item['id_trato']
+        partida = llaves.nombre_trato(id_trato)
+        cuadrilla = cuadrillas_casa.get(id_trato, "-")
+
+        if tit not in resumen:
+            resumen[tit] = {'total': 0, 'ganado': 0, 'subs': {}}
+
+        resumen[tit]['total'] += precio_partida
+        if estado["terminada"]:
+            resumen[tit]['ganado'] += precio_partida
+
+        if sub:
+            if sub not in resumen[tit]['subs']:
+                resumen[tit]['subs'][sub] = {'total': 0, 'ganado': 0}
+            resumen[tit]['subs'][sub]['total'] += precio_partida
+            if estado["terminada"]:
+                resumen[tit]['subs'][sub]['ganado'] += precio_partida
+
+        if tit != current_tit:
+            current_tit = tit
+            anchor_tit = f"tratos_tit_{abs(hash(current_tit))}"
+            detalles_html += f'<tr id="{anchor_tit}" style="background: #edeff0;"><td colspan="4" style="padding: 10px 5px; font-weight: bold; color: #2c3e50; border-top: 2px solid #2c3e50;">{current_tit.upper()}</td></tr>'
+
+        if sub != current_sub:
+            current_sub = sub
+            if current_sub:
+                anchor_sub = f"tratos_sub_{abs(hash(current_sub))}"
+                detalles_html += f'<tr id="{anchor_sub}" style="background: #fdfdfd;"><td colspan="4" style="padding: 6px 8px; font-weight: bold; color: #7f8c8d; font-style: italic; border-bottom: 1px solid #eee;"> ↳ {current_sub}</td></tr>'
+
+        color_st = "#27ae60" if estado["terminada"] else "#e74c3c"
+        icono_mostrado = "✅" if estado["terminada"] else "❌"
+
+        detalles_html += f"""
+        <tr class="fila-trato" data-cuadrilla="{cuadrilla}" style="border-bottom: 1px solid #f2f2f2;">
+            <td style="padding: 8px 5px; vertical-align: middle;"><span style='color: #444; font-size: 10px;'>{partida}</span></td>
+            <td style="padding: 8px 5px; text-align: center; font-size: 10px; color: #555;"><b>{formatear_plata(precio_partida)}</b></td>
+            <td style="padding: 8px 5px; text-align: center; font-size: 9px; color: #777;">{cuadrilla}<br><span style="color:#aaa">{estado['fecha']}</span></td>
+            <td style="padding: 8px 5px; text-align: center; color: {color_st}; font-weight: bold; font-size: 12px;">{icono_mostrado}</td>
+        </tr>"""
+
+    # --- CAMBIO AQUÍ: Encabezado con Presupuestado al lado de la Info ---
+    html_final = f"""
+    <div style="font-family: 'Segoe UI', Arial; width: 720px; background: white; margin: -15px -10px -10px -10px; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 15px rgba(0,0,0,0.2);">
+        <div style="background: #1abc9c; color: white; padding: 15px; display: flex; justify-content: space-between; align-items: center;">
+            <div style="display: flex; align-items: center; gap: 25px;">
+                <h4 style="margin: 0; font-size: 16px; line-height: 1.2;">MZ {manzana} - Casa {casa_num}<br><span style="font-size: 12px; font-weight: normal; opacity: 0.9;">{tipo_vivienda}</span></h4>
+                <div style="border-left: 1px solid rgba(255,255,255,0.4); padding-left: 20px;">
+                    <div style="font-size: 11px; opacity: 0.9; text-transform: uppercase;">Presupuesto Vivienda</div>
+                    <div style="font-size: 17px; font-weight: bold;">{formatear_plata(plata_total)}</div>
+                </div>
+            </div>
+            <div style="text-align: right;">
+                <div style="font-size: 11px; opacity: 0.9; text-transform: uppercase;">Pago Actual</div>
+                <div style="font-size: 22px; font-weight: bold;">{formatear_plata(plata_ganada)}</div>
+            </div>
+        </div>
+
+        <div style="display: flex; height: 450px;">
+            <div style="flex: 2; overflow-y: auto; padding: 10px; border-right: 1px solid #ddd;">
+                <table style="width: 100%; border-collapse: collapse; table-layout: fixed;">
+                    <colgroup><col style="width: 45%;"><col style="width: 20%;"><col style="width: 25%;"><col style="width: 10%;"></colgroup>
+                    <thead><tr style="background:#f4f7f8; font-size:10px; color:#555; border-bottom: 2px solid #ddd;"><th style="padding:8px; text-align:left;">Partida</th><th style="padding:8px;">Precio</th><th style="padding:8px;">Cuadrilla</th><th style="padding:8px;">Est.</th></tr></thead>
+                    <tbody>{detalles_html}</tbody>
+                </table>
+            </div>
+
+            <div style="flex: 1.1; background: #f8f9fa; padding: 10px; overflow-y: auto;">
+                <div style="font-size: 11px; font-weight: bold; color: #7f8c8d; margin-bottom: 12px; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px;">RESUMEN Y SUBTOTALES</div>
+    """
+    # ... (El resto del código se mantiene igual)
+    for tit, datos in resumen.items():
+        if datos['total'] == 0: continue
+        anchor_tit = f"tratos_tit_{abs(hash(tit))}"
+        pct_tit = (datos['ganado'] / datos['total']) * 100
+
+        html_final += f"""
+        <div class="btn-indice" onclick="document.getElementById('{anchor_tit}').scrollIntoView({{behavior:'smooth'}})"
+             style="cursor: pointer; padding: 8px; background: #2c3e50; border-radius: 4px; margin-bottom: 5px; color: white;">
+            <div style="font-weight: bold; font-size: 10px; text-transform: uppercase;">{tit}</div>
+            <div style="font-size: 10px; color: #1abc9c; font-weight: bold;">{formatear_plata(datos['ganado'])}</div>
+            <div style="width: 100%; background: rgba(255,255,255,0.2); height: 4px; border-radius: 2px; margin-top: 4px;">
+                <div style="width: {pct_tit}%; background: #1abc9c; height: 100%; border-radius: 2px;"></div>
+            </div>
+        </div>"""
+
+        for sub, dsub in datos['subs'].items():
+            if dsub['total'] == 0: continue
+            anchor_sub = f"tratos_sub_{abs(hash(sub))}"
+            pct_sub = (dsub['ganado'] / dsub['total']) * 100
+
+            html_final += f"""
+            <div class="btn-indice" onclick="document.getElementById('{anchor_sub}').scrollIntoView({{behavior:'smooth'}})"
+                  style="cursor: pointer; padding: 6px 6px 6px 12px; background: white; border: 1px solid #dcdde1; border-radius: 4px; margin-bottom: 4px; margin-left: 10px;">
+                <div style="font-weight: bold; color: #34495e; font-size: 9px;">↳ {sub}</div>
+                <div style="font-size: 9px; color: #27ae60;">{formatear_plata(dsub['ganado'])} / {int(pct_sub)}%</div>
+                <div style="width: 100%; background: #eee; height: 3px; border-radius: 2px; margin-top: 3px;">
+                    <div style="width: {pct_sub}%; background: #27ae60; height: 100%; border-radius: 2px;"></div>
+                </div>
+            </div>"""
+
+    html_final += "</div></div></div>"
+    return html_final, plata_ganada, plata_total
+
+
+# ========================================================
+# MEDICIÓN
+# ========================================================
+
+def generar_todos(fisico, tratos_html, llaves, catalogo, detalles, tratos):
+    popups = []
+    for id_casa, detalle in detalles.items():
+        avance = detalle.avance()
+        popups.append(fisico(llaves, catalogo, id_casa, detalle, "Tipo A1", avance))
+        popups.append(tratos_html(llaves, tratos, id_casa, "Tipo A1")[0])
+    return popups
+
+
+def medir(fisico, tratos_html, args, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        popups = generar_todos(fisico, tratos_html, *args)
+        tiempos.append(time.perf_counter() - t0)
+    crudo = sum(len(h.encode("utf-8")) for h in popups)
+    comprimido = sum(len(gzip.compress(h.encode("utf-8"))) for h in popups)
+    return min(tiempos), crudo / len(popups), comprimido / len(popups)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--casas", type=int, default=1000)
+    parser.add_argument("--partidas", type=int, default=200)
+    parser.add_argument("--tratos", type=int, default=60)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    maestro, hojas = generar_hojas(args.casas, args.partidas)
+    llaves, catalogo, detalles = construir_modelo(maestro, hojas)
+    tratos = generar_tratos(llaves, detalles, args.tratos)
+    datos = (llaves, catalogo, detalles, tratos)
+    print(f"Obra sintética: {len(detalles)} casas, {len(maestro)} partidas, {args.tratos} tratos (2 popups por casa)")
+
+    t_ref, b_ref, g_ref = medir(popup_fisico_fstring, popup_tratos_fstring, datos, args.repeticiones)
+    t_pla, b_pla, g_pla = medir(generar_html_popup, generar_html_popup_tratos, datos, args.repeticiones)
+    estilos = len((ESTILOS_POPUPS + SCRIPT_POPUPS).encode("utf-8"))
+
+    print(f"{'Generador':<26}{'Casas/s':>10}{'Bytes/popup':>14}{'gzip/popup':>13}")
+    print(f"{'f-strings + estilos':<26}{len(detalles) / t_ref:>10.0f}{b_ref:>14.0f}{g_ref:>13.0f}")
+    print(f"{'plantillas + clases':<26}{len(detalles) / t_pla:>10.0f}{b_pla:>14.0f}{g_pla:>13.0f}")
+    print(f"Hoja de estilos compartida: {estilos} bytes (una vez por página)")
+    print(f"Mejora: {t_ref / t_pla:.1f}x tiempo, {b_ref / b_pla:.1f}x bytes por popup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cuánto tarda el modo vigilancia en dejar el plano al día después
+de una edición en la planilla.
+
+Usa una obra sintética cuyas planillas vienen de una grabación local (el
+"Drive falso" es el archivo de la grabación). Lanza `vigilar` en un hilo,
+espera el primer build y después, varias veces, marca como terminada una
+partida pendiente en la hoja CR grabada. Mide el tiempo desde la edición
+hasta que el manifiesto de lo publicado cambia, es decir, hasta que el
+HTML y los popups nuevos están escritos.
+
+Uso:
+    python benchmarks/bench_vigilar.py [--manzanas 10] [--casas 50] [--ediciones 3] [--intervalo 1]
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_peso import etapas_desde_fixture, leer_grabacion
+from obras.pipeline import MANIFIESTO
+from obras.vigilar import vigilar
+from sintetico import generar_sitio
+
+
+def marcar_partida(fixture, n):
+    """Marca con 'x' la n-ésima celda vacía de una partida en la hoja CR grabada (una edición)."""
+    grabacion = leer_grabacion(fixture)
+    vistas = 0
+    for _, grilla in grabacion["hoja_cr"]:
+        for fila in grilla[5:]:
+            if fila[0].count(".") != 2: continue  # títulos y subtítulos no llevan avance
+            for c in range(2, len(fila)):
+                if fila[c] == "":
+                    if vistas == n:
+                        fila[c] = "x"
+                        with open(fixture + ".tmp", "wb") as f:
+                            f.write(gzip.compress(json.dumps(grabacion, ensure_ascii=False).encode("utf-8"), mtime=0))
+                        os.replace(fixture + ".tmp", fixture)
+                        return
+                    vistas += 1
+    raise ValueError("No quedan partidas pendientes en la grabación")
+
+
+def leer(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def esperar_cambio(ruta, anterior, limite=300):
+    """Espera a que el contenido de `ruta` sea distinto de `anterior`. Devuelve el nuevo."""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < limite:
+        actual = leer(ruta)
+        if actual is not None and actual != anterior:
+            return actual
+        time.sleep(0.02)
+    raise TimeoutError(f"{ruta} no cambió en {limite}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--manzanas", type=int, default=10)
+    parser.add_argument("--casas", type=int, default=50, help="casas por manzana")
+    parser.add_argument("--partidas", type=int, default=100)
+    parser.add_argument("--ediciones", type=int, default=3)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="segundos entre consultas")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sitio, fixture = generar_sitio(tmp, args.manzanas, args.casas, args.partidas)
+        cache = os.path.join(tmp, "cache")
+        manifiesto = os.path.join(cache, MANIFIESTO)
+        detener = threading.Event()
+        consola = sys.stdout  # redirect_stdout afecta a todos los hilos: el informe va a la salida original
+
+        def correr_vigilancia():
+            with contextlib.redirect_stdout(io.StringIO()):
+                vigilar({sitio.nombre: (sitio, etapas_desde_fixture(sitio, fixture))}, {sitio.nombre: cache},
+                        args.intervalo, detener=detener)
+
+        hilo = threading.Thread(target=correr_vigilancia)
+        t0 = time.perf_counter()
+        hilo.start()
+        estado = esperar_cambio(manifiesto, None)
+        print(f"🔨 Primer build ({args.manzanas * args.casas:,} casas): {time.perf_counter() - t0:.2f}s", file=consola)
+
+        latencias = []
+        for n in range(args.ediciones):
+            t0 = time.perf_counter()
+            marcar_partida(fixture, n * 7)
+            estado = esperar_cambio(manifiesto, estado)
+            latencias.append(time.perf_counter() - t0)
+            print(f"✏️ Edición {n + 1}: plano al día en {latencias[-1]:.2f}s", file=consola)
+
+        detener.set()
+        hilo.join()
+
+    print(f"\nMediana edición → plano al día: {statistics.median(latencias):.2f}s "
+          f"(consulta cada {args.intervalo:g}s: en promedio la mitad de eso es espera)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Verificación: dos builds con la misma entrada producen archivos idénticos.
+
+Construye dos veces, en procesos separados con distinto PYTHONHASHSEED, una
+obra sintética pequeña y cada sitio que tenga grabación en benchmarks/fixtures,
+y compara byte a byte el HTML y todos los archivos de su carpeta de datos.
+Termina con código 1 si algún archivo difiere.
+
+Uso:
+    python benchmarks/determinismo.py
+"""
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from obras.historial import HISTORIAL
+from obras.pipeline import DIRECTORIO_CACHE
+
+SEMILLAS_HASH = ("1", "2")
+
+
+def construir_todo(carpeta):
+    """Build de la obra sintética y de los sitios con grabación, cada uno en su subcarpeta."""
+    from bench_peso import cargar_sitios, construir, ruta_fixture
+    from sintetico import generar_sitio
+
+    sitio, fixture = generar_sitio(os.path.join(carpeta, "entrada"), n_manzanas=4, casas_por_manzana=20, n_partidas=40)
+    construir(sitio, os.path.join(carpeta, "sintetico"), fixture)
+    for nombre, sitio in cargar_sitios().items():
+        if os.path.exists(ruta_fixture(sitio)):
+            construir(sitio, os.path.join(carpeta, nombre))
+
+
+def archivos(carpeta):
+    """Rutas relativas de los archivos publicables (sin el caché de etapas ni el historial)."""
+    rutas = set()
+    for base, carpetas, nombres in os.walk(carpeta):
+        carpetas[:] = [c for c in carpetas if c not in ("cache", DIRECTORIO_CACHE)]
+        rutas.update(os.path.relpath(os.path.join(base, n), carpeta) for n in nombres if n != HISTORIAL)
+    return rutas
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--construir":
+        construir_todo(sys.argv[2])
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corridas = []
+        for semilla in SEMILLAS_HASH:
+            carpeta = os.path.join(tmp, f"corrida_{semilla}")
+            print(f"🔨 Build con PYTHONHASHSEED={semilla}...")
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--construir", carpeta],
+                           env=dict(os.environ, PYTHONHASHSEED=semilla), check=True, stdout=subprocess.DEVNULL)
+            corridas.append(carpeta)
+
+        a, b = corridas
+        rutas_a, rutas_b = archivos(a), archivos(b)
+        distintos = sorted(rutas_a ^ rutas_b)
+        distintos += sorted(r for r in rutas_a & rutas_b if not filecmp.cmp(os.path.join(a, r), os.path.join(b, r), shallow=False))
+
+    if distintos:
+        print("❌ Archivos distintos entre las dos corridas:\n  " + "\n  ".join(distintos))
+        return 1
+    print(f"✅ {len(rutas_a)} archivos idénticos en las dos corridas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
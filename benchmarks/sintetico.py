@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Obra sintética para benchmarks: plano PNG con N manzanas × M casas y las
+planillas que le corresponden (CR, Partidas, Pre F1, Tratos y Asignación).
+
+Las planillas se guardan como una grabación con el mismo formato que las de
+benchmarks/fixtures (salida de las etapas hoja_*), así que el sitio se
+construye con `bench_peso.construir(sitio, carpeta, fixture)`.
+
+Con --xlsx también se escriben las cinco planillas como libros Excel (una
+pestaña por hoja), para subirlas a Google Sheets y probar con la descarga real.
+
+Uso:
+    python benchmarks/sintetico.py CARPETA [--manzanas 20] [--casas 100] [--partidas 200] [--xlsx]
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import sys
+
+import cv2
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from obras.geometria import SIN_MANZANA, ordenar_rectangular
+from obras.pipeline import Sitio
+from obras.tratos import COLUMNAS_PRECIO_TRATOS, TITULOS_TRATOS
+
+# Medidas del plano en pixeles (dentro de los filtros de detectar_casas)
+ANCHO_CASA, ALTO_CASA = 24, 20
+PASO_X, PASO_Y = 30, 34         # PASO_Y > tolerancia de agrupar_en_filas
+CALLE = 60
+FILAS_POR_MANZANA = 2
+
+CUADRILLAS = 8
+TRATOS_POR_SUBTITULO = 6
+
+
+def nombre_manzana(i):
+    return f"M{i}"
+
+
+# ========================================================
+# PLANO
+# ========================================================
+
+def ubicar_manzanas(n_manzanas, casas_por_manzana):
+    """
+    Manzanas en una grilla casi cuadrada: (alto, ancho, letra -> (x0, y0, x1, y1)),
+    el tamaño del plano y el rectángulo en pixeles de cada manzana.
+    """
+    casas_por_fila = math.ceil(casas_por_manzana / FILAS_POR_MANZANA)
+    ancho_mz = casas_por_fila * PASO_X
+    alto_mz = FILAS_POR_MANZANA * PASO_Y
+    columnas = math.ceil(math.sqrt(n_manzanas * alto_mz / ancho_mz)) or 1
+    filas = math.ceil(n_manzanas / columnas)
+
+    rectangulos = {}
+    for i in range(n_manzanas):
+        x0 = CALLE + (i % columnas) * (ancho_mz + CALLE)
+        y0 = CALLE + (i // columnas) * (alto_mz + CALLE)
+        rectangulos[nombre_manzana(i)] = (x0, y0, x0 + ancho_mz, y0 + alto_mz)
+    return CALLE + filas * (alto_mz + CALLE), CALLE + columnas * (ancho_mz + CALLE), rectangulos
+
+
+def dibujar_plano(ruta, n_manzanas, casas_por_manzana):
+    """Dibuja las manzanas de ubicar_manzanas y guarda el PNG. Devuelve letra -> rectángulo."""
+    casas_por_fila = math.ceil(casas_por_manzana / FILAS_POR_MANZANA)
+    h, w, rectangulos = ubicar_manzanas(n_manzanas, casas_por_manzana)
+    img = np.full((h, w, 3), 255, np.uint8)
+
+    for x0, y0, _, _ in rectangulos.values():
+        for n in range(casas_por_manzana):
+            x = x0 + (n % casas_por_fila) * PASO_X
+            y = y0 + (n // casas_por_fila) * PASO_Y
+            cv2.rectangle(img, (x, y), (x + ANCHO_CASA - 1, y + ALTO_CASA - 1), (0, 0, 0), thickness=-1)
+
+    cv2.imwrite(ruta, img)
+    return rectangulos
+
+
+def reglas_manzanas(rectangulos):
+    return {
+        letra: (lambda x, y, r=r: r[0] <= x < r[2] and r[1] <= y < r[3])
+        for letra, r in rectangulos.items()
+    }
+
+
+def numerar(casas_por_manzana):
+    """Numeración por filas, de izquierda a derecha."""
+    mapa_numeros = {}
+    for manzana, casas_lista in casas_por_manzana.items():
+        if manzana == SIN_MANZANA: continue
+        for n, casa in enumerate(ordenar_rectangular(casas_lista), start=1):
+            mapa_numeros[casa["idx"]] = n
+    return mapa_numeros
+
+
+def limites(h, w):
+    return dict(min_lat=0, max_lat=h * 1.1, min_lon=-w * 0.1, max_lon=w * 1.1)
+
+
+# ========================================================
+# PLANILLAS
+# ========================================================
+
+def partidas_cr(n_partidas):
+    """(código, descripción, es_partida) en el orden de las hojas del CR: títulos, subtítulos y partidas."""
+    partidas = []
+    n_titulos = max(1, n_partidas // 50)
+    por_subtitulo = max(1, n_partidas // (n_titulos * 5))
+    for t in range(n_titulos):
+        partidas.append((f"{t + 1}", f"TITULO {t + 1}", False))
+        for s in range(5):
+            partidas.append((f"{t + 1}.{s + 1}", f"SUBTITULO {t + 1}.{s + 1}", False))
+            for p in range(por_subtitulo):
+                partidas.append((f"{t + 1}.{s + 1}.{p + 1}", f"Partida {t + 1}.{s + 1}.{p + 1}", True))
+    return partidas
+
+
+def hoja_cr(rnd, partidas, n_casas):
+    filas = [[""] * (n_casas + 2) for _ in range(3)]
+    filas.append(["VIVIENDA LOTE"] + [""] * (n_casas + 1))
+    filas.append(["ITEM", "DESCRIPCION"] + [str(i) for i in range(1, n_casas + 1)])
+    # Cada casa va más o menos avanzada: una partida está lista si la casa pasó ese punto
+    progreso = [rnd.random() for _ in range(n_casas)]
+    for k, (codigo, desc, real) in enumerate(partidas):
+        fila = [codigo, desc]
+        fila += ["x" if real and k / len(partidas) < progreso[c] else "" for c in range(n_casas)]
+        filas.append(fila)
+    return filas
+
+
+def hoja_pre_f1(rnd, partidas, n_casas):
+    reales = [desc for _, desc, real in partidas if real]
+    filas = [["LOTE", "PARTIDA", "ESTADO", "COMENTARIO"]]
+    for casa in range(1, n_casas + 1):
+        if rnd.random() < 0.1:
+            filas.append([str(casa), rnd.choice(reales), "En proceso", f"Observación casa {casa}"])
+    return filas
+
+
+def hoja_tratos(rnd, n_tratos):
+    """Hoja 'TRATOS VIVIENDA': títulos, subtítulos y partidas con precio por tipo."""
+    filas = [[""] * 22 for _ in range(6)]
+    nombres = []
+    por_titulo = max(1, math.ceil(n_tratos / len(TITULOS_TRATOS)))
+    for titulo in TITULOS_TRATOS:
+        filas.append(["", titulo, "", "A-1"] + [""] * 18)
+        for s in range(math.ceil(por_titulo / TRATOS_POR_SUBTITULO)):
+            filas.append(["", f"SUBTITULO {titulo[:4]} {s + 1}", "", ""] + [""] * 18)
+            for p in range(TRATOS_POR_SUBTITULO):
+                if len(nombres) >= n_tratos: break
+                nombre = f"Trato {titulo[:4].title()} {s + 1}.{p + 1}"
+                nombres.append(nombre)
+                fila = ["", nombre, "", "m2"] + [""] * 18
+                for col in sorted(set(COLUMNAS_PRECIO_TRATOS.values())):
+                    fila[col] = f"$ {rnd.randint(5, 400) * 1000:,}".replace(",", ".")
+                filas.append(fila)
+    return filas, nombres
+
+
+def hoja_asignacion_mz(rnd, tratos, n_casas):
+    encabezado = [""]
+    for casa in range(1, n_casas + 1):
+        encabezado += [f"CASA {casa}", ""]
+    filas = [[""], [""], encabezado]
+    progreso = [rnd.random() for _ in range(n_casas)]
+    for k, nombre in enumerate(tratos):
+        fila = [nombre]
+        for casa in range(n_casas):
+            if k / len(tratos) < progreso[casa]:
+                fila += [str(100 + rnd.randrange(CUADRILLAS)), f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}"]
+            else:
+                fila += ["", ""]
+        filas.append(fila)
+    return filas
+
+
+def generar_planillas(letras, casas_por_manzana, n_partidas, semilla=1):
+    """Grabación de las etapas hoja_* para las manzanas `letras`."""
+    rnd = random.Random(semilla)
+    partidas = partidas_cr(n_partidas)
+    datos_tratos, tratos = hoja_tratos(rnd, max(1, n_partidas // 4))
+    return {
+        "hoja_cr": [(f"MANZ. {l}", hoja_cr(rnd, partidas, casas_por_manzana)) for l in letras],
+        "hoja_partidas": [[codigo, desc] for codigo, desc, real in partidas if real],
+        "hoja_pre_f1": [(f"MZ {l}", hoja_pre_f1(rnd, partidas, casas_por_manzana)) for l in letras],
+        "hoja_tratos": datos_tratos,
+        "hoja_asignacion": {
+            "cuadrillas": [["CUADRILLA", "JEFE CUADRILLA", "ID"]]
+                          + [[f"Cuadrilla {k + 1}", f"Jefe {k + 1}", str(100 + k)] for k in range(CUADRILLAS)],
+            "manzanas": {l: hoja_asignacion_mz(rnd, tratos, casas_por_manzana) for l in letras},
+        },
+    }
+
+
+def escribir_xlsx(carpeta, nombre, planillas):
+    """Un libro .xlsx por planilla con las mismas pestañas que leen las etapas hoja_*."""
+    from openpyxl import Workbook
+
+    libros = {
+        "CR": planillas["hoja_cr"],
+        "Partidas": [("Hoja1", planillas["hoja_partidas"])],
+        "Pre F1": planillas["hoja_pre_f1"],
+        "Tratos": [("TRATOS VIVIENDA", planillas["hoja_tratos"])],
+        "Asignación": [("CUADRILLAS", planillas["hoja_asignacion"]["cuadrillas"])]
+                      + [(f"MZ {l}", g) for l, g in planillas["hoja_asignacion"]["manzanas"].items()],
+    }
+    rutas = []
+    for libro, hojas in libros.items():
+        wb = Workbook()
+        wb.remove(wb.active)
+        for titulo, grilla in hojas:
+            ws = wb.create_sheet(titulo)
+            for fila in grilla:
+                ws.append(fila)
+        rutas.append(os.path.join(carpeta, f"{nombre} {libro}.xlsx"))
+        wb.save(rutas[-1])
+    return rutas
+
+
+# ========================================================
+# SITIO COMPLETO
+# ========================================================
+
+def generar_sitio(carpeta, n_manzanas=20, casas_por_manzana=100, n_partidas=200, semilla=1, escribir=True, **opciones):
+    """
+    Escribe en `carpeta` el plano y la grabación de planillas de una obra
+    sintética. Devuelve (Sitio, ruta de la grabación). `opciones` se pasan al
+    Sitio (p. ej. canvas=True). Con escribir=False solo arma el Sitio de una
+    obra ya generada en `carpeta` con los mismos parámetros.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    nombre = f"sintetico_{n_manzanas}x{casas_por_manzana}_p{n_partidas}"
+    imagen = os.path.join(carpeta, f"{nombre}.png")
+    fixture = os.path.join(carpeta, f"{nombre}.json.gz")
+    if not escribir:
+        rectangulos = ubicar_manzanas(n_manzanas, casas_por_manzana)[2]
+    else:
+        rectangulos = dibujar_plano(imagen, n_manzanas, casas_por_manzana)
+        planillas = generar_planillas(list(rectangulos), casas_por_manzana, n_partidas, semilla)
+        with open(fixture, "wb") as f:
+            f.write(gzip.compress(json.dumps(planillas, ensure_ascii=False).encode("utf-8"), mtime=0))
+
+    sitio = Sitio(
+        nombre=nombre,
+        script=os.path.abspath(__file__),
+        imagen=imagen,
+        manzanas=reglas_manzanas(rectangulos),
+        numerar=numerar,
+        tipos_ref={},
+        limites=limites,
+        salida=os.path.join(carpeta, f"{nombre}.html"),
+        planilla_cr=f"{nombre} CR",
+        planilla_tratos=f"{nombre} Tratos",
+        planilla_asignacion=f"{nombre} Asignación",
+        planilla_partidas=f"{nombre} Partidas",
+        planilla_pre_f1=f"{nombre} Pre F1",
+        manzanas_tratos=list(rectangulos),
+        **opciones,
+    )
+    return sitio, fixture
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("carpeta")
+    parser.add_argument("--manzanas", type=int, default=20)
+    parser.add_argument("--casas", type=int, default=100, help="casas por manzana")
+    parser.add_argument("--partidas", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--xlsx", action="store_true", help="escribe también las planillas como .xlsx")
+    args = parser.parse_args(argv)
+
+    sitio, fixture = generar_sitio(args.carpeta, args.manzanas, args.casas, args.partidas, args.semilla)
+    print(f"🧪 {args.manzanas * args.casas} casas: {sitio.imagen} + {fixture}")
+    if args.xlsx:
+        with gzip.open(fixture, "rt", encoding="utf-8") as f:
+            planillas = json.load(f)
+        for ruta in escribir_xlsx(args.carpeta, sitio.nombre, planillas):
+            print(f"📗 {ruta}")
+
+
+if __name__ == "__main__":
+    main()
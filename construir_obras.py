@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Construye los planos de todas las obras (plano_*.py) en una sola corrida,
+compartiendo la autenticación y las planillas comunes. Ver `--help` y
+obras/sitios.py.
+"""
+import os
+import sys
+
+from obras.sitios import ejecutar_todas
+
+
+def main(argv=None):
+    return ejecutar_todas(os.path.dirname(os.path.abspath(__file__)), argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
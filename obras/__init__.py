@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Utilidades compartidas por los planos de obra (Campos del Sur II, Aguas Vivas)."""
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Avance físico: observaciones (Pre F1), maestro de partidas, hojas "MANZ." del
+CR, tipo de cada vivienda y filtro de partidas por tipo.
+
+Las funciones reciben las grillas ya descargadas (get_all_values()), así que
+no tocan Google Sheets.
+"""
+from obras.llaves import canon_manzana, canon_numero
+from obras.modelo import CatalogoPartidas, TuplasCompartidas, leer_hoja_avance
+
+
+def leer_observaciones(hojas, llaves):
+    """
+    Observaciones "En proceso" de las pestañas 'MZ ...' de Pre F1.
+
+    Devuelve id_casa -> {PARTIDA: comentario}.
+    """
+    dict_observaciones = {}
+    print(f"--- Iniciando Escaneo de Pestañas ---")
+
+    for titulo, filas in hojas:
+        letra_mz = canon_manzana(titulo.strip().upper())
+        if len(filas) < 2: continue
+
+        for fila in filas[1:]:
+            if len(fila) < 3: continue
+            lote_raw = str(fila[0]).strip()
+            partida = str(fila[1]).strip()
+            estado = str(fila[2]).strip()
+            comentario = str(fila[3]).strip() if len(fila) > 3 else "Sin detalle"
+
+            num_casa = canon_numero(lote_raw)
+            if num_casa is None: continue
+
+            if estado.lower() == "en proceso":
+                id_casa = llaves.casa(letra_mz, num_casa)
+                dict_observaciones.setdefault(id_casa, {})[partida.upper()] = comentario
+
+    print(f"\n--- RESUMEN FINAL ---")
+    print(f"Total observaciones: {sum(len(obs) for obs in dict_observaciones.values())}")
+    return dict_observaciones
+
+
+def leer_maestro(filas_maestras, llaves):
+    """IDs de partida (llave ITEM-NOMBRE) de la hoja 'Partidas'."""
+    lista_maestra_llaves = set()
+    for fila in filas_maestras:
+        if len(fila) >= 2:
+            item_m = str(fila[0]).strip()
+            nom_m = str(fila[1]).strip()
+            if item_m and nom_m:
+                lista_maestra_llaves.add(llaves.partida(item_m, nom_m))
+
+    print(f"✅ Maestro cargado: {len(lista_maestra_llaves)} combinaciones únicas.")
+    return lista_maestra_llaves
+
+
+def leer_avances(hojas_cr, llaves, lista_maestra_llaves):
+    """Lee todas las hojas 'MANZ' del CR. Devuelve (catálogo, tuplas, id_casa -> DetalleCasa)."""
+    catalogo = CatalogoPartidas()
+    tuplas = TuplasCompartidas()
+    detalles = {}
+    for titulo, datos in hojas_cr:
+        if not datos: continue
+        leer_hoja_avance(datos, canon_manzana(titulo), llaves, lista_maestra_llaves,
+                         catalogo, tuplas, detalles)
+    return catalogo, tuplas, detalles
+
+
+def vincular_observaciones(detalles, catalogo, dict_observaciones):
+    """
+    Marca en cada DetalleCasa las partidas con observación de Pre F1.
+
+    Solo se revisan las observaciones de la misma casa y se marcan una sola
+    vez (antes de filtrar por tipo). Devuelve cuántas partidas se marcaron.
+    """
+    count = 0
+    for id_casa, detalle in detalles.items():
+        obs_casa = dict_observaciones.get(id_casa)
+        if not obs_casa: continue
+        for pos, idx in enumerate(detalle.partidas):
+            nombre_completo_excel = catalogo[idx].nombre.strip().upper()
+            for partida_obs, comentario in obs_casa.items():
+                if partida_obs in nombre_completo_excel:
+                    detalle.observar(pos, comentario)
+                    count += 1
+                    break
+    return count
+
+
+# ========================================================
+# CLASIFICACIÓN DE VIVIENDAS Y FILTRO POR TIPO
+# ========================================================
+
+def clasificar_tipos(mapa_manzanas, mapa_numeros, llaves, tipos_ref):
+    """Tipo de vivienda de cada polígono del plano: id_casa -> 'Tipo ...' (por defecto 'Tipo A1')."""
+    dict_tipos_vivienda = {}
+
+    print("🛠️ Re-vinculando geometrías con nombres de manzana reales...")
+
+    for i in range(len(mapa_manzanas)):
+        mz_val = str(mapa_manzanas[i]).strip()
+        num_val = str(mapa_numeros.get(i, "")).strip()
+        id_busqueda = f"{mz_val}{num_val}".replace("MANZ.", "").replace(" ", "")
+
+        v_tipo = "Tipo A1"
+        for t_nombre, lista in tipos_ref.items():
+            if id_busqueda in lista:
+                v_tipo = t_nombre
+                break
+
+        dict_tipos_vivienda[llaves.casa(mz_val, canon_numero(num_val) or 0)] = v_tipo
+
+    print(f"✅ Clasificación forzada completada para {len(dict_tipos_vivienda)} polígonos.")
+    return dict_tipos_vivienda
+
+
+def partida_aplica_a_vivienda(codigo_partida, tipo_v, mz, casa):
+    reglas = {
+        "B.4.4.1": {"A1", "A1-N", "A2"},
+        "B.4.4.2": {"A1", "A1-N", "A2"},
+        "B.5.3.1": {"A1", "A1-N", "A2"},
+        "C.2.3.1.B": {"A1-N"},
+        "C.5.4": {"A1", "A1-N", "A2", "B"},
+        "C.7.1": {"A1", "A1-N", "A2"},
+        "C.9.3.1": {"A1", "A1-N", "A2", "B"},
+        "C.12.1.4": {"C", "D"},
+        "C.EX.3": {"A1-N", "D"},
+        "C.EX.14.1": {"A1-N", "B", "C", "D"},
+        "C.EX.15": {"A1-N", "B"},
+        "C.EX.16": {"C", "D"},
+        "D.1.2": {"A1", "A1-N", "A2", "B"},
+        "D.1.3": {"C", "D"},
+        "D.1.4": {"A1", "A1-N", "A2"},
+        "D.1.5": {"B", "C", "D"},
+        "D.1.7": {"A1", "A1-N", "A2", "B"},
+        "D.1.8": {"C", "D"},
+        "D.1.9": {"C", "D"},
+        "D.1.10": {"C", "D"},
+        "D.1.11": {"C", "D"},
+        "D.1.12": {"C", "D"},
+        "D.4.5.4": {"D"},
+        "D.EX.3": {"A1-N", "D"},
+        "D.EX.4": {"B"},
+    }
+
+    if codigo_partida not in reglas:
+        return True
+
+    return tipo_v in reglas[codigo_partida]
+
+
+def filtrar_por_tipo(detalles, catalogo, dict_tipos_vivienda, llaves, tuplas):
+    """
+    Deja en cada casa solo las partidas que aplican a su tipo de vivienda.
+
+    Devuelve (id_casa -> DetalleCasa filtrado, id_casa -> % de avance).
+    """
+    dict_detalles_casas_filtrado = {}
+    dict_avances_filtrado = {}
+
+    # La regla solo depende del código de la partida y del tipo de vivienda:
+    # se evalúa una vez por par (partida del catálogo, tipo).
+    aplica_por_tipo = {}
+
+    for key, detalle in detalles.items():
+        mz, casa = llaves.etiqueta_casa(key)
+        tipo_v = dict_tipos_vivienda.get(key, "A1")
+        posiciones = []
+
+        for pos, idx in enumerate(detalle.partidas):
+            aplica = aplica_por_tipo.get((idx, tipo_v))
+            if aplica is None:
+                codigo = catalogo[idx].item
+                aplica = aplica_por_tipo[(idx, tipo_v)] = partida_aplica_a_vivienda(codigo, tipo_v, mz, casa)
+            if aplica:
+                posiciones.append(pos)
+
+        if posiciones:
+            filtrado = detalle.filtrar(posiciones, tuplas(detalle.partidas[pos] for pos in posiciones))
+            dict_detalles_casas_filtrado[key] = filtrado
+            dict_avances_filtrado[key] = filtrado.avance()
+
+    return dict_detalles_casas_filtrado, dict_avances_filtrado
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de búsqueda del mapa: partidas, cuadrillas y casas.
+
+construir_mapa arma, mientras dibuja las casas, un índice invertido que se
+publica como `buscador.<huella>.json` en la carpeta de datos (ver
+obras/recursos.py). El buscador del mapa lo pide la primera vez que se
+usa y responde sin servidor:
+
+  - partida -> casas donde falta y casas donde está hecha
+  - cuadrilla -> casas con tratos de esa cuadrilla
+  - "MZ K casa 7" -> polígono de la casa
+
+Las casas se identifican por su posición en la capa de viviendas (el orden
+de casas_del_plano). Los conjuntos de casas van como tramos consecutivos,
+codificados como pares [salto desde el tramo anterior, largo]: las casas de
+una manzana son correlativas, así que una partida terminada en media obra
+ocupa unos pocos números.
+
+Una partida que aparece en dos hojas de la misma casa tiene una fila por
+hoja en el popup y en el export, y todas cuentan para el avance. En el
+índice la casa va una sola vez: en "hechas" si todas sus filas están
+terminadas y en "faltan" si alguna sigue pendiente.
+
+Formato:
+    {"casas": ["A-1", "A-2", ...],
+     "partidas": [[nombre, faltan, hechas], ...],
+     "cuadrillas": [[nombre, casas], ...],
+     "omitidas": [nombre, ...]}
+
+Las partidas se recortan para que el JSON no pase de LIMITE_BUSCADOR bytes
+(casas y cuadrillas van siempre): se dejan fuera las de más tramos (las más
+caras) y sus nombres quedan en "omitidas" para que el buscador avise que no
+tiene su detalle. El tamaño publicado (y comprimido con gzip, como lo
+entrega GitHub Pages) queda en build_report.json.
+"""
+import gzip
+import json
+import os
+
+from obras.popups import partida_aplica
+
+ARCHIVO_BUSCADOR = "buscador.json"
+LIMITE_BUSCADOR = 1_000_000  # bytes del JSON sin comprimir
+
+
+def agregar_casa(tramos, i):
+    """Agrega la casa `i` (siempre mayor que las anteriores) a una lista de tramos [inicio, fin)."""
+    if tramos and tramos[-1][1] == i:
+        tramos[-1][1] = i + 1
+    else:
+        tramos.append([i, i + 1])
+
+
+def codificar(tramos):
+    """[[inicio, fin), ...] -> [salto, largo, salto, largo, ...] (salto desde el fin del tramo anterior)."""
+    plano, fin = [], 0
+    for inicio, final in tramos:
+        plano += (inicio - fin, final - inicio)
+        fin = final
+    return plano
+
+
+def _json(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+
+
+class IndiceBusqueda:
+    """Índice invertido que se llena casa por casa, en el orden del plano."""
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self.casas = []
+        self.partidas = {}    # nombre -> ([tramos donde falta], [tramos donde está hecha])
+        self.cuadrillas = {}  # nombre -> [tramos]
+
+    def agregar(self, mz, num, detalle, tipo_vivienda, cuadrillas):
+        """Agrega la siguiente casa del plano; las partidas se filtran igual que en su popup y en el export."""
+        i = len(self.casas)
+        self.casas.append(f"{mz}-{num}")
+        terminadas = {}  # nombre -> terminada en todas sus filas (una por hoja)
+        for p, terminada, _, _ in detalle.items(self.catalogo):
+            if not partida_aplica(p.nombre, tipo_vivienda, mz, num): continue
+            terminadas[p.nombre] = terminadas.get(p.nombre, True) and terminada
+        for nombre, terminada in terminadas.items():
+            agregar_casa(self.partidas.setdefault(nombre, ([], []))[terminada], i)
+        for c in cuadrillas:
+            agregar_casa(self.cuadrillas.setdefault(c, []), i)
+
+    def datos(self, limite=LIMITE_BUSCADOR):
+        """El índice como dict serializable, sin pasar de `limite` bytes en JSON."""
+        partidas = [[nombre, codificar(faltan), codificar(hechas)] for nombre, (faltan, hechas) in self.partidas.items()]
+        datos = {
+            "casas": self.casas,
+            "partidas": partidas,
+            "cuadrillas": [[nombre, codificar(self.cuadrillas[nombre])] for nombre in sorted(self.cuadrillas)],
+            "omitidas": [],
+        }
+        sobra = len(_json(datos).encode("utf-8")) - limite
+        if sobra > 0:
+            # Fuera las partidas más caras primero; el nombre sigue en "omitidas"
+            omitidas = set()
+            for fila in sorted(partidas, key=lambda f: len(f[1]) + len(f[2]), reverse=True):
+                if sobra <= 0: break
+                omitidas.add(fila[0])
+                sobra -= len(_json(fila).encode("utf-8")) - len(_json(fila[0]).encode("utf-8"))
+            datos["partidas"] = [f for f in partidas if f[0] not in omitidas]
+            datos["omitidas"] = [f[0] for f in partidas if f[0] in omitidas]
+            print(f"⚠️ Índice de búsqueda sobre {limite:,} bytes: {len(omitidas)} partida(s) quedan sin detalle.")
+        return datos
+
+    def json(self, limite=LIMITE_BUSCADOR):
+        return _json(self.datos(limite)).encode("utf-8")
+
+
+def informe(publicados):
+    """
+    Tamaño del índice publicado (para build_report.json): {"archivo",
+    "bytes", "gz"}, o None si el mapa no lo escribió.
+    """
+    base, extension = os.path.splitext(ARCHIVO_BUSCADOR)
+    for ruta in publicados:
+        nombre = os.path.basename(ruta)
+        if nombre.startswith(base + ".") and nombre.endswith(extension):
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            return {"archivo": nombre, "bytes": len(datos), "gz": len(gzip.compress(datos, mtime=0))}
+    return None
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de etapas con caché por huella.
+
+Cada etapa declara de qué etapas depende y qué entradas externas lee
+(archivos locales o planillas de Google). Su salida se guarda en disco junto
+con la huella con que se calculó: el código de la etapa, la huella de cada
+entrada y la huella de la salida de cada etapa previa. En la siguiente
+corrida la etapa se reutiliza si nada de eso cambió; si se recalcula y su
+salida resulta idéntica, las etapas posteriores tampoco se recalculan.
+
+De cada etapa calculada se mide el tiempo real, el de CPU y cuántos
+elementos produjo; dentro de una etapa se pueden medir partes con `tramo`.
+Si tracemalloc está activo también se anota el pico de memoria asignada en
+cada etapa y las líneas que más memoria retienen al terminar.
+"""
+import hashlib
+import importlib.util
+import inspect
+import itertools
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de RSS en el informe
+    resource = None
+
+
+def huella_bytes(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def huella_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _huella_json(valor):
+    return huella_bytes(json.dumps(valor, sort_keys=True).encode("utf-8"))
+
+
+# ========================================================
+# MEDICIÓN DENTRO DE UNA ETAPA
+# ========================================================
+
+_tramos = []  # tramos medidos en la etapa que se está calculando
+
+
+@contextmanager
+def tramo(nombre):
+    """
+    Mide una parte de la etapa en curso (tiempo real y de CPU); aparece en el
+    informe bajo la etapa. Se puede anotar cuántos elementos procesó:
+
+        with tramo("popups") as t:
+            ...
+            t["items"] = len(casas)
+    """
+    fila = {"nombre": nombre, "items": None}
+    _tramos.append(fila)
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield fila
+    finally:
+        fila.update(segundos=time.perf_counter() - t0, cpu=time.process_time() - c0)
+
+
+def pico_rss():
+    """Pico de memoria residente del proceso en bytes (None si el sistema no lo informa)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024  # macOS lo da en bytes, Linux en KiB
+
+
+def asignaciones(cantidad=10):
+    """
+    Líneas que más memoria retienen de lo asignado desde el último
+    tracemalloc.clear_traces(): [{"lugar", "bytes", "bloques"}].
+    """
+    estadisticas = (e for e in tracemalloc.take_snapshot().statistics("lineno")
+                    if e.traceback[0].filename != tracemalloc.__file__)
+    return [{"lugar": f"{e.traceback[0].filename}:{e.traceback[0].lineno}", "bytes": e.size, "bloques": e.count}
+            for e in itertools.islice(estadisticas, cantidad)]
+
+
+# ========================================================
+# ENTRADAS EXTERNAS
+# ========================================================
+
+class Archivo:
+    """Entrada: archivo local. Su huella es el sha256 del contenido."""
+
+    __slots__ = ("ruta",)
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    @property
+    def nombre(self):
+        return f"archivo:{os.path.basename(self.ruta)}"
+
+    def huella(self, contexto):
+        return huella_archivo(self.ruta)
+
+
+class Planilla:
+    """Entrada: planilla de Google. Su huella es la fecha de modificación en Drive."""
+
+    __slots__ = ("titulo",)
+
+    def __init__(self, titulo):
+        self.titulo = titulo
+
+    @property
+    def nombre(self):
+        return f"planilla:{self.titulo}"
+
+    def huella(self, contexto):
+        return contexto.fecha_planilla(self.titulo)
+
+
+# ========================================================
+# ETAPAS
+# ========================================================
+
+def fuente_modulo(modulo):
+    """Código fuente de un módulo; si se da por nombre se lee el archivo sin importarlo."""
+    if isinstance(modulo, str):
+        with open(importlib.util.find_spec(modulo).origin, encoding="utf-8") as f:
+            return f.read()
+    return inspect.getsource(modulo)
+
+
+class Etapa:
+    """
+    Paso del build: `funcion(contexto, **salidas_previas)`.
+
+    - depende: nombres de las etapas cuyas salidas recibe (como argumentos).
+    - entradas: Archivo / Planilla que lee directamente.
+    - codigo: módulos (o sus nombres, para no importarlos si la etapa no
+      corre) cuyo código fuente también forma parte de la versión.
+    - cache: si es False la salida no se guarda (p. ej. la imagen en memoria)
+      y la etapa solo se calcula cuando otra la necesita.
+    - verificar: función salida -> bool para salidas que viven fuera del
+      caché (p. ej. el HTML final); si devuelve False la etapa se recalcula.
+    - contar: función salida -> cantidad de `unidad` (casas, filas...) que
+      produjo la etapa, para el informe.
+    """
+
+    def __init__(self, nombre, funcion, depende=(), entradas=(), codigo=(), cache=True, verificar=None,
+                 contar=None, unidad=""):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.depende = tuple(depende)
+        self.entradas = tuple(entradas)
+        self.codigo = tuple(codigo)
+        self.cache = cache
+        self.verificar = verificar
+        self.contar = contar
+        self.unidad = unidad
+
+    @property
+    def version(self):
+        fuentes = [inspect.getsource(self.funcion)] + [fuente_modulo(m) for m in self.codigo]
+        return huella_bytes("\n".join(fuentes).encode("utf-8"))
+
+
+class Pipeline:
+    """Ejecuta las etapas en orden reutilizando lo que sigue vigente en `directorio`."""
+
+    def __init__(self, etapas, directorio):
+        self.etapas = {}
+        for etapa in etapas:
+            faltan = [d for d in etapa.depende if d not in self.etapas]
+            if faltan:
+                raise ValueError(f"La etapa '{etapa.nombre}' depende de {faltan}, que no están definidas antes.")
+            self.etapas[etapa.nombre] = etapa
+        self.directorio = directorio
+
+    def _ruta(self, nombre, extension):
+        return os.path.join(self.directorio, f"{nombre}.{extension}")
+
+    def _leer_meta(self, nombre):
+        try:
+            with open(self._ruta(nombre, "json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _escribir(self, nombre, datos, meta):
+        for extension, contenido, modo in (("pkl", datos, "wb"), ("json", json.dumps(meta, indent=1, sort_keys=True), "w")):
+            ruta = self._ruta(nombre, extension)
+            with open(ruta + ".tmp", modo) as f:
+                f.write(contenido)
+            os.replace(ruta + ".tmp", ruta)
+
+    def _huella_entrada(self, entrada):
+        if entrada.nombre not in self._huellas:
+            try:
+                self._huellas[entrada.nombre] = entrada.huella(self._contexto)
+            except Exception as e:
+                print(f"⚠️ No se pudo obtener la huella de {entrada.nombre}: {e}")
+                self._huellas[entrada.nombre] = None
+        return self._huellas[entrada.nombre]
+
+    def entradas_guardadas(self, nombre):
+        """Huellas de las entradas con que se calculó la salida en caché de `nombre` ({} si no hay)."""
+        meta = self._leer_meta(nombre)
+        return meta.get("entradas", {}) if meta else {}
+
+    def salida(self, nombre):
+        """Salida de una etapa en esta corrida (se lee del caché o se calcula al pedirla)."""
+        if nombre not in self._salidas:
+            etapa = self.etapas[nombre]
+            if etapa.cache:
+                with open(self._ruta(nombre, "pkl"), "rb") as f:
+                    self._salidas[nombre] = pickle.load(f)
+            else:
+                self._calcular(etapa)
+                self._informe[nombre].update(accion="ejecutada", razones=["sin caché: la necesitó otra etapa"])
+        return self._salidas[nombre]
+
+    def _calcular(self, etapa):
+        previas = {d: self.salida(d) for d in etapa.depende}
+        _tramos.clear()
+        # Con tracemalloc activo (--profile) se registra qué líneas asignaron memoria en la etapa
+        memoria = tracemalloc.is_tracing()
+        if memoria:
+            # Desde cero en cada etapa: el snapshot final tiene solo lo que asignó esta etapa
+            tracemalloc.clear_traces()
+        t0, c0 = time.perf_counter(), time.process_time()
+        salida = self._salidas[etapa.nombre] = etapa.funcion(self._contexto, **previas)
+        self._informe[etapa.nombre].update(
+            segundos=time.perf_counter() - t0, cpu=time.process_time() - c0,
+            items=etapa.contar(salida) if etapa.contar else None, tramos=list(_tramos),
+        )
+        if memoria:
+            self._informe[etapa.nombre].update(pico_memoria=tracemalloc.get_traced_memory()[1], asignaciones=asignaciones())
+        self._informe[etapa.nombre]["pico_rss"] = pico_rss()
+        return salida
+
+    def _razones(self, etapa, llave, meta, forzar):
+        """Por qué hay que recalcular la etapa ([] si la salida en caché sigue vigente)."""
+        if etapa.nombre in forzar:
+            return ["forzada"]
+        if meta is None or not os.path.exists(self._ruta(etapa.nombre, "pkl")):
+            return ["sin caché previa"]
+
+        razones = []
+        if meta.get("version") != llave["version"]:
+            razones.append("código de la etapa cambió")
+        for nombre, huella in llave["entradas"].items():
+            if huella is None:
+                razones.append(f"entrada no disponible: {nombre}")
+            elif meta.get("entradas", {}).get(nombre) != huella:
+                razones.append(f"entrada cambió: {nombre}")
+        for nombre, huella in llave["previas"].items():
+            if meta.get("previas", {}).get(nombre) != huella:
+                razones.append(f"etapa previa '{nombre}' cambió")
+        if not razones and etapa.verificar and not etapa.verificar(self.salida(etapa.nombre)):
+            self._salidas.pop(etapa.nombre, None)
+            razones.append("salida en caché no válida")
+        return razones
+
+    def necesarias(self, objetivos):
+        """Nombres de las etapas `objetivos` y de todas las etapas de las que dependen."""
+        desconocidas = [n for n in objetivos if n not in self.etapas]
+        if desconocidas:
+            raise ValueError(f"Etapas desconocidas {desconocidas}. Opciones: {', '.join(self.etapas)}")
+        pendientes, vistas = list(objetivos), set()
+        while pendientes:
+            nombre = pendientes.pop()
+            if nombre not in vistas:
+                vistas.add(nombre)
+                pendientes.extend(self.etapas[nombre].depende)
+        return vistas
+
+    def ejecutar(self, contexto, forzar=(), objetivos=None):
+        """
+        Corre el pipeline (solo `objetivos` y sus dependencias, si se indican).
+        Devuelve el informe: nombre -> {"accion", "razones",
+        "segundos", "cpu", "items", "tramos", "huellas"}, con accion
+        'ejecutada', 'reutilizada' u 'omitida'. "huellas" son los segundos que
+        tomó obtener las huellas de sus entradas (p. ej. abrir las planillas).
+        Las etapas ejecutadas traen además "pico_rss", el pico de memoria del
+        proceso al terminar (bytes), y con tracemalloc activo "pico_memoria" y
+        "asignaciones". La salida de cada etapa se suelta de la memoria
+        después de la última etapa que la usa.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        self._contexto = contexto
+        # Carpeta del caché de esta corrida, para etapas que guardan archivos junto a él (p. ej. el historial)
+        contexto.directorio = self.directorio
+        self._salidas = {}
+        self._huellas = {}
+        self._informe = {}
+        forzar = set(forzar)
+        necesarias = self.necesarias(objetivos) if objetivos else set(self.etapas)
+
+        # Última etapa que usa cada salida: después se suelta (si hace falta otra vez se relee del caché)
+        ultimo_uso = {}
+        for etapa in self.etapas.values():
+            if etapa.nombre in necesarias:
+                ultimo_uso.update(dict.fromkeys(etapa.depende, etapa.nombre))
+
+        for etapa in self.etapas.values():
+            if etapa.nombre not in necesarias:
+                continue
+            self._ejecutar_etapa(etapa, forzar)
+            for previa in etapa.depende:
+                if ultimo_uso[previa] == etapa.nombre:
+                    self._salidas.pop(previa, None)
+
+        return self._informe
+
+    def _ejecutar_etapa(self, etapa, forzar):
+        """Reutiliza la salida en caché de la etapa o la calcula y la guarda."""
+        t0 = time.perf_counter()
+        llave = {
+            "version": etapa.version,
+            "entradas": {e.nombre: self._huella_entrada(e) for e in etapa.entradas},
+            "previas": {d: self._informe[d]["huella"] for d in etapa.depende},
+        }
+        self._informe[etapa.nombre] = {"accion": "omitida", "razones": [], "segundos": 0.0, "cpu": 0.0,
+                                       "items": None, "tramos": [], "huellas": time.perf_counter() - t0}
+
+        if not etapa.cache:
+            # Su "salida" para las etapas siguientes es la huella de lo que la define
+            self._informe[etapa.nombre].update(huella=_huella_json(llave), razones=["sin caché: se calcula solo si otra etapa la necesita"])
+            return
+
+        meta = self._leer_meta(etapa.nombre)
+        razones = self._razones(etapa, llave, meta, forzar)
+        if not razones:
+            self._informe[etapa.nombre].update(accion="reutilizada", huella=meta["salida"])
+            return
+
+        salida = self._calcular(etapa)
+        datos = pickle.dumps(salida, protocol=pickle.HIGHEST_PROTOCOL)
+        huella = huella_bytes(datos)
+        if meta and meta.get("salida") == huella:
+            razones.append("(salida idéntica a la anterior)")
+        self._informe[etapa.nombre].update(accion="ejecutada", razones=razones, huella=huella)
+
+        # Con una entrada no disponible la salida no se guarda: se recalcula la próxima vez
+        if None not in llave["entradas"].values():
+            self._escribir(etapa.nombre, datos, dict(llave, salida=huella))
+
+    def resumen(self, informe):
+        """Tabla compacta de tiempos: etapa, acción, real, CPU, elementos y sus tramos."""
+        ancho = max(len(n) for n in self.etapas) + 2
+        print(f"\n⏱️ {'Etapa':<{ancho}}{'acción':<12}{'real':>8}{'cpu':>8}{'huellas':>9}  elementos")
+        for nombre, fila in informe.items():
+            items = "" if fila["items"] is None else f"{fila['items']:,} {self.etapas[nombre].unidad}"
+            print(f"   {nombre:<{ancho}}{fila['accion']:<12}{fila['segundos']:>7.2f}s{fila['cpu']:>7.2f}s"
+                  f"{fila['huellas']:>8.2f}s  {items}")
+            for t in fila["tramos"]:
+                items = "" if t["items"] is None else f"{t['items']:,}"
+                print(f"   {'  · ' + t['nombre']:<{ancho + 12}}{t['segundos']:>7.2f}s{t['cpu']:>7.2f}s{'':>9}  {items}")
+        total = sum(f["segundos"] + f["huellas"] for f in informe.values())
+        print(f"   {'TOTAL':<{ancho + 12}}{total:>7.2f}s{sum(f['cpu'] for f in informe.values()):>7.2f}s")
+        pico = pico_rss()
+        if pico is not None:
+            print(f"   Pico de memoria (RSS): {pico / 2**20:,.0f} MiB")
+
+    def reporte(self, informe):
+        """Informe como dict serializable (sin las huellas de salida) para build_report.json."""
+        etapas = [
+            {"nombre": nombre, "unidad": self.etapas[nombre].unidad,
+             **{k: v for k, v in fila.items() if k != "huella"}}
+            for nombre, fila in informe.items()
+        ]
+        return {
+            "segundos": sum(e["segundos"] + e["huellas"] for e in etapas),
+            "cpu": sum(e["cpu"] for e in etapas),
+            "pico_rss": pico_rss(),
+            "etapas": etapas,
+        }
+
+    def explicar(self, informe):
+        """Imprime qué hizo cada etapa y por qué."""
+        ancho = max(len(n) for n in self.etapas)
+        print("\n📋 Etapas del build:")
+        for nombre, fila in informe.items():
+            icono = {"ejecutada": "▶️", "reutilizada": "♻️"}.get(fila["accion"], "⏭️")
+            razones = "; ".join(fila["razones"])
+            print(f"  {icono} {nombre:<{ancho}}  {fila['accion']:<11} {fila['segundos']:>7.2f}s  {razones}")
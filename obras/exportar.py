@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación de los datos calculados, para otros tableros y planillas.
+
+Junto al HTML se escribe `<salida>_export/v<ESQUEMA>/` con las tablas casas,
+partidas, tratos, cuadrillas y pagos como:
+  - datos.json: {"version", "tablas": {nombre: {"columnas", "filas"}}}
+  - <tabla>.csv (UTF-8, separador coma)
+  - <tabla>.parquet (solo si está instalado pyarrow)
+
+Los nombres de archivo son fijos; si cambian las columnas de forma
+incompatible se sube ESQUEMA y la exportación va a otra carpeta.
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from obras.plata import sumar
+from obras.popups import partida_aplica
+from obras.tratos import SIN_ESTADO_TRATO
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Opcional: sin 'pyarrow' se exportan solo JSON y CSV
+    pyarrow = None
+
+ESQUEMA = 1
+
+COLUMNAS = {
+    "casas": ["manzana", "numero", "tipo", "avance", "partidas", "partidas_terminadas", "observaciones",
+              "plata_ganada", "plata_total", "cuadrillas"],
+    "partidas": ["manzana", "numero", "item", "descripcion", "titulo", "subtitulo", "terminada", "observacion"],
+    "tratos": ["manzana", "numero", "trato", "titulo", "subtitulo", "precio", "terminado", "fecha", "cuadrilla"],
+    "cuadrillas": ["cuadrilla", "representante", "id", "total_pagado", "casas"],
+    "pagos": ["cuadrilla", "manzana", "numero", "monto"],
+}
+
+
+def carpeta_export(salida):
+    """'obra_x.html' -> 'obra_x_export/v1'."""
+    return os.path.join(os.path.splitext(salida)[0] + "_export", f"v{ESQUEMA}")
+
+
+# ========================================================
+# TABLAS
+# ========================================================
+
+def armar_tablas(casas, avance, tratos, cuadrillas):
+    """
+    Filas de cada tabla. `casas` recorre (manzana, número, id_casa) en el
+    orden del plano. Los montos van en pesos enteros.
+    """
+    llaves = tratos["llaves"]
+    catalogo = avance["catalogo"]
+    tablas = {nombre: [] for nombre in COLUMNAS}
+
+    for mz, num, key in casas:
+        tipo_v = avance["tipos"].get(key, "Tipo A1")
+
+        # Avance físico: mismas partidas que muestra el popup
+        detalle = avance["detalles"].get(key)
+        n_partidas = n_terminadas = n_obs = 0
+        if detalle is not None:
+            for p, terminada, tiene_obs, comentario in detalle.items(catalogo):
+                if not partida_aplica(p.nombre, tipo_v, mz, num): continue
+                n_partidas += 1
+                n_terminadas += terminada
+                n_obs += tiene_obs
+                tablas["partidas"].append([mz, num, p.item, p.descripcion, p.titulo, p.subtitulo, terminada, comentario])
+
+        # Tratos: precio según el tipo de vivienda, estado y cuadrilla
+        estado_casa = tratos["estado"].get(key, {})
+        cuadrillas_casa = tratos["cuadrillas"].get(key, {})
+        precios = tratos["precios"].vector(tratos["filas"], tipo_v)
+        terminados = []
+        for item, precio in zip(tratos["estructura"], precios.tolist()):
+            estado = estado_casa.get(item["id_trato"], SIN_ESTADO_TRATO)
+            terminados.append(estado["terminada"])
+            tablas["tratos"].append([mz, num, llaves.nombre_trato(item["id_trato"]), item["titulo"], item["subtitulo"],
+                                     precio, estado["terminada"], estado["fecha"],
+                                     cuadrillas_casa.get(item["id_trato"], "-")])
+
+        tablas["casas"].append([
+            mz, num, tipo_v, avance["avances"].get(key, 0), n_partidas, n_terminadas, n_obs,
+            sumar(precios[np.array(terminados, dtype=bool)]), sumar(precios),
+            "; ".join(cuadrillas["por_casa"].get(key, [])),
+        ])
+
+    for nombre, info in cuadrillas["info"].items():
+        realizados = info["tratos_realizados"]
+        tablas["cuadrillas"].append([nombre, info["representante"], info["id"], info["total_pagado"], len(realizados)])
+        for t in realizados:
+            tablas["pagos"].append([nombre, t["mzn_sort"], t["num_sort"], t["monto_total"]])
+
+    return tablas
+
+
+# ========================================================
+# ARCHIVOS
+# ========================================================
+
+# Las tablas grandes (partidas, tratos) se escriben por lotes de filas: el
+# archivo completo nunca está en memoria como texto
+LOTE = 20_000
+
+
+def _lotes(filas):
+    for i in range(0, len(filas), LOTE):
+        yield filas[i:i + LOTE]
+
+
+@contextmanager
+def _archivo(ruta, modo="w"):
+    """Archivo que reemplaza a `ruta` recién cuando se terminó de escribir."""
+    with open(ruta + ".tmp", modo, **({} if "b" in modo else {"encoding": "utf-8", "newline": ""})) as f:
+        yield f
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _json(valor):
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":"))
+
+
+def _escribir_json(ruta, tablas):
+    """datos.json igual a json.dumps del documento completo, escrito tabla por tabla y lote por lote."""
+    with _archivo(ruta) as f:
+        f.write(f'{{"version":{ESQUEMA},"tablas":{{')
+        for n, (nombre, filas) in enumerate(tablas.items()):
+            f.write(f'{"," if n else ""}{_json(nombre)}:{{"columnas":{_json(COLUMNAS[nombre])},"filas":[')
+            for i, lote in enumerate(_lotes(filas)):
+                f.write(("," if i else "") + _json(lote)[1:-1])
+            f.write("]}")
+        f.write("}}")
+
+
+def _escribir_csv(ruta, columnas, filas):
+    with _archivo(ruta) as f:
+        escritor = csv.writer(f, lineterminator="\n")
+        escritor.writerow(columnas)
+        escritor.writerows(filas)
+
+
+def _parquet(ruta, columnas, filas):
+    esquema = None
+    with _archivo(ruta, "wb") as f:
+        escritor = None
+        for lote in _lotes(filas) if filas else [filas]:
+            tabla = pyarrow.table({c: [fila[i] for fila in lote] for i, c in enumerate(columnas)}, schema=esquema)
+            if escritor is None:
+                esquema = tabla.schema
+                escritor = pyarrow.parquet.ParquetWriter(f, esquema)
+            escritor.write_table(tabla)
+        escritor.close()
+
+
+def exportar(carpeta, tablas):
+    """Escribe datos.json, los CSV y (si hay pyarrow) los Parquet. Devuelve las rutas escritas."""
+    os.makedirs(carpeta, exist_ok=True)
+    rutas = []
+
+    ruta = os.path.join(carpeta, "datos.json")
+    _escribir_json(ruta, tablas)
+    rutas.append(ruta)
+
+    for nombre, filas in tablas.items():
+        ruta = os.path.join(carpeta, f"{nombre}.csv")
+        _escribir_csv(ruta, COLUMNAS[nombre], filas)
+        rutas.append(ruta)
+        if pyarrow is not None:
+            ruta = os.path.join(carpeta, f"{nombre}.parquet")
+            _parquet(ruta, COLUMNAS[nombre], filas)
+            rutas.append(ruta)
+
+    print(f"📤 Exportación v{ESQUEMA}: {', '.join(f'{n} ({len(f)})' for n, f in tablas.items())} en {carpeta}")
+    return rutas
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de viviendas en el plano, asignación a manzanas y ordenamiento.
+
+Todo trabaja en coordenadas de pixel del plano; `pixel_to_folium` convierte
+al sistema [lng, lat] del mapa (CRS 'Simple', eje Y invertido).
+
+cv2 se importa solo en las funciones que leen o procesan la imagen: los
+scripts de obra importan este módulo por SIN_MANZANA y el ordenamiento.
+"""
+import numpy as np
+
+SIN_MANZANA = "SIN_MANZANA"
+
+
+def cargar_imagen(ruta):
+    import cv2
+    img = cv2.imread(ruta)
+    if img is None:
+        raise FileNotFoundError(f"❌ Error: No se encontró '{ruta}'. Asegúrate de que está en el repositorio.")
+    return img
+
+
+def pixel_to_folium(pt, h):
+    px_x, px_y = pt
+    # latitud = Altura_Total - pixel_y (esto invierte el eje para Folium)
+    # longitud = pixel_x
+    lat = float(h - px_y)
+    lng = float(px_x)
+    return [lng, lat]
+
+
+def detectar_casas(img):
+    """
+    Detecta los bloques negros (viviendas) del plano.
+
+    Devuelve {"h", "w", "casas_geometria", "centroides"}: un polígono cerrado
+    [lng, lat] por vivienda y su centroide en pixeles ({"idx", "cx", "cy"}).
+    """
+    import cv2
+    h, w, _ = img.shape
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    # Umbralización para detectar bloques negros
+    _, thresh = cv2.threshold(gray, 60, 255, cv2.THRESH_BINARY_INV)
+
+    # Limpieza de ruido
+    kernel = np.ones((3,3), np.uint8)
+    opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+
+    contours, _ = cv2.findContours(opening, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    casas_geometria = []
+    for cnt in contours:
+        area = cv2.contourArea(cnt)
+        perimetro = cv2.arcLength(cnt, True)
+
+        if perimetro == 0: continue
+
+        # Circularidad para descartar líneas
+        circularidad = (4 * np.pi * area) / (perimetro ** 2)
+
+        # Filtros de área y forma
+        if 200 < area < 4000 and circularidad > 0.4:
+            epsilon = 0.03 * perimetro
+            approx = cv2.approxPolyDP(cnt, epsilon, True)
+
+            if 4 <= len(approx) <= 10:
+                coords = [pixel_to_folium((float(pt[0][0]), float(pt[0][1])), h) for pt in approx]
+                coords.append(coords[0]) # Cerrar polígono
+                casas_geometria.append(coords)
+
+    print(f"ÉXITO: Se detectaron {len(casas_geometria)} viviendas.")
+
+    centroides = []
+    for i, geo in enumerate(casas_geometria):
+        xs = [p[0] for p in geo[:-1]]
+        ys = [p[1] for p in geo[:-1]]
+        cy_mapa = sum(ys) / len(ys)
+        # Usamos la coordenada de pixel para la lógica
+        centroides.append({"idx": i, "cx": sum(xs) / len(xs), "cy": h - cy_mapa})
+
+    return {"h": h, "w": w, "casas_geometria": casas_geometria, "centroides": centroides}
+
+
+# ========================================================
+# ASIGNACIÓN CASA → MANZANA
+# ========================================================
+
+def cumple_regla(regla, x, y):
+    """Una regla es una lambda (x, y) o una LISTA de lambdas (varias áreas)."""
+    if isinstance(regla, list):
+        return any(r(x, y) for r in regla)
+    return regla(x, y)
+
+
+def asignar_manzanas(centroides, manzanas):
+    """
+    Asigna cada centroide a la primera manzana cuya regla se cumple.
+
+    Devuelve {"mapa_manzanas": idx -> letra, "casas_por_manzana": letra -> [centroides]}.
+    """
+    mapa_manzanas = {}
+    casas_por_manzana = {}
+
+    for casa in centroides:
+        letra = next((l for l, regla in manzanas.items() if cumple_regla(regla, casa["cx"], casa["cy"])), SIN_MANZANA)
+        mapa_manzanas[casa["idx"]] = letra
+        casas_por_manzana.setdefault(letra, []).append(casa)
+
+    for m, lst in casas_por_manzana.items():
+        print(f"Manzana {m}: {len(lst)} casas")
+    print(f"Total de casas asignadas: {len(centroides)}")
+
+    if SIN_MANZANA in casas_por_manzana:
+        print("⚠️ Casas sin manzana:")
+        for c in casas_por_manzana[SIN_MANZANA]:
+            print(f"idx={c['idx']} cx={int(c['cx'])} cy={int(c['cy'])}")
+
+    return {"mapa_manzanas": mapa_manzanas, "casas_por_manzana": casas_por_manzana}
+
+
+# ========================================================
+# FUNCIONES DE ORDENAMIENTO (NUMERACIÓN DENTRO DE LA MANZANA)
+# ========================================================
+
+def agrupar_en_filas(casas, tolerancia=25):
+    filas = []
+    for c in sorted(casas, key=lambda x: x["cy"]):
+        agregado = False
+        for fila in filas:
+            if abs(fila[0]["cy"] - c["cy"]) < tolerancia:
+                fila.append(c); agregado = True; break
+        if not agregado: filas.append([c])
+    return filas
+
+def ordenar_rectangular(casas):
+    filas = agrupar_en_filas(casas)
+    casas_ordenadas = []
+    for fila in filas:
+        fila_ordenada = sorted(fila, key=lambda c: c["cx"])
+        casas_ordenadas.extend(fila_ordenada)
+    return casas_ordenadas
+
+def ordenar_lineal(casas, modo):
+    if modo == "LR_T": return sorted(casas, key=lambda c: (c["cy"], c["cx"]))
+    if modo == "RL_T": return sorted(casas, key=lambda c: (c["cy"], -c["cx"]))
+    return casas
+
+def ordenar_perimetro(casas, es_especial=False):
+    if not casas: return []
+    min_x, max_x = min(c['cx'] for c in casas), max(c['cx'] for c in casas)
+    min_y, max_y = min(c['cy'] for c in casas), max(c['cy'] for c in casas)
+    tol = 30
+    muro_izq, muro_sup, muro_der, muro_inf = [], [], [], []
+    procesadas = set()
+
+    candidatos_izq = sorted([c for c in casas if c['cx'] < min_x + tol], key=lambda x: x['cy'], reverse=True)
+    for c in candidatos_izq: muro_izq.append(c); procesadas.add(c['idx'])
+
+    candidatos_sup = sorted([c for c in casas if c['cy'] < min_y + tol and c['idx'] not in procesadas], key=lambda x: x['cx'])
+    for c in candidatos_sup: muro_sup.append(c); procesadas.add(c['idx'])
+
+    candidatos_der = sorted([c for c in casas if c['cx'] > max_x - tol and c['idx'] not in procesadas], key=lambda x: x['cy'])
+    for c in candidatos_der: muro_der.append(c); procesadas.add(c['idx'])
+
+    candidatos_inf = sorted([c for c in casas if c['cy'] > max_y - tol and c['idx'] not in procesadas], key=lambda x: x['cx'], reverse=True)
+    for c in candidatos_inf: muro_inf.append(c); procesadas.add(c['idx'])
+
+    orden_base = muro_izq + muro_sup + muro_der + muro_inf
+    for c in casas:
+        if c['idx'] not in procesadas: orden_base.append(c)
+
+    if es_especial and len(orden_base) > 2:
+        return [orden_base[0], orden_base[-1]] + orden_base[1:-1]
+    return orden_base
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Historial del avance en SQLite: historial.sqlite en la carpeta que contiene
+los cachés de los sitios (.cache_obra por defecto, o la base de --cache).
+
+Cada build que recalcula el avance o las cuadrillas agrega una instantánea:
+  - por casa: % de avance y bitset de partidas terminadas (el bit `pos`
+    corresponde a la partida `pos` de su conjunto de partidas)
+  - por cuadrilla: plata ganada
+  - de la obra: avance total
+
+Solo se guardan las filas que cambiaron respecto de la instantánea anterior
+del mismo sitio (una casa o cuadrilla que desaparece queda con NULL). El
+estado de una casa en una fecha es su última fila hasta esa instantánea. Los
+conjuntos de partidas se guardan una sola vez y las casas los referencian
+por id.
+
+Consultas (series por sitio, manzana, casa o cuadrilla):
+    python -m obras.historial aguas_vivas
+    python -m obras.historial aguas_vivas --manzana K
+    python -m obras.historial aguas_vivas --casa K 7
+    python -m obras.historial aguas_vivas --cuadrilla "CUADRILLA 3"
+
+El caché de etapas se puede perder (en GitHub Actions caduca), pero el
+historial no se reconstruye: el workflow lo guarda en la rama 'historial' y
+lo restaura antes de cada build. Si la base no existe, la etapa avisa que
+empieza una serie nueva.
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from obras.plata import formatear_plata
+
+HISTORIAL = "historial.sqlite"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS instantaneas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sitio TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    avance_total REAL,
+    casas INTEGER NOT NULL,        -- filas de casas que cambiaron
+    cuadrillas INTEGER NOT NULL    -- filas de cuadrillas que cambiaron
+);
+CREATE INDEX IF NOT EXISTS instantaneas_sitio ON instantaneas (sitio, id);
+
+CREATE TABLE IF NOT EXISTS conjuntos (
+    id INTEGER PRIMARY KEY,
+    partidas TEXT NOT NULL UNIQUE  -- JSON: nombres de las partidas en el orden de los bits
+);
+
+CREATE TABLE IF NOT EXISTS casas (
+    instantanea INTEGER NOT NULL REFERENCES instantaneas (id),
+    sitio TEXT NOT NULL,
+    manzana TEXT NOT NULL,
+    numero INTEGER NOT NULL,
+    avance REAL,                   -- NULL: la casa ya no está
+    terminadas BLOB,               -- bitset little-endian
+    conjunto INTEGER REFERENCES conjuntos (id),
+    PRIMARY KEY (sitio, manzana, numero, instantanea)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cuadrillas (
+    instantanea INTEGER NOT NULL REFERENCES instantaneas (id),
+    sitio TEXT NOT NULL,
+    cuadrilla TEXT NOT NULL,
+    plata INTEGER,                 -- NULL: la cuadrilla ya no está
+    PRIMARY KEY (sitio, cuadrilla, instantanea)
+) WITHOUT ROWID;
+"""
+
+
+def ruta_historial(cache):
+    """Base del historial para el caché de etapas de un sitio (`cache` = <base>/<sitio>)."""
+    return os.path.join(os.path.dirname(os.path.abspath(cache)), HISTORIAL)
+
+
+def conectar(ruta):
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    # En paralelo (construir_obras.py --procesos) varios sitios escriben en la misma base
+    con = sqlite3.connect(ruta, timeout=60)
+    con.executescript(ESQUEMA)
+    return con
+
+
+def _bits(entero):
+    return entero.to_bytes((entero.bit_length() + 7) // 8, "little")
+
+
+def _entero(bits):
+    return int.from_bytes(bits or b"", "little")
+
+
+# ========================================================
+# INSTANTÁNEAS
+# ========================================================
+
+def armar_instantanea(avance, cuadrillas):
+    """
+    Estado a guardar a partir de las salidas de las etapas 'avance' y
+    'cuadrillas': {"avance_total", "casas": (mz, num) -> (avance, terminadas,
+    partidas), "cuadrillas": nombre -> plata}.
+    """
+    llaves, catalogo = avance["llaves"], avance["catalogo"]
+    nombres = {}  # tupla de índices del catálogo -> nombres (las casas comparten tuplas)
+    casas = {}
+    for key, detalle in avance["detalles"].items():
+        partidas = nombres.get(detalle.partidas)
+        if partidas is None:
+            partidas = nombres[detalle.partidas] = tuple(catalogo[idx].nombre for idx in detalle.partidas)
+        casas[llaves.etiqueta_casa(key)] = (avance["avances"][key], detalle.terminadas, partidas)
+    return {
+        "avance_total": avance["avance_total_obra"],
+        "casas": casas,
+        "cuadrillas": {nombre: info["total_pagado"] for nombre, info in cuadrillas["info"].items()},
+    }
+
+
+def _conjunto(con, partidas, ids):
+    """Id del conjunto de partidas (lo crea si no existe)."""
+    if partidas not in ids:
+        texto = json.dumps(partidas, ensure_ascii=False)
+        con.execute("INSERT OR IGNORE INTO conjuntos (partidas) VALUES (?)", (texto,))
+        ids[partidas] = con.execute("SELECT id FROM conjuntos WHERE partidas = ?", (texto,)).fetchone()[0]
+    return ids[partidas]
+
+
+def ultimo_estado(con, sitio):
+    """Estado vigente del sitio: ((mz, num) -> (avance, terminadas, conjunto), cuadrilla -> plata)."""
+    # SQLite: con MAX() las demás columnas salen de la fila con la instantánea mayor
+    casas = {
+        (mz, num): (avance, _entero(terminadas), conjunto)
+        for mz, num, avance, terminadas, conjunto, _ in con.execute(
+            "SELECT manzana, numero, avance, terminadas, conjunto, MAX(instantanea) FROM casas "
+            "WHERE sitio = ? GROUP BY manzana, numero", (sitio,))
+        if avance is not None
+    }
+    cuadrillas = {
+        nombre: plata
+        for nombre, plata, _ in con.execute(
+            "SELECT cuadrilla, plata, MAX(instantanea) FROM cuadrillas WHERE sitio = ? GROUP BY cuadrilla", (sitio,))
+        if plata is not None
+    }
+    return casas, cuadrillas
+
+
+def agregar(ruta, sitio, instantanea, fecha=None):
+    """
+    Guarda `instantanea` (ver armar_instantanea) como diferencia contra el
+    último estado del sitio. Devuelve {"ruta", "instantanea": id, "cambios"}.
+    """
+    fecha = fecha or datetime.now(timezone.utc).isoformat(timespec="seconds")
+    if not os.path.exists(ruta):
+        print(f"⚠️ No hay historial en {ruta}: empieza una serie nueva desde esta instantánea.")
+    con = conectar(ruta)
+    try:
+        with con:
+            casas_antes, cuadrillas_antes = ultimo_estado(con, sitio)
+            ids = {}
+            casas = []
+            for (mz, num), (avance, terminadas, partidas) in sorted(instantanea["casas"].items()):
+                fila = (avance, terminadas, _conjunto(con, partidas, ids))
+                if casas_antes.pop((mz, num), None) != fila:
+                    casas.append((sitio, mz, num, avance, _bits(terminadas), fila[2]))
+            casas += [(sitio, mz, num, None, None, None) for mz, num in sorted(casas_antes)]
+
+            cuadrillas = [(sitio, nombre, plata) for nombre, plata in sorted(instantanea["cuadrillas"].items())
+                          if cuadrillas_antes.pop(nombre, None) != plata]
+            cuadrillas += [(sitio, nombre, None) for nombre in sorted(cuadrillas_antes)]
+
+            id_inst = con.execute(
+                "INSERT INTO instantaneas (sitio, fecha, avance_total, casas, cuadrillas) VALUES (?, ?, ?, ?, ?)",
+                (sitio, fecha, instantanea["avance_total"], len(casas), len(cuadrillas))).lastrowid
+            con.executemany("INSERT INTO casas VALUES (?, ?, ?, ?, ?, ?, ?)", [(id_inst, *c) for c in casas])
+            con.executemany("INSERT INTO cuadrillas VALUES (?, ?, ?, ?)", [(id_inst, *c) for c in cuadrillas])
+    finally:
+        con.close()
+    print(f"🗂️ Historial: instantánea {id_inst} ({len(casas)} casa(s) y {len(cuadrillas)} cuadrilla(s) cambiaron)")
+    return {"ruta": ruta, "instantanea": id_inst, "cambios": len(casas) + len(cuadrillas)}
+
+
+def vigente(salida):
+    """La instantánea guardada sigue en la base (si se borró, la etapa se recalcula)."""
+    if not os.path.exists(salida["ruta"]):
+        return False
+    con = sqlite3.connect(salida["ruta"])
+    try:
+        return con.execute("SELECT 1 FROM instantaneas WHERE id = ?", (salida["instantanea"],)).fetchone() is not None
+    except sqlite3.Error:
+        return False
+    finally:
+        con.close()
+
+
+# ========================================================
+# CONSULTAS
+# ========================================================
+
+def serie_obra(con, sitio):
+    """[(fecha, avance total)] de cada instantánea del sitio."""
+    return con.execute("SELECT fecha, avance_total FROM instantaneas WHERE sitio = ? ORDER BY id", (sitio,)).fetchall()
+
+
+def serie_casa(con, sitio, manzana, numero):
+    """[(fecha, avance, [partidas terminadas])] en cada instantánea en que la casa cambió (avance None: se quitó)."""
+    serie = []
+    conjuntos = {}
+    for fecha, avance, terminadas, conjunto in con.execute(
+            "SELECT i.fecha, c.avance, c.terminadas, c.conjunto FROM casas c JOIN instantaneas i ON i.id = c.instantanea "
+            "WHERE c.sitio = ? AND c.manzana = ? AND c.numero = ? ORDER BY c.instantanea", (sitio, manzana, numero)):
+        hechas = []
+        if conjunto is not None:
+            if conjunto not in conjuntos:
+                conjuntos[conjunto] = json.loads(con.execute("SELECT partidas FROM conjuntos WHERE id = ?",
+                                                             (conjunto,)).fetchone()[0])
+            bits = _entero(terminadas)
+            hechas = [p for pos, p in enumerate(conjuntos[conjunto]) if (bits >> pos) & 1]
+        serie.append((fecha, avance, hechas))
+    return serie
+
+
+def serie_manzana(con, sitio, manzana):
+    """[(fecha, avance promedio de sus casas)] en cada instantánea en que cambió alguna casa de la manzana."""
+    avances = {}
+    serie = []
+    for id_inst, fecha, numero, avance in con.execute(
+            "SELECT c.instantanea, i.fecha, c.numero, c.avance FROM casas c JOIN instantaneas i ON i.id = c.instantanea "
+            "WHERE c.sitio = ? AND c.manzana = ? ORDER BY c.instantanea", (sitio, manzana)):
+        if avance is None:
+            avances.pop(numero, None)
+        else:
+            avances[numero] = avance
+        promedio = round(sum(avances.values()) / len(avances), 1) if avances else None
+        if serie and serie[-1][0] == id_inst:
+            serie[-1] = (id_inst, fecha, promedio)
+        else:
+            serie.append((id_inst, fecha, promedio))
+    return [(fecha, promedio) for _, fecha, promedio in serie]
+
+
+def serie_cuadrilla(con, sitio, cuadrilla):
+    """[(fecha, plata ganada)] en cada instantánea en que cambió (None: la cuadrilla ya no está)."""
+    return con.execute(
+        "SELECT i.fecha, c.plata FROM cuadrillas c JOIN instantaneas i ON i.id = c.instantanea "
+        "WHERE c.sitio = ? AND c.cuadrilla = ? ORDER BY c.instantanea", (sitio, cuadrilla)).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Series de avance guardadas en el historial.")
+    parser.add_argument("sitio")
+    parser.add_argument("--db", default=os.path.join(".cache_obra", HISTORIAL), help="base del historial")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--manzana")
+    grupo.add_argument("--casa", nargs=2, metavar=("MANZANA", "NUMERO"))
+    grupo.add_argument("--cuadrilla")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"⚠️ No existe {args.db}: todavía no hay historial.")
+        return 1
+    con = sqlite3.connect(args.db)
+    try:
+        if args.casa:
+            for fecha, avance, hechas in serie_casa(con, args.sitio, args.casa[0].upper(), int(args.casa[1])):
+                print(f"{fecha}  {'-' if avance is None else f'{avance:5.1f}%'}  {len(hechas)} partida(s) terminadas")
+        elif args.manzana:
+            for fecha, avance in serie_manzana(con, args.sitio, args.manzana.upper()):
+                print(f"{fecha}  {'-' if avance is None else f'{avance:5.1f}%'}")
+        elif args.cuadrilla:
+            for fecha, plata in serie_cuadrilla(con, args.sitio, args.cuadrilla):
+                print(f"{fecha}  {'-' if plata is None else formatear_plata(plata)}")
+        else:
+            for fecha, avance in serie_obra(con, args.sitio):
+                print(f"{fecha}  {avance:5.1f}%")
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
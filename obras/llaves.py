@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de llaves canónicas para manzanas, casas y partidas.
+
+Cada planilla escribe las manzanas, lotes y partidas a su manera ("MANZ. A",
+"MZ A", "12.0", "CASA 12", nombres con espacios dobles...). Este módulo
+normaliza cada valor una sola vez al leerlo y le asigna un ID entero compacto,
+de modo que los diccionarios del resto del script se indexan por enteros y los
+textos para mostrar solo se recuperan al generar el HTML.
+"""
+
+# ========================================================
+# NORMALIZACIÓN
+# ========================================================
+
+PREFIJOS_MANZANA = ("MANZ.", "MANZ", "MZ")
+PALABRAS_LOTE = ("CASA", "LOTE", "N°")
+
+
+def canon_manzana(valor):
+    """'MANZ. A', 'MZ A' o ' a ' -> 'A'."""
+    txt = str(valor).strip().upper()
+    for prefijo in PREFIJOS_MANZANA:
+        if txt.startswith(prefijo):
+            txt = txt[len(prefijo):]
+            break
+    return txt.strip()
+
+
+def canon_numero(valor):
+    """'12', '12.0' o 'CASA N° 12' -> 12. Devuelve None si no es un número."""
+    txt = str(valor).upper()
+    for palabra in PALABRAS_LOTE:
+        txt = txt.replace(palabra, "")
+    try:
+        return int(float(txt.strip()))
+    except (TypeError, ValueError):
+        return None
+
+
+def canon_partida(nombre):
+    """Colapsa los espacios repetidos de un nombre de partida."""
+    return " ".join(str(nombre).split())
+
+
+def llave_maestra(item, descripcion):
+    """Llave ITEM-DESCRIPCIÓN usada por el maestro 'Partidas'."""
+    return f"{str(item).strip().upper()}-{str(descripcion).strip().upper()}"
+
+
+# ========================================================
+# INTERNADO DE VALORES
+# ========================================================
+
+class Internador:
+    """Asigna IDs enteros consecutivos (0, 1, 2...) a valores ya normalizados."""
+
+    __slots__ = ("_ids", "valores")
+
+    def __init__(self):
+        self._ids = {}
+        self.valores = []
+
+    def id(self, valor):
+        i = self._ids.get(valor)
+        if i is None:
+            i = self._ids[valor] = len(self.valores)
+            self.valores.append(valor)
+        return i
+
+    def buscar(self, valor):
+        """Como id(), pero sin registrar valores nuevos (None si no existe)."""
+        return self._ids.get(valor)
+
+    def __getitem__(self, i):
+        return self.valores[i]
+
+    def __len__(self):
+        return len(self.valores)
+
+
+class RegistroLlaves:
+    """
+    Registro único de manzanas, casas, partidas del CR y partidas de tratos.
+
+    - manzana(valor)       -> ID de la manzana canónica
+    - casa(manzana, num)   -> ID de la casa (manzana canónica, número)
+    - partida(item, desc)  -> ID de la partida del maestro (llave ITEM-DESC)
+    - trato(nombre)        -> ID de la partida de tratos (nombre sin espacios dobles)
+    """
+
+    def __init__(self):
+        self.manzanas = Internador()
+        self.casas = Internador()
+        self.partidas = Internador()
+        self.tratos = Internador()
+
+    # --- Registro ---
+    def manzana(self, valor):
+        return self.manzanas.id(canon_manzana(valor))
+
+    def casa(self, manzana, numero):
+        return self.casas.id((self.manzana(manzana), int(numero)))
+
+    def partida(self, item, descripcion):
+        return self.partidas.id(llave_maestra(item, descripcion))
+
+    def trato(self, nombre):
+        return self.tratos.id(canon_partida(nombre))
+
+    # --- Búsqueda sin registrar ---
+    def buscar_casa(self, manzana, numero):
+        id_mz = self.manzanas.buscar(canon_manzana(manzana))
+        if id_mz is None:
+            return None
+        return self.casas.buscar((id_mz, int(numero)))
+
+    def buscar_partida(self, item, descripcion):
+        return self.partidas.buscar(llave_maestra(item, descripcion))
+
+    def buscar_trato(self, nombre):
+        return self.tratos.buscar(canon_partida(nombre))
+
+    # --- Textos para mostrar ---
+    def etiqueta_casa(self, id_casa):
+        """ID de casa -> (letra de manzana, número de casa)."""
+        id_mz, numero = self.casas[id_casa]
+        return self.manzanas[id_mz], numero
+
+    def nombre_trato(self, id_trato):
+        return self.tratos[id_trato]
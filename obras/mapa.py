@@ -0,0 +1,881 @@
+# -*- coding: utf-8 -*-
+"""
+Construcción del mapa folium: plano de fondo, dos capas de viviendas
+(avance físico y tratos), paneles de cuadrillas y overlay HTML/JS.
+
+Cada capa de viviendas es una sola FeatureCollection (CapaViviendas): el
+estilo, el tooltip y el popup de cada casa se arman en el navegador a partir
+de sus propiedades.
+
+El plano y el contenido de los popups no van en el HTML: se escriben en
+`<salida>_datos/` como archivos con huella (`plano.<huella>.webp`,
+`popups_<MZ>.<huella>.json`, ver obras/recursos.py) y el navegador pide el
+JSON de una manzana la primera vez que se abre un popup de ella. Lo mismo el
+índice del buscador (`buscador.<huella>.json`, ver obras/buscador.py), que se
+pide la primera vez que se usa la caja de búsqueda.
+
+Con muchas casas el mapa usa el renderizador canvas de Leaflet
+(`prefer_canvas`): todas las viviendas se pintan en un solo <canvas> que
+resuelve por sí mismo qué casa está bajo el cursor, en vez de un <path> SVG
+con sus propios eventos por casa (ver `usar_canvas`).
+"""
+import itertools
+import json
+import os
+
+import folium
+from branca.element import Figure, Template, MacroElement
+
+from obras.buscador import ARCHIVO_BUSCADOR, IndiceBusqueda
+from obras.etapas import tramo
+from obras.geometria import SIN_MANZANA
+from obras.llaves import canon_numero
+from obras.modelo import DetalleCasa
+from obras.plata import sumar, formatear_plata
+from obras.recursos import Recursos, imagen_webp
+from obras.popups import ESTILOS_POPUPS, SCRIPT_POPUPS, generar_html_popup, generar_html_popup_tratos
+
+
+def casas_del_plano(geometria, manzanas, numeracion, llaves):
+    """Recorre los polígonos del plano en orden: (geo, manzana, número, id_casa)."""
+    for i, geo in enumerate(geometria["casas_geometria"]):
+        mz = str(manzanas["mapa_manzanas"].get(i, SIN_MANZANA))
+        num = canon_numero(numeracion.get(i, 0)) or 0
+        yield geo, mz, num, llaves.casa(mz, num)
+
+
+# Desde cuántas casas se usa canvas cuando el sitio no lo fija (Sitio.canvas = None)
+UMBRAL_CANVAS = 500
+
+
+def usar_canvas(canvas, n_casas):
+    """True = canvas, False = SVG, None = automático según UMBRAL_CANVAS."""
+    return n_casas >= UMBRAL_CANVAS if canvas is None else bool(canvas)
+
+
+def fijar_ids(elemento, contador=None):
+    """
+    Reemplaza los IDs aleatorios (uuid4) que branca da a cada elemento por
+    números correlativos en el orden de la página: el mismo mapa produce
+    siempre el mismo HTML.
+    """
+    contador = contador or itertools.count()
+    elemento._id = str(next(contador))
+    hijos = list(elemento._children.values())
+    if isinstance(elemento, Figure):
+        hijos += [elemento.header, elemento.html, elemento.script]
+    for hijo in hijos:
+        fijar_ids(hijo, contador)
+
+
+def carpeta_datos(salida):
+    """Carpeta de datos que acompaña al HTML: 'obra_x.html' -> 'obra_x_datos'."""
+    return os.path.splitext(salida)[0] + "_datos"
+
+
+def escribir_popups(recursos, manzana, casas):
+    """Escribe el JSON con huella de una manzana ({número: {"fisico", "tratos"}}). Devuelve el nombre del archivo."""
+    return recursos.escribir(f"popups_{manzana}.json",
+                             json.dumps(casas, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+class PlanoFondo(MacroElement):
+    """Imagen del plano enlazada por URL (folium.ImageOverlay la incrustaría en base64)."""
+
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <style>
+            .leaflet-image-layer {
+                image-rendering: -webkit-optimize-contrast;
+                image-rendering: crisp-edges;
+                image-rendering: pixelated;
+                image-rendering: -moz-crisp-edges;
+            }
+        </style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.imageOverlay({{ this.url|tojson }}, {{ this.limites|tojson }}, {opacity: 1, zIndex: 1})
+            .addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, url, limites):
+        super().__init__()
+        self._name = "PlanoFondo"
+        self.url = url
+        self.limites = limites
+
+
+class CapaViviendas(MacroElement):
+    """
+    Todas las viviendas como un solo L.geoJson: una FeatureCollection con las
+    propiedades numéricas de cada casa (avance, tiene_obs, plata_ganada,
+    plata_total, cuadrillas). Colores, tooltip y popup se calculan en el
+    navegador según `vista_actual`, así que cambiar de vista solo re-estiliza
+    la misma capa (restilarViviendas()).
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        // Igual que la antigua obtener_color_estatico(): color según el % de avance físico
+        function colorAvance(avance, tieneObs) {
+            if (tieneObs) return "#F2FF0D";
+            if (avance >= 100) return "#00FF19";
+            if (85 < avance && avance <= 99) return "#00F2FF";
+            if (70 < avance && avance <= 85) return "#000DFF";
+            if (50 < avance && avance <= 70) return "#C300FF";
+            if (30 <= avance && avance <= 50) return "#FF00AA";
+            if (10 <= avance && avance < 30) return "#FF8400";
+            return "#D10000";
+        }
+
+        // Igual que la antigua color_gradiente_plata(): azul -> amarillo -> verde según lo pagado
+        function colorPlata(ganado, total) {
+            if (total <= 0) return "#ecf0f1";
+            var p = Math.max(0.0, Math.min(1.0, ganado / total));
+            var r, g, b;
+            if (p < 0.5) {
+                var pl = p * 2;
+                r = 52 + (241 - 52) * pl; g = 152 + (196 - 152) * pl; b = 219 + (15 - 219) * pl;
+            } else {
+                var pl = (p - 0.5) * 2;
+                r = 241 + (39 - 241) * pl; g = 196 + (174 - 196) * pl; b = 15 + (96 - 15) * pl;
+            }
+            return "#" + [r, g, b].map(function(c) { return ("0" + Math.trunc(c).toString(16)).slice(-2); }).join("");
+        }
+
+        // Casas elegidas en el buscador (Set de features) o null: resalta esas y apaga las demás
+        var seleccion_busqueda = null;
+
+        function estiloVivienda(feature) {
+            var estilo = estiloVista(feature);
+            if (!seleccion_busqueda) return estilo;
+            if (seleccion_busqueda.has(feature)) {
+                return {fillColor: estilo.fillColor, fillOpacity: 0.9, weight: 3, color: '#e74c3c'};
+            }
+            return {fillColor: estilo.fillColor, fillOpacity: 0.08, weight: 0.5, color: '#bbb'};
+        }
+
+        function estiloVista(feature) {
+            var p = feature.properties;
+            if (vista_actual === 'fisico') {
+                return {fillColor: colorAvance(p.avance, p.tiene_obs), fillOpacity: 0.5, weight: 1.2, color: 'black'};
+            }
+            var color = colorPlata(p.plata_ganada, p.plata_total);
+            if (nombre_cuadrilla_filtro === 'TODAS') {
+                return {fillColor: color, fillOpacity: 0.7, weight: 1.2, color: 'black'};
+            } else if (p.cuadrillas_list.includes(nombre_cuadrilla_filtro)) {
+                return {fillColor: color, fillOpacity: 0.9, weight: 4, color: '#f1c40f'};
+            }
+            return {fillColor: '#cccccc', fillOpacity: 0.05, weight: 1, color: '#ddd'};
+        }
+
+        function tooltipVivienda(capa) {
+            var p = capa.feature.properties;
+            var filas = [['Manzana:', p.manzana], ['Casa Nº:', p.numero], ['Tipo:', p.tipo]];
+            if (vista_actual === 'fisico') {
+                filas.push(['Físico:', '<div style="font-size:12px;font-weight:bold;text-align:right;">' + p.avance + '%</div>'
+                    + '<div style="background:#e0e0e0;height:6px;border-radius:4px;overflow:hidden;"><div style="width:' + p.avance
+                    + '%;height:100%;background:linear-gradient(90deg,#2980b9,#27ae60);"></div></div>']);
+            } else {
+                filas.push(['Trato:', '<div style="font-size:12px;font-weight:bold;color:#27ae60;">Gastado: ' + formatearPlata(p.plata_ganada) + '</div>'
+                    + '<div style="font-size:10px;color:#7f8c8d;">Presupuesto: ' + formatearPlata(p.plata_total) + '</div>']);
+            }
+            return '<table>' + filas.map(function(f) { return '<tr><th>' + f[0] + '</th><td>' + f[1] + '</td></tr>'; }).join('') + '</table>';
+        }
+
+        var {{ this.get_name() }} = L.geoJson({{ this.datos|tojson }}, {
+            style: estiloVivienda,
+            onEachFeature: function(feature, layer) {
+                layer.bindTooltip(tooltipVivienda, {sticky: true, className: 'tooltip-vivienda'});
+                layer.bindPopup(function(capa) {
+                    capa.getPopup().options.maxWidth = ANCHO_POPUP[vista_actual];
+                    return popupDiferido(capa.feature.properties, vista_actual);
+                });
+                layer.on('mouseover', function(e) {
+                    if (vista_actual === 'fisico') {
+                        this.setStyle({fillOpacity: 0.8, weight: 2.5});
+                    } else {
+                        var resaltada = nombre_cuadrilla_filtro !== 'TODAS' && feature.properties.cuadrillas_list.includes(nombre_cuadrilla_filtro);
+                        this.setStyle({weight: resaltada ? 6 : 3, color: 'white'});
+                        this.bringToFront();
+                    }
+                });
+                layer.on('mouseout', function(e) { this.setStyle(estiloVivienda(feature)); });
+            }
+        }).addTo({{ this._parent.get_name() }});
+
+        var ANCHO_POPUP = {{ this.ancho_popup|tojson }};
+
+        // Re-estiliza todas las casas para la vista y el filtro de cuadrilla actuales
+        function restilarViviendas(cerrarPopup) {
+            if (cerrarPopup) {{ this._parent.get_name() }}.closePopup();
+            {{ this.get_name() }}.eachLayer(function(layer) {
+                layer.setStyle(estiloVivienda(layer.feature));
+                if (vista_actual === 'tratos' && nombre_cuadrilla_filtro !== 'TODAS'
+                        && layer.feature.properties.cuadrillas_list.includes(nombre_cuadrilla_filtro)) {
+                    layer.bringToFront();
+                }
+            });
+        }
+        {% endmacro %}
+    """)
+
+    def __init__(self, ancho_popup):
+        super().__init__()
+        self._name = "CapaViviendas"
+        self.ancho_popup = ancho_popup
+        self.datos = {"type": "FeatureCollection", "features": []}
+
+    def agregar(self, geo, **propiedades):
+        self.datos["features"].append(
+            {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [geo]}, "properties": propiedades}
+        )
+
+
+class PopupsDiferidos(MacroElement):
+    """Al abrir un popup, pide el JSON de su manzana (una sola vez) y muestra el contenido real."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        // Contenido mínimo del popup de una casa; se reemplaza por el real al abrirlo
+        function popupDiferido(props, vista) {
+            var el = L.DomUtil.create('div', 'popup-diferido');
+            el.dataset.manzana = props.manzana;
+            el.dataset.casa = props.numero;
+            el.dataset.vista = vista;
+            el.style.cssText = "padding: 10px; font-family: 'Segoe UI', Arial; color: #7f8c8d;";
+            el.innerText = 'Cargando detalle…';
+            return el;
+        }
+        (function() {
+            var ruta = {{ this.ruta|tojson }};
+            var archivos = {{ this.archivos|tojson }};  // manzana -> popups_<MZ>.<huella>.json
+            var bloques = {};
+            function cargarBloque(manzana) {
+                if (!bloques[manzana]) {
+                    var archivo = archivos[manzana];
+                    bloques[manzana] = (archivo ? fetch(ruta + archivo) : Promise.reject(new Error('manzana sin datos')))
+                        .then(function(r) { if (!r.ok) throw new Error('HTTP ' + r.status); return r.json(); });
+                }
+                return bloques[manzana];
+            }
+            // Servidor en vivo (obras/servidor.py): tras un rebuild cambian los archivos de algunas manzanas
+            window.actualizarArchivosPopups = function(nuevos) {
+                Object.keys(nuevos).forEach(function(manzana) {
+                    if (nuevos[manzana] !== archivos[manzana]) {
+                        archivos[manzana] = nuevos[manzana];
+                        delete bloques[manzana];
+                    }
+                });
+            };
+            {{ this._parent.get_name() }}.on('popupopen', function(e) {
+                var el = e.popup.getElement().querySelector('.popup-diferido');
+                if (!el) return;
+                var d = el.dataset;
+                cargarBloque(d.manzana).then(function(bloque) {
+                    e.popup.setContent(bloque[d.casa][d.vista]);
+                }).catch(function(err) {
+                    delete bloques[d.manzana];
+                    el.innerText = 'No se pudo cargar el detalle (' + err.message + ').';
+                });
+            });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, ruta, archivos):
+        super().__init__()
+        self._name = "PopupsDiferidos"
+        self.ruta = ruta
+        self.archivos = archivos
+
+
+class Buscador(MacroElement):
+    """
+    Caja de búsqueda de partidas, cuadrillas y casas. Pide el índice
+    (obras/buscador.py) la primera vez que se usa y resalta en la capa de
+    viviendas las casas encontradas (seleccion_busqueda).
+    """
+
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <style>
+            #buscador { position: fixed; top: 20px; left: 50%; transform: translateX(-50%); z-index: 9999; width: 360px;
+                        font-family: 'Segoe UI', Arial; background: white; border-radius: 12px; box-shadow: 0 4px 14px rgba(0,0,0,0.25); }
+            #buscador-texto { box-sizing: border-box; width: 100%; padding: 10px 14px; border: none; border-radius: 12px;
+                              font-size: 14px; outline: none; background: transparent; }
+            #buscador-resultados:empty, #buscador-estado:empty { display: none; }
+            #buscador-resultados { max-height: 320px; overflow-y: auto; border-top: 1px solid #eee; }
+            .buscador-op { padding: 7px 14px; cursor: pointer; font-size: 12px; color: #2c3e50; border-bottom: 1px solid #f2f2f2; }
+            .buscador-op:hover, .buscador-op.activa { background: #f0f9f7; }
+            .buscador-op small { display: block; color: #7f8c8d; font-size: 10px; }
+            #buscador-estado { padding: 8px 14px; font-size: 12px; color: #555; border-top: 1px solid #eee; }
+            #buscador-estado a { color: #1abc9c; cursor: pointer; font-weight: bold; margin-left: 8px; }
+            #buscador-estado a.activa { color: #e74c3c; }
+        </style>
+        {% endmacro %}
+        {% macro html(this, kwargs) %}
+        <div id="buscador">
+            <input id="buscador-texto" type="search" autocomplete="off" placeholder="Buscar partida, cuadrilla o casa (MZ K 7)…">
+            <div id="buscador-resultados"></div>
+            <div id="buscador-estado"></div>
+        </div>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+        (function() {
+            var mapa = {{ this._parent.get_name() }};
+            var capa = {{ this.capa.get_name() }};
+            var urlIndice = {{ this.url|tojson }};  // buscador.<huella>.json
+            var MAX_RESULTADOS = 12;
+            var ZOOM_MAXIMO = 2;  // al encuadrar lo encontrado (una casa sola no llena la pantalla)
+            var entrada = document.getElementById('buscador-texto');
+            var resultados = document.getElementById('buscador-resultados');
+            var estado = document.getElementById('buscador-estado');
+            var indice = null;    // promesa del índice ya preparado
+            var opciones = [];    // partidas y cuadrillas: {texto, detalle, clave, casas | faltan, hechas | omitida}
+            var etiquetas = {};   // "k-7" -> posición de la casa en la capa
+
+            function normalizar(t) {
+                return String(t).normalize('NFD').replace(/[\\u0300-\\u036f]/g, '').toLowerCase().trim();
+            }
+            // [salto, largo, salto, largo, ...] -> posiciones de las casas
+            function decodificar(plano) {
+                var casas = [], fin = 0;
+                for (var k = 0; k < plano.length; k += 2) {
+                    var inicio = fin + plano[k];
+                    fin = inicio + plano[k + 1];
+                    for (var i = inicio; i < fin; i++) casas.push(i);
+                }
+                return casas;
+            }
+            function cargar() {
+                if (!indice) {
+                    var pedido = urlIndice;
+                    indice = fetch(pedido).then(function(r) {
+                        if (!r.ok) throw new Error('HTTP ' + r.status);
+                        return r.json();
+                    }).then(function(d) {
+                        if (pedido !== urlIndice) return cargar();  // llegó un índice nuevo mientras se descargaba
+                        opciones = [];
+                        etiquetas = {};
+                        d.casas.forEach(function(etiqueta, i) { etiquetas[normalizar(etiqueta)] = i; });
+                        d.partidas.forEach(function(p) {
+                            var faltan = decodificar(p[1]), hechas = decodificar(p[2]);
+                            opciones.push({texto: p[0], clave: normalizar(p[0]), faltan: faltan, hechas: hechas,
+                                           detalle: 'Partida · falta en ' + faltan.length + ' · hecha en ' + hechas.length});
+                        });
+                        d.omitidas.forEach(function(nombre) {
+                            opciones.push({texto: nombre, clave: normalizar(nombre), omitida: true,
+                                           detalle: 'Partida · sin detalle en el índice (demasiado grande)'});
+                        });
+                        d.cuadrillas.forEach(function(c) {
+                            var casas = decodificar(c[1]);
+                            opciones.push({texto: c[0], clave: normalizar(c[0]), casas: casas,
+                                           detalle: 'Cuadrilla · ' + casas.length + ' casa(s)'});
+                        });
+                    });
+                    indice.catch(function(err) {
+                        indice = null;
+                        estado.textContent = 'No se pudo cargar el buscador (' + err.message + ').';
+                    });
+                }
+                return indice;
+            }
+
+            // "MZ K casa 7", "k7", "K-7" -> posición de la casa (o undefined)
+            function buscarCasa(texto) {
+                var m = texto.match(/^(?:mz|manzana)?\\.?\\s*([a-z]+)\\s*-?\\s*(?:casa|c|n|nº|n°|#)?\\.?\\s*(\\d+)$/);
+                return m ? etiquetas[m[1] + '-' + parseInt(m[2], 10)] : undefined;
+            }
+            function encontrar(texto) {
+                var q = normalizar(texto);
+                if (!q) return [];
+                var encontradas = [];
+                var casa = buscarCasa(q);
+                if (casa !== undefined) {
+                    var p = capa.getLayers()[casa].feature.properties;
+                    encontradas.push({texto: 'MZ ' + p.manzana + ' · Casa ' + p.numero, detalle: 'Casa', casas: [casa]});
+                }
+                var palabras = q.split(/\\s+/);
+                for (var k = 0; k < opciones.length && encontradas.length < MAX_RESULTADOS; k++) {
+                    var o = opciones[k];
+                    if (palabras.every(function(w) { return o.clave.indexOf(w) >= 0; })) encontradas.push(o);
+                }
+                return encontradas;
+            }
+            function mostrar() {
+                var encontradas = encontrar(entrada.value);
+                resultados.textContent = '';
+                encontradas.forEach(function(o, k) {
+                    var el = document.createElement('div');
+                    el.className = 'buscador-op' + (k === 0 ? ' activa' : '');
+                    el.textContent = o.texto;
+                    var detalle = document.createElement('small');
+                    detalle.textContent = o.detalle;
+                    el.appendChild(detalle);
+                    el.onclick = function() { elegir(o); };
+                    resultados.appendChild(el);
+                });
+                if (normalizar(entrada.value) && !encontradas.length) {
+                    var vacio = document.createElement('div');
+                    vacio.className = 'buscador-op';
+                    vacio.textContent = 'Sin resultados';
+                    resultados.appendChild(vacio);
+                }
+                return encontradas;
+            }
+
+            function resaltar(casas) {
+                var capas = capa.getLayers();
+                seleccion_busqueda = new Set(casas.map(function(i) { return capas[i].feature; }));
+                restilarViviendas(true);
+                if (!casas.length) return;
+                var limites = L.latLngBounds([]);
+                casas.forEach(function(i) { limites.extend(capas[i].getBounds()); });
+                mapa.fitBounds(limites, {maxZoom: ZOOM_MAXIMO, padding: [40, 40]});
+                if (casas.length === 1) capas[casas[0]].openPopup(capas[casas[0]].getBounds().getCenter());
+            }
+            function enlace(texto, activa, accion) {
+                var a = document.createElement('a');
+                a.textContent = texto;
+                if (activa) a.className = 'activa';
+                a.onclick = accion;
+                return a;
+            }
+            function elegir(o, cual) {
+                resultados.textContent = '';
+                estado.textContent = o.texto + ': ';
+                if (o.omitida) {
+                    estado.appendChild(document.createTextNode('sin detalle en el índice de búsqueda.'));
+                    return;
+                }
+                if (o.faltan) {
+                    cual = cual || 'faltan';
+                    estado.appendChild(enlace('Falta en ' + o.faltan.length, cual === 'faltan', function() { elegir(o, 'faltan'); }));
+                    estado.appendChild(enlace('Hecha en ' + o.hechas.length, cual === 'hechas', function() { elegir(o, 'hechas'); }));
+                    resaltar(o[cual]);
+                } else {
+                    estado.appendChild(document.createTextNode(o.casas.length + ' casa(s)'));
+                    resaltar(o.casas);
+                }
+                estado.appendChild(enlace('Limpiar', false, limpiar));
+            }
+            function limpiar() {
+                entrada.value = '';
+                resultados.textContent = '';
+                estado.textContent = '';
+                seleccion_busqueda = null;
+                restilarViviendas(true);
+            }
+
+            // Servidor en vivo (obras/servidor.py): tras un rebuild el índice tiene otra huella
+            window.actualizarBuscador = function(nueva) {
+                if (!nueva || nueva === urlIndice) return;
+                urlIndice = nueva;
+                if (!indice) return;
+                indice = null;
+                if (normalizar(entrada.value)) cargar().then(mostrar);
+            };
+
+            entrada.addEventListener('focus', cargar);
+            entrada.addEventListener('input', function() { cargar().then(mostrar); });
+            entrada.addEventListener('keydown', function(e) {
+                if (e.key === 'Escape') limpiar();
+                if (e.key === 'Enter') cargar().then(function() {
+                    var encontradas = mostrar();
+                    if (encontradas.length) elegir(encontradas[0]);
+                });
+            });
+            // Que arrastrar o hacer scroll sobre el buscador no mueva el mapa
+            L.DomEvent.disableClickPropagation(document.getElementById('buscador'));
+            L.DomEvent.disableScrollPropagation(document.getElementById('buscador'));
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, url, capa):
+        super().__init__()
+        self._name = "Buscador"
+        self.url = url
+        self.capa = capa
+
+
+class EstilosPopups(MacroElement):
+    """Hoja de estilos y función irA() compartidas por todos los popups, una sola vez en la página."""
+
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <style>{{ this.estilos }}</style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+        {{ this.script }}
+        {% endmacro %}
+    """)
+
+    def __init__(self):
+        super().__init__()
+        self._name = "EstilosPopups"
+        self.estilos = ESTILOS_POPUPS
+        self.script = SCRIPT_POPUPS
+
+
+def opciones_cuadrillas(todas_cuadrillas):
+    """HTML del menú 'FILTRAR CUADRILLA'."""
+    html_opciones_cuadrillas = '<div onclick="filtrarC(\'TODAS\')" style="cursor:pointer; padding:8px; border-bottom:1px solid #eee; font-weight:bold; color:#2c3e50;">• TODAS</div>'
+    for c in todas_cuadrillas:
+        html_opciones_cuadrillas += f'''
+    <div class="item-cuadrilla" style="border-bottom:1px solid #eee; display:flex; align-items:center;">
+        <div onclick="filtrarC('{c}')" style="cursor:pointer; padding:8px; flex-grow:1; font-size:12px;">• {c}</div>
+        <div onclick="toggleDetalleCuadrilla('{c}')" style="cursor:pointer; padding:8px 12px; color:#1abc9c; font-weight:bold; border-left:1px solid #eee;">→</div>
+    </div>'''
+    return html_opciones_cuadrillas
+
+
+def construir_mapa(sitio, geometria, manzanas, numeracion, avance, tratos, cuadrillas):
+    """
+    Dibuja el mapa completo y lo guarda en `sitio.salida`, junto con los
+    popups por manzana. Devuelve la lista de archivos escritos.
+    """
+    h, w = geometria["h"], geometria["w"]
+    llaves = tratos["llaves"]
+    catalogo_partidas = avance["catalogo"]
+    dict_tipos_vivienda = avance["tipos"]
+
+    # Defines esquinas del plano original para el ImageOverlay
+    esquinas_plano = [[0, 0], [h, w]]
+
+    m = folium.Map(
+        location=[h/2, w/2],
+        zoom_start=0,
+        crs='Simple',
+        tiles=None,
+        max_bounds=True,
+        **sitio.limites(h, w),
+        min_zoom=-1,
+        prefer_canvas=usar_canvas(sitio.canvas, len(geometria["casas_geometria"])),
+    )
+
+    # Plano y popups van como archivos con huella en la carpeta de datos
+    recursos = Recursos(carpeta_datos(sitio.salida))
+    url_datos = os.path.basename(recursos.carpeta) + "/"
+
+    # El plano se sigue dibujando en sus coordenadas originales [0,0] a [h,w]
+    with tramo("plano"):
+        PlanoFondo(url_datos + recursos.escribir(*imagen_webp(sitio.imagen)), esquinas_plano).add_to(m)
+
+    # Una sola capa para las dos vistas; el navegador la colorea según la vista activa
+    capa_viviendas = CapaViviendas(ancho_popup={"fisico": 520, "tratos": 680})
+
+    plata_ganada_casas = []
+    plata_total_casas = []
+    popups_por_manzana = {} # manzana -> {número: {"fisico": html, "tratos": html}}, solo las manzanas en curso
+    indice = IndiceBusqueda(catalogo_partidas)
+    archivos_popups = {}    # manzana -> archivo, en el orden en que aparecen en el plano
+    casas = list(casas_del_plano(geometria, manzanas, numeracion, llaves))
+    ultima_casa = {mz: i for i, (_, mz, _, _) in enumerate(casas)}
+
+    # --- DIBUJO DE CASAS ---
+    # El JSON de popups de cada manzana se escribe al dibujar su última casa: no se juntan los de toda la obra
+    with tramo("casas y popups") as t:
+        for i, (geo, mz, num, key) in enumerate(casas):
+            tipo_v = dict_tipos_vivienda.get(key, "Tipo A1")
+
+            # ----- A. AVANCE FÍSICO -----
+            avance_fisico = avance["avances"].get(key, 0)
+            detalle_fisico = avance["detalles"].get(key) or DetalleCasa()
+            tiene_observacion = detalle_fisico.observadas != 0
+            popup_html_fisico = generar_html_popup(llaves, catalogo_partidas, key, detalle_fisico, tipo_v, avance_fisico)
+
+            # ----- B. TRATOS -----
+            popup_html_tratos, plata_g, plata_t = generar_html_popup_tratos(llaves, tratos, key, tipo_v)
+            plata_ganada_casas.append(plata_g)
+            plata_total_casas.append(plata_t)
+
+            cuadrillas_casa = list(cuadrillas["por_casa"].get(key, []))
+            capa_viviendas.agregar(
+                geo, manzana=mz, numero=num, tipo=tipo_v, avance=avance_fisico, tiene_obs=tiene_observacion,
+                plata_ganada=plata_g, plata_total=plata_t, cuadrillas_list=cuadrillas_casa,
+            )
+            indice.agregar(mz, num, detalle_fisico, tipo_v, cuadrillas_casa)
+            popups_por_manzana.setdefault(mz, {})[str(num)] = {"fisico": popup_html_fisico, "tratos": popup_html_tratos}
+            archivos_popups.setdefault(mz, None)
+            if ultima_casa[mz] == i:
+                archivos_popups[mz] = escribir_popups(recursos, mz, popups_por_manzana.pop(mz))
+        t["items"] = len(capa_viviendas.datos["features"])
+
+    with tramo("buscador") as t:
+        datos_buscador = indice.json()
+        archivo_buscador = recursos.escribir(ARCHIVO_BUSCADOR, datos_buscador)
+        t["items"] = len(datos_buscador)
+    del indice, datos_buscador
+
+    total_plata_obra = sumar(plata_ganada_casas)
+    total_posible_obra = sumar(plata_total_casas)
+
+    # ========================================================
+    # ORDEN CORRECTO DE CONSTRUCCIÓN DEL MAPA
+    # ========================================================
+
+    with tramo("folium"):
+        # 1️⃣ Agregar la capa de viviendas al mapa
+        capa_viviendas.add_to(m)
+
+        # 2️⃣ Ajustar límites
+        m.fit_bounds(esquinas_plano) # Ajustamos la vista inicial al plano original
+
+        # 3️⃣ Recién ahora insertar interfaz HTML
+        macro = MacroElement()
+        macro._template = Template(overlay_html(
+            avance["avance_total_obra"], total_plata_obra, total_posible_obra,
+            opciones_cuadrillas(cuadrillas["todas"]), cuadrillas["info"]
+        ))
+        m.get_root().add_child(macro)
+        m.fit_bounds(esquinas_plano) # Ajustamos la vista inicial al plano original
+
+    # 4️⃣ Popups bajo demanda (un JSON por manzana junto al HTML, ya escritos)
+    PopupsDiferidos(url_datos, archivos_popups).add_to(m)
+    Buscador(url_datos + archivo_buscador, capa_viviendas).add_to(m)
+    recursos.limpiar()
+    EstilosPopups().add_to(m)
+
+    # FINALMENTE, GUARDAR
+    with tramo("m.save") as t:
+        fijar_ids(m.get_root())
+        print(f"Guardando {sitio.salida}...")
+        m.save(sitio.salida)
+        t["items"] = os.path.getsize(sitio.salida)
+    return [sitio.salida] + recursos.rutas
+
+
+# ========================================================
+# OVERLAY HTML (PANELES, LEYENDA Y LÓGICA JS)
+# ========================================================
+
+def overlay_html(avance_total_obra, total_plata_obra, total_posible_obra, html_opciones_cuadrillas, info_cuadrillas_js):
+    return r'''
+{% macro html(this, kwargs) %}
+<style>
+#panel-detalle-cuadrilla { position: fixed; top: 0; right: -400px; width: 350px; height: 100%; background: white; z-index: 10000; box-shadow: -5px 0 15px rgba(0,0,0,0.1); transition: right 0.3s ease; font-family: 'Segoe UI', Arial; display: flex; flex-direction: column; }
+#panel-detalle-cuadrilla.active { right: 0; }
+.item-cuadrilla:hover { background: #f9f9f9; }
+.casa-header:hover { background: #f5f5f5; }
+.tooltip-vivienda { background-color: white; border: 1px solid black; border-radius: 6px; font-family: Arial; font-size: 12px; }
+.tooltip-vivienda table { margin: auto; }
+.tooltip-vivienda tr { text-align: left; }
+.tooltip-vivienda th { padding: 2px; padding-right: 8px; }
+</style>
+
+<a href="https://maximilianoazar.github.io/control-avance-cimol" style="position: fixed; top: 20px; left: 60px; z-index: 9999; background: white; color: #2c3e50; text-decoration: none; padding: 10px 18px; border-radius: 50px; font-family: 'Segoe UI', Arial; font-size: 14px; font-weight: 600; box-shadow: 0 4px 12px rgba(0,0,0,0.15); border: 1px solid #eee; display: flex; align-items: center; gap: 8px;">
+    <svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2.5" stroke-linecap="round" stroke-linejoin="round"><line x1="19" y1="12" x2="5" y2="12"></line><polyline points="12 19 5 12 12 5"></polyline></svg>
+    <span>Volver al Inicio</span>
+</a>
+
+<div id="btn-toggle-view" onclick="toggleVista()" style="position: fixed; bottom: 30px; right: 20px; z-index: 9999; cursor: pointer; background: linear-gradient(135deg, #34495e, #2c3e50); color: white; padding: 12px 24px; border-radius: 8px; font-family: 'Segoe UI', Arial; font-size: 14px; font-weight: bold; border: 1px solid #1abc9c; display: flex; align-items: center; gap: 10px;">
+    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="#1abc9c" stroke-width="2.5" stroke-linecap="round" stroke-linejoin="round"><path d="M21 2v6h-6"></path><path d="M3 12a9 9 0 0 1 15-6.7L21 8"></path><path d="M3 22v-6h6"></path><path d="M21 12a9 9 0 0 1-15 6.7L3 16"></path></svg>
+    <span id="texto-toggle">Cambiar Pestaña a Tratos</span>
+</div>
+
+<div id="tarjeta-fisico" style="position: fixed; top: 20px; right: 20px; z-index: 9999; background: white; padding: 16px; border-radius: 12px; box-shadow: 0 4px 14px rgba(0,0,0,0.25); font-family: 'Segoe UI', Arial; width: 220px; transition: opacity 0.3s;">
+    <div style="font-weight: bold; font-size: 13px; color: #555; margin-bottom: 8px;">Avance Físico Obra</div>
+    <div style="font-size: 26px; font-weight: bold; color: #2c7be5; text-align: center; margin-bottom: 8px;">''' + str(avance_total_obra) + r'''%</div>
+    <div style="background: #e0e0e0; border-radius: 8px; height: 12px; overflow: hidden;"><div style="width: ''' + str(avance_total_obra) + r'''%; height: 100%; background: linear-gradient(90deg, #27ae60, #2ecc71);"></div></div>
+</div>
+
+<div id="tarjeta-tratos" style="position: fixed; top: 20px; right: 20px; z-index: 9999; background: white; padding: 16px; border-radius: 12px; box-shadow: 0 4px 14px rgba(0,0,0,0.25); font-family: 'Segoe UI', Arial; width: 220px; opacity: 0; pointer-events: none; transition: opacity 0.3s;">
+    <div style="font-weight: bold; font-size: 13px; color: #555; margin-bottom: 8px;">Avance de Tratos</div>
+    <div style="font-size: 19px; font-weight: bold; color: #1abc9c; text-align: center; margin-bottom: 8px;">''' + str(formatear_plata(total_plata_obra)) + r'''</div>
+    <div style="font-size: 10px; color: #7f8c8d; text-align: center;">Presupuesto: ''' + str(formatear_plata(total_posible_obra)) + r'''</div>
+</div>
+
+<div id="leyenda-fisico" style="position: fixed; bottom: 30px; left: 20px; z-index: 9999; background: rgba(255, 255, 255, 0.9); padding: 12px 18px; border-radius: 12px; box-shadow: 0 4px 15px rgba(0,0,0,0.15); font-family: 'Segoe UI', Arial; border: 1px solid rgba(0,0,0,0.05); backdrop-filter: blur(8px);">
+    <div style="font-weight: bold; font-size: 13px; margin-bottom: 8px; color: #333; text-transform: uppercase; letter-spacing: 0.5px;">Referencia de Avance</div>
+    <div style="display: grid; grid-template-columns: repeat(4, auto); gap: 10px 20px; align-items: center;">
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #F2FF0D; border-radius: 50%; border: 1px solid #d4d400; display: flex; align-items: center; justify-content: center; font-size: 10px; font-weight: bold; color: #333;">!</div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">Observaciones</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #00FF19; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1);"></div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">100% Finalizado</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #00F2FF; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1);"></div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">85% - 99%</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #000DFF; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1);"></div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">70% - 85%</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #C300FF; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1);"></div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">50% - 70%</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #FF00AA; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1);"></div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">30% - 50%</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #FF8400; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1);"></div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">10% - 30%</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px;">
+            <div style="width: 14px; height: 14px; background: #D10000; border-radius: 3px; border: 1px solid rgba(0,0,0,0.1);"></div>
+            <span style="font-size: 11px; color: #444; white-space: nowrap;">0% - 10%</span>
+        </div>
+    </div>
+</div>
+
+<div id="cont-cuadrillas" style="position: fixed; bottom: 30px; left: 60px; z-index: 9999; display:none; background:white; border-radius:12px; box-shadow:0 4px 15px rgba(0,0,0,0.2); width:230px; border:1px solid #1abc9c; overflow:hidden;">
+    <div onclick="toggleMenuCuadrillas()" style="background:#1abc9c; color:white; padding:10px; font-weight:bold; cursor:pointer; display:flex; justify-content:space-between; align-items:center;">
+        <span style="font-size:13px;">FILTRAR CUADRILLA</span><span id="flecha-menu">▼</span>
+    </div>
+    <div id="lista-cuadrillas-scroll" style="max-height:0px; overflow-y:auto; transition: max-height 0.3s ease-out;">
+        ''' + html_opciones_cuadrillas + r'''
+    </div>
+</div>
+
+<div id="panel-detalle-cuadrilla">
+    <div style="background:#2c3e50; color:white; padding:20px;">
+        <div style="display:flex; justify-content:space-between; align-items:center;">
+            <div style="display:flex; align-items:baseline; gap:8px;">
+                <span id="det-id" style="background:#1abc9c; padding:2px 6px; border-radius:4px; font-size:11px; font-weight:bold;"></span>
+                <h3 id="det-nombre" style="margin:0; font-size:18px;"></h3>
+            </div>
+            <button onclick="cerrarDetalle()" style="background:none; border:none; color:white; font-size:24px; cursor:pointer;">×</button>
+        </div>
+        <p id="det-rep" style="margin:8px 0 0 0; opacity:0.9; font-size:14px; font-weight:500;"></p>
+    </div>
+    <div style="background:#1abc9c; color:white; padding:15px; text-align:center;">
+        <div style="font-size:10px; text-transform:uppercase; letter-spacing:1px;">Total Acumulado Ganado</div>
+        <div id="det-monto" style="font-size:24px; font-weight:bold;"></div>
+    </div>
+    <div id="det-lista" style="padding:20px; overflow-y:auto; flex-grow:1;"></div>
+</div>
+
+<script>
+var vista_actual = 'fisico';
+var cuadrilla_abierta = null;
+var nombre_cuadrilla_filtro = 'TODAS';
+var datosC = ''' + json.dumps(info_cuadrillas_js) + r''';
+
+// Igual que formatear_plata() en obras/plata.py
+function formatearPlata(valor) {
+    if (valor <= 0) return "$ -";
+    return "$" + String(Math.trunc(valor)).replace(/\B(?=(\d{3})+(?!\d))/g, ".") + " pesos";
+}
+
+function toggleDetalleCuadrilla(n) {
+    if (cuadrilla_abierta === n) { cerrarDetalle(); return; }
+    let d = datosC[n];
+    document.getElementById('det-id').innerText = "ID: " + d.id;
+    document.getElementById('det-nombre').innerText = n;
+    document.getElementById('det-rep').innerText = "👤 Representante: " + d.representante;
+    document.getElementById('det-monto').innerText = new Intl.NumberFormat('es-CL', {style:'currency', currency:'CLP'}).format(d.total_pagado);
+
+    let lista = document.getElementById('det-lista');
+    lista.innerHTML = '<h4 style="font-size:12px; color:#999; border-bottom:1px solid #eee; padding-bottom:5px; margin-top:0;">CASAS Y DESGLOSE</h4>';
+
+    if(d.tratos_realizados.length === 0) {
+        lista.innerHTML += '<p style="font-size:11px; color:#ccc;">No hay registros.</p>';
+    } else {
+        d.tratos_realizados.sort((a, b) => {
+            if (a.mzn_sort < b.mzn_sort) return -1;
+            if (a.mzn_sort > b.mzn_sort) return 1;
+            return a.num_sort - b.num_sort;
+        });
+
+        d.tratos_realizados.forEach((t, index) => {
+            let idAcc = "acc-" + index;
+            let partidasHtml = t.partidas.map(p => `
+                <div style="display:flex; justify-content:space-between; font-size:10px; padding:4px 0; color:#7f8c8d; border-bottom:1px solid #f2f2f2;">
+                    <span>${p.nombre}</span>
+                    <span style="font-weight:bold;">$${new Intl.NumberFormat('es-CL').format(p.precio)}</span>
+                </div>
+            `).join('');
+
+            lista.innerHTML += `
+                <div style="border-bottom:1px solid #eee; margin-bottom:5px;">
+                    <div class="casa-header" onclick="document.getElementById('${idAcc}').style.display = document.getElementById('${idAcc}').style.display === 'none' ? 'block' : 'none'"
+                         style="display:flex; justify-content:space-between; padding:10px 0; cursor:pointer; font-size:12px; align-items:center;">
+                        <span style="color:#34495e; font-weight:600;">🏠 ${t.casa}</span>
+                        <div style="text-align:right;">
+                            <span style="font-weight:bold; color:#27ae60;">$${new Intl.NumberFormat('es-CL').format(t.monto_total)}</span>
+                            <span style="font-size:10px; color:#1abc9c; margin-left:5px;">▼</span>
+                        </div>
+                    </div>
+                    <div id="${idAcc}" style="display:none; background:#f9f9f9; padding:5px 12px 10px 12px; border-radius:4px; margin-bottom:8px;">
+                        ${partidasHtml}
+                    </div>
+                </div>`;
+        });
+    }
+    document.getElementById('panel-detalle-cuadrilla').classList.add('active');
+    cuadrilla_abierta = n;
+    filtrarC(n);
+}
+
+function cerrarDetalle() {
+    document.getElementById('panel-detalle-cuadrilla').classList.remove('active');
+    cuadrilla_abierta = null;
+}
+
+function toggleMenuCuadrillas() {
+    let l = document.getElementById('lista-cuadrillas-scroll');
+    let f = document.getElementById('flecha-menu');
+    if (l.style.maxHeight === '0px' || l.style.maxHeight === '') {
+        l.style.maxHeight = '350px'; f.innerText = '▲';
+    } else {
+        l.style.maxHeight = '0px'; f.innerText = '▼';
+    }
+}
+
+function filtrarC(nombre, cerrarPopup) {
+    nombre_cuadrilla_filtro = nombre.toUpperCase().trim();
+
+    var estiloPrevio = document.getElementById('estilo-resaltado-cuadrilla');
+    if (estiloPrevio) estiloPrevio.remove();
+
+    if (nombre !== 'TODAS') {
+        var style = document.createElement('style');
+        style.id = 'estilo-resaltado-cuadrilla';
+        style.innerHTML = `
+            .fila-trato { opacity: 0.3; transition: all 0.3s; }
+            .fila-trato[data-cuadrilla="${nombre}"] {
+                opacity: 1 !important;
+                background-color: #fff3cd !important;
+                border-left: 5px solid #f1c40f !important;
+                font-weight: bold !important;
+                transform: scale(1.02);
+            }`;
+        document.head.appendChild(style);
+    }
+
+    restilarViviendas(cerrarPopup);
+}
+
+// Las dos vistas son la misma capa: cambiar de vista solo la re-estiliza
+function toggleVista() {
+    if(vista_actual === 'fisico') {
+        vista_actual = 'tratos';
+        document.getElementById('texto-toggle').innerText = 'Cambiar a Avance Físico';
+        document.getElementById('tarjeta-fisico').style.opacity = '0';
+        document.getElementById('tarjeta-tratos').style.opacity = '1';
+        document.getElementById('tarjeta-tratos').style.pointerEvents = 'auto';
+        document.getElementById('cont-cuadrillas').style.display = 'block';
+        if(document.getElementById('leyenda-fisico')) document.getElementById('leyenda-fisico').style.display = 'none';
+        restilarViviendas(true);
+    } else {
+        vista_actual = 'fisico';
+        document.getElementById('texto-toggle').innerText = 'Cambiar Pestaña a Tratos';
+        document.getElementById('tarjeta-fisico').style.opacity = '1';
+        document.getElementById('tarjeta-tratos').style.opacity = '0';
+        document.getElementById('cont-cuadrillas').style.display = 'none';
+        if(document.getElementById('leyenda-fisico')) document.getElementById('leyenda-fisico').style.display = 'block';
+        cerrarDetalle();
+        filtrarC('TODAS', true);
+    }
+}
+</script>
+{% endmacro %}
+'''
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo compacto de partidas y avance por casa.
+
+Antes cada par casa-partida era un dict con seis textos ('titulo',
+'subtitulo', 'partida', 'estado', 'tiene_obs', 'comentario') repetido para
+todas las casas. Ahora:
+
+- CatalogoPartidas guarda una sola vez cada partida (item, descripción,
+  título y subtítulo).
+- DetalleCasa guarda, por casa, la tupla de índices del catálogo (compartida
+  por todas las casas de una misma hoja) y dos bitsets: partidas terminadas
+  y partidas con observación. Los comentarios se guardan solo donde existen.
+"""
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True, slots=True)
+class Partida:
+    item: str
+    descripcion: str
+    titulo: str
+    subtitulo: str
+
+    @property
+    def nombre(self):
+        """Texto mostrado en el popup: '[ITEM] Descripción'."""
+        return f"[{self.item}] {self.descripcion}"
+
+
+class CatalogoPartidas:
+    """Partidas únicas (item, descripción, título, subtítulo) indexadas por posición."""
+
+    __slots__ = ("partidas", "_indice")
+
+    def __init__(self):
+        self.partidas = []
+        self._indice = {}
+
+    def registrar(self, item, descripcion, titulo, subtitulo):
+        partida = Partida(item, descripcion, titulo, subtitulo)
+        idx = self._indice.get(partida)
+        if idx is None:
+            idx = self._indice[partida] = len(self.partidas)
+            self.partidas.append(partida)
+        return idx
+
+    def __getitem__(self, idx):
+        return self.partidas[idx]
+
+    def __len__(self):
+        return len(self.partidas)
+
+
+@dataclass(slots=True)
+class DetalleCasa:
+    """
+    Partidas de una casa con su estado.
+
+    El bit `pos` de `terminadas` / `observadas` corresponde a `partidas[pos]`.
+    """
+    partidas: tuple = ()
+    terminadas: int = 0
+    observadas: int = 0
+    comentarios: dict = field(default_factory=dict)  # pos -> comentario
+
+    def agregar(self, partidas, terminadas):
+        """Agrega las partidas de otra hoja a continuación de las actuales."""
+        desplazamiento = len(self.partidas)
+        self.partidas = self.partidas + partidas
+        self.terminadas |= terminadas << desplazamiento
+
+    def esta_terminada(self, pos):
+        return (self.terminadas >> pos) & 1 == 1
+
+    def tiene_obs(self, pos):
+        return (self.observadas >> pos) & 1 == 1
+
+    def observar(self, pos, comentario):
+        self.observadas |= 1 << pos
+        self.comentarios[pos] = comentario
+
+    @property
+    def total(self):
+        return len(self.partidas)
+
+    @property
+    def hechas(self):
+        return self.terminadas.bit_count()
+
+    def avance(self):
+        total = self.total
+        return round((self.hechas / total) * 100, 1) if total > 0 else 0
+
+    def filtrar(self, posiciones, partidas=None):
+        """
+        Nuevo DetalleCasa con solo las posiciones indicadas (en orden).
+
+        `partidas` permite pasar una tupla ya construida para compartirla
+        entre casas con el mismo resultado de filtro.
+        """
+        if partidas is None:
+            partidas = tuple(self.partidas[pos] for pos in posiciones)
+        terminadas = observadas = 0
+        comentarios = {}
+        for nueva, pos in enumerate(posiciones):
+            if (self.terminadas >> pos) & 1:
+                terminadas |= 1 << nueva
+            if (self.observadas >> pos) & 1:
+                observadas |= 1 << nueva
+                comentarios[nueva] = self.comentarios[pos]
+        return DetalleCasa(partidas, terminadas, observadas, comentarios)
+
+    def items(self, catalogo):
+        """Recorre (Partida, terminada, tiene_obs, comentario) en orden."""
+        for pos, idx in enumerate(self.partidas):
+            tiene_obs = (self.observadas >> pos) & 1 == 1
+            yield (
+                catalogo[idx],
+                (self.terminadas >> pos) & 1 == 1,
+                tiene_obs,
+                self.comentarios.get(pos, "") if tiene_obs else "",
+            )
+
+
+class TuplasCompartidas:
+    """Reutiliza una misma tupla para todas las casas que tienen las mismas partidas."""
+
+    __slots__ = ("_tuplas",)
+
+    def __init__(self):
+        self._tuplas = {}
+
+    def __call__(self, valores):
+        t = tuple(valores)
+        return self._tuplas.setdefault(t, t)
+
+
+# ========================================================
+# LECTURA DE UNA HOJA "MANZ." DEL CR
+# ========================================================
+
+def leer_hoja_avance(datos, letra_mz, llaves, lista_maestra_llaves, catalogo, tuplas, detalles):
+    """
+    Agrega a `detalles` (id_casa -> DetalleCasa) las partidas de una hoja del CR.
+
+    `datos` es la grilla de get_all_values(). Solo se consideran las partidas
+    cuya llave ITEM-DESCRIPCIÓN está en el maestro; las demás filas actualizan
+    el título o subtítulo vigente. Devuelve el número de partidas leídas.
+    """
+    fila_item_idx = next((i for i, f in enumerate(datos[:50]) if f and str(f[0]).strip().upper() == "ITEM"), None)
+    if fila_item_idx is None: return 0
+
+    columnas_casas = []
+    for i_s in range(max(0, fila_item_idx - 2), min(len(datos), fila_item_idx + 3)):
+        for c_idx, val in enumerate(datos[i_s]):
+            if c_idx > 1 and str(val).strip().isdigit():
+                num_casa = int(str(val).strip())
+                if not any(x[1] == num_casa for x in columnas_casas):
+                    columnas_casas.append((c_idx, num_casa))
+
+    # Cada casa de la hoja se registra una sola vez
+    columnas_ids = [(c_idx, llaves.casa(letra_mz, num_casa)) for c_idx, num_casa in columnas_casas]
+
+    titulo_act = ""
+    sub_act = ""
+    partidas_hoja = []                        # índices del catálogo, en orden de la hoja
+    terminadas_hoja = [0] * len(columnas_ids) # bitset de partidas terminadas por casa
+
+    for i in range(fila_item_idx + 1, len(datos)):
+        fila = datos[i]
+        if not fila or not str(fila[0]).strip(): continue
+
+        item_val = str(fila[0]).strip()
+        desc_val = str(fila[1]).strip()
+
+        if llaves.buscar_partida(item_val, desc_val) not in lista_maestra_llaves:
+            if "." not in item_val:
+                titulo_act = desc_val
+                sub_act = ""
+            else:
+                sub_act = desc_val
+            continue
+
+        bit = 1 << len(partidas_hoja)
+        partidas_hoja.append(catalogo.registrar(item_val, desc_val, titulo_act, sub_act))
+
+        for n, (col_idx, _) in enumerate(columnas_ids):
+            v_celda = fila[col_idx] if col_idx < len(fila) else ""
+            if v_celda is not None and str(v_celda).strip() != "":
+                terminadas_hoja[n] |= bit
+
+    if not partidas_hoja: return 0
+
+    # Todas las casas de la hoja comparten la misma tupla de partidas
+    partidas_hoja = tuplas(partidas_hoja)
+    for (_, id_casa), terminadas in zip(columnas_ids, terminadas_hoja):
+        if id_casa in detalles:
+            detalles[id_casa].agregar(partidas_hoja, terminadas)
+        else:
+            detalles[id_casa] = DetalleCasa(partidas_hoja, terminadas)
+    return len(partidas_hoja)
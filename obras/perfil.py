@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Perfilado de una corrida (--profile).
+
+Envuelve el build en cProfile y tracemalloc y deja en la carpeta del caché,
+junto a build_report.json:
+  - perfil.prof: estadísticas de cProfile (para snakeviz o pstats)
+  - perfil_hotspots.txt: funciones ordenadas por tiempo propio y por tiempo acumulado
+  - perfil_memoria.txt: pico de memoria y líneas que más asignaron en cada etapa
+
+Las asignaciones por etapa también quedan en build_report.json. Con el
+perfilado activo el build tarda bastante más (sobre todo por tracemalloc):
+los tiempos sirven para comparar funciones entre sí, no con una corrida normal.
+"""
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+
+PERFIL = "perfil"
+FUNCIONES = 40  # filas de cada tabla de hotspots
+MARCOS = 1      # marcos de pila que guarda tracemalloc por asignación (la línea que asignó)
+
+
+@contextmanager
+def perfilar(activo=True):
+    """Activa cProfile y tracemalloc mientras dura el bloque. Entrega el Profile (None si no está activo)."""
+    if not activo:
+        yield None
+        return
+    perfil = cProfile.Profile()
+    tracemalloc.start(MARCOS)
+    perfil.enable()
+    try:
+        yield perfil
+    finally:
+        perfil.disable()
+        tracemalloc.stop()
+
+
+def estadisticas(perfil, salida=None):
+    """
+    pstats.Stats del perfil sin las funciones de tracemalloc: el snapshot de
+    cada etapa cuesta tiempo que no es del build (sí quedan en perfil.prof).
+    """
+    stats = pstats.Stats(perfil, stream=salida)
+    stats.stats = {f: v for f, v in stats.stats.items() if not f[0].endswith("tracemalloc.py") and "_tracemalloc" not in f[2]}
+    return stats
+
+
+def tabla_hotspots(perfil):
+    salida = io.StringIO()
+    for orden, titulo in (("tottime", "tiempo propio"), ("cumulative", "tiempo acumulado")):
+        salida.write(f"===== Funciones por {titulo} (sin tracemalloc) =====\n")
+        estadisticas(perfil, salida).strip_dirs().sort_stats(orden).print_stats(FUNCIONES)
+    return salida.getvalue()
+
+
+def tabla_memoria(informe):
+    lineas = []
+    for nombre, fila in informe.items():
+        if "asignaciones" not in fila: continue
+        lineas.append(f"===== {nombre}: pico {fila['pico_memoria'] / 2**20:,.1f} MiB =====")
+        for a in fila["asignaciones"]:
+            lineas.append(f"{a['bytes'] / 2**10:>12,.1f} KiB {a['bloques']:>9,} bloques  {a['lugar']}")
+        lineas.append("")
+    return "\n".join(lineas) or "Ninguna etapa se ejecutó (todo salió del caché).\n"
+
+
+def escribir(perfil, carpeta, informe):
+    """Escribe perfil.prof y las tablas de hotspots y memoria en `carpeta`. Devuelve las rutas."""
+    base = os.path.join(carpeta, PERFIL)
+    perfil.dump_stats(base + ".prof")
+    for sufijo, texto in (("_hotspots.txt", tabla_hotspots(perfil)), ("_memoria.txt", tabla_memoria(informe))):
+        with open(base + sufijo, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+    print(f"🔬 Perfil en {base}.prof, {base}_hotspots.txt y {base}_memoria.txt. Más tiempo propio:")
+    funciones = sorted(estadisticas(perfil).stats.items(), key=lambda s: s[1][2], reverse=True)
+    for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in funciones[:5]:
+        print(f"   {propio:>7.2f}s {acumulado:>7.2f}s acum. {llamadas:>9,}×  {funcion} ({os.path.basename(archivo)}:{linea})")
+    return [base + ".prof", base + "_hotspots.txt", base + "_memoria.txt"]
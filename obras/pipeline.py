@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""
+Build de un plano de obra expresado como etapas con caché.
+
+    imagen → geometria → manzanas → numeracion ┐
+    hoja_cr, hoja_partidas, hoja_pre_f1 ───────┴→ avance ┐
+    hoja_tratos, hoja_asignacion ───────────────────────┴→ tratos → cuadrillas → mapa, exportar, historial
+
+Cada script de obra define un `Sitio` (plano, reglas de manzanas, numeración,
+nombres de planillas y márgenes del mapa) y su `main()` llama a
+`ejecutar(sitio)`. Desde otro programa (benchmarks, un proceso que queda
+corriendo) se usa `construir(sitio, ...)`, que no lee la línea de comandos ni
+termina el proceso y permite pedir solo algunas etapas. Todas las obras juntas
+se construyen con construir_obras.py (obras/sitios.py).
+Con `--explain` se muestra por qué cada etapa se ejecutó o se reutilizó; al
+final siempre se imprime una tabla de tiempos (real, CPU, elementos) y se
+guarda el mismo informe en build_report.json.
+
+La etapa 'exportar' deja los mismos datos en JSON, CSV y Parquet junto al
+HTML (ver obras/exportar.py) y 'historial' agrega una instantánea del
+avance a historial.sqlite en la carpeta base del caché (ver obras/historial.py). Al final se
+escribe el manifiesto de lo publicado (ruta -> huella de cada archivo) en la
+carpeta del caché. Con `--estado-sin-cambios` el script termina con código
+SIN_CAMBIOS si es igual al de la corrida anterior, para que el workflow no
+vuelva a publicar lo mismo.
+"""
+import argparse
+import copy
+import json
+import os
+import pickle
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from obras import avance as m_avance, geometria as m_geometria, historial as m_historial, llaves as m_llaves
+from obras import perfil as m_perfil, tratos as m_tratos
+from obras.etapas import Archivo, Etapa, Pipeline, Planilla, huella_archivo
+from obras.planillas import conectar, descargar_hojas, fecha_modificacion
+
+DIRECTORIO_CACHE = ".cache_obra"
+MANIFIESTO = "manifiesto.json"
+REPORTE = "build_report.json"
+ETAPAS_PUBLICADAS = ("mapa", "exportar")  # sus salidas son {archivo: huella} de lo que se publica
+SIN_CAMBIOS = 3  # código de salida con --estado-sin-cambios cuando no cambió ningún archivo publicado
+
+
+@dataclass
+class Sitio:
+    nombre: str                # subcarpeta del caché
+    script: str                # archivo con la definición del sitio (sus cambios invalidan las etapas que lo usan)
+    imagen: str
+    manzanas: dict             # letra -> regla (lambda x, y) o lista de reglas
+    numerar: object            # casas_por_manzana -> mapa_numeros (idx -> número)
+    tipos_ref: dict            # "Tipo X" -> ["A1", ...]
+    limites: object            # (h, w) -> dict(min_lat, max_lat, min_lon, max_lon) del mapa
+    salida: str
+    planilla_cr: str
+    planilla_tratos: str
+    planilla_asignacion: str
+    manzanas_tratos: list = field(default_factory=list)
+    planilla_partidas: str = 'Partidas'
+    planilla_pre_f1: str = 'Pre F1'
+    canvas: object = None      # viviendas en canvas (True) o SVG (False); None = según cantidad de casas
+
+
+class Contexto:
+    """
+    Estado compartido por las etapas de una corrida: el sitio, la conexión a
+    Google y las planillas comunes a varias obras ya descargadas (ver
+    obras/sitios.py): titulo -> {"fecha", "datos"}, con los datos en pickle o
+    None si ningún sitio necesitaba descargarlos.
+    """
+
+    def __init__(self, sitio, compartidas=None):
+        self.sitio = sitio
+        self.directorio = None  # carpeta del caché del sitio; la fija Pipeline.ejecutar
+        self._gc = None
+        self._planillas = {}
+        self.compartidas = compartidas or {}
+
+    @property
+    def gc(self):
+        # La autenticación se hace solo si alguna etapa o huella necesita Google Sheets
+        if self._gc is None:
+            self._gc = conectar()
+        return self._gc
+
+    def para(self, sitio):
+        """Contexto de otro sitio que reutiliza esta conexión, las planillas abiertas y las compartidas."""
+        otro = Contexto(sitio, self.compartidas)
+        otro._gc, otro._planillas = self._gc, self._planillas
+        return otro
+
+    def abrir(self, titulo):
+        if titulo not in self._planillas:
+            self._planillas[titulo] = self.gc.open(titulo)
+        return self._planillas[titulo]
+
+    def olvidar(self, titulos):
+        """Descarta las planillas abiertas `titulos` (cambiaron en Drive): se vuelven a abrir al pedirlas."""
+        for titulo in titulos:
+            self._planillas.pop(titulo, None)
+
+    def descargar(self, titulo, leer):
+        """`leer(planilla)`, salvo que la planilla sea compartida y ya esté descargada."""
+        compartida = self.compartidas.get(titulo)
+        if compartida and compartida["datos"] is not None:
+            return pickle.loads(compartida["datos"])
+        return leer(self.abrir(titulo))
+
+    def fecha_planilla(self, titulo):
+        if titulo in self.compartidas:
+            return self.compartidas[titulo]["fecha"]
+        sh = self.abrir(titulo)
+        return f"{sh.id}@{fecha_modificacion(sh)}"
+
+
+# ========================================================
+# ETAPAS: PLANO
+# ========================================================
+
+def etapa_imagen(ctx):
+    return m_geometria.cargar_imagen(ctx.sitio.imagen)
+
+def etapa_geometria(ctx, imagen):
+    return m_geometria.detectar_casas(imagen)
+
+def etapa_manzanas(ctx, geometria):
+    return m_geometria.asignar_manzanas(geometria["centroides"], ctx.sitio.manzanas)
+
+def etapa_numeracion(ctx, manzanas):
+    return ctx.sitio.numerar(manzanas["casas_por_manzana"])
+
+
+# ========================================================
+# ETAPAS: DESCARGA DE PLANILLAS (grillas crudas)
+# ========================================================
+
+def etapa_hoja_cr(ctx):
+    return descargar_hojas(ctx.abrir(ctx.sitio.planilla_cr), "MANZ")
+
+def etapa_hoja_partidas(ctx):
+    try:
+        return ctx.descargar(ctx.sitio.planilla_partidas, lambda sh: sh.sheet1.get_all_values())
+    except Exception as e:
+        print(f"⚠️ Error cargando maestro: {e}")
+        return []
+
+def etapa_hoja_pre_f1(ctx):
+    try:
+        return ctx.descargar(ctx.sitio.planilla_pre_f1, lambda sh: descargar_hojas(sh, "MZ"))
+    except Exception as e:
+        print(f"Advertencia: No se pudo cargar '{ctx.sitio.planilla_pre_f1}': {e}")
+        return []
+
+def etapa_hoja_tratos(ctx):
+    try:
+        datos_tratos = ctx.abrir(ctx.sitio.planilla_tratos).worksheet('TRATOS VIVIENDA').get_all_values()
+        print("✅ Archivo de Tratos detectado.")
+        return datos_tratos
+    except Exception as e:
+        print(f"⚠️ Error al abrir el archivo: {e}")
+        return []
+
+def etapa_hoja_asignacion(ctx):
+    sh_asignacion = ctx.abrir(ctx.sitio.planilla_asignacion)
+    print(f"✅ Archivo '{ctx.sitio.planilla_asignacion}' conectado.")
+    hojas_mz = {}
+    for letra in ctx.sitio.manzanas_tratos:
+        try:
+            hojas_mz[letra] = sh_asignacion.worksheet(f"MZ {letra}").get_all_values()
+        except Exception as e:
+            print(f"Aviso en MZ {letra}: {e}")
+    return {"cuadrillas": sh_asignacion.worksheet('CUADRILLAS').get_all_values(), "manzanas": hojas_mz}
+
+
+# ========================================================
+# ETAPAS: AVANCE, TRATOS, CUADRILLAS Y MAPA
+# ========================================================
+
+def etapa_avance(ctx, hoja_cr, hoja_partidas, hoja_pre_f1, manzanas, numeracion):
+    llaves = m_llaves.RegistroLlaves()
+    observaciones = m_avance.leer_observaciones(hoja_pre_f1, llaves)
+    lista_maestra_llaves = m_avance.leer_maestro(hoja_partidas, llaves)
+    catalogo, tuplas, detalles = m_avance.leer_avances(hoja_cr, llaves, lista_maestra_llaves)
+    m_avance.vincular_observaciones(detalles, catalogo, observaciones)
+
+    tipos = m_avance.clasificar_tipos(manzanas["mapa_manzanas"], numeracion, llaves, ctx.sitio.tipos_ref)
+    detalles_filtrado, avances_filtrado = m_avance.filtrar_por_tipo(detalles, catalogo, tipos, llaves, tuplas)
+
+    avance_total_obra = round(sum(avances_filtrado.values()) / len(avances_filtrado), 1)
+    print(f"🏗️ Avance total de la obra: {avance_total_obra}%")
+
+    return {"llaves": llaves, "catalogo": catalogo, "tipos": tipos, "detalles": detalles_filtrado,
+            "avances": avances_filtrado, "avance_total_obra": avance_total_obra}
+
+def etapa_tratos(ctx, avance, hoja_tratos, hoja_asignacion):
+    # Copia del registro: las llaves de tratos se agregan sin tocar la salida de 'avance'
+    llaves = copy.deepcopy(avance["llaves"])
+    precios = m_tratos.leer_precios_tratos(hoja_tratos, llaves)
+    asignacion = m_tratos.leer_asignacion(hoja_asignacion["cuadrillas"], hoja_asignacion["manzanas"], llaves)
+    return {"llaves": llaves, **precios, **asignacion}
+
+# mapa (folium, cv2) y exportar (pyarrow) se importan dentro de las etapas:
+# si todo sale del caché, la corrida no paga esos imports.
+
+def etapa_cuadrillas(ctx, geometria, manzanas, numeracion, avance, tratos):
+    from obras import mapa as m_mapa
+    llaves = tratos["llaves"]
+    casas = ((mz, num, key) for _, mz, num, key in m_mapa.casas_del_plano(geometria, manzanas, numeracion, llaves))
+    return m_tratos.resumir_cuadrillas(casas, avance["tipos"], tratos, llaves)
+
+def etapa_mapa(ctx, geometria, manzanas, numeracion, avance, tratos, cuadrillas):
+    from obras import mapa as m_mapa
+    archivos = m_mapa.construir_mapa(ctx.sitio, geometria, manzanas, numeracion, avance, tratos, cuadrillas)
+    return {ruta: huella_archivo(ruta) for ruta in archivos}
+
+def etapa_exportar(ctx, geometria, manzanas, numeracion, avance, tratos, cuadrillas):
+    from obras import exportar as m_exportar, mapa as m_mapa
+    casas = ((mz, num, key) for _, mz, num, key in m_mapa.casas_del_plano(geometria, manzanas, numeracion, tratos["llaves"]))
+    tablas = m_exportar.armar_tablas(casas, avance, tratos, cuadrillas)
+    archivos = m_exportar.exportar(m_exportar.carpeta_export(ctx.sitio.salida), tablas)
+    return {ruta: huella_archivo(ruta) for ruta in archivos}
+
+def etapa_historial(ctx, avance, cuadrillas):
+    # En la carpeta que contiene los cachés de los sitios (.cache_obra, o la base de --cache):
+    # lo comparten todas las obras que se construyen con ese caché
+    ruta = m_historial.ruta_historial(ctx.directorio)
+    return m_historial.agregar(ruta, ctx.sitio.nombre, m_historial.armar_instantanea(avance, cuadrillas))
+
+def archivos_vigentes(salida):
+    """La salida de 'mapa' son archivos fuera del caché: siguen vigentes si existen sin cambios."""
+    return all(os.path.exists(ruta) and huella_archivo(ruta) == huella for ruta, huella in salida.items())
+
+
+def actualizar_manifiesto(ruta, archivos):
+    """
+    Guarda el manifiesto {ruta relativa: huella} de los archivos publicados y
+    lo compara con el anterior. Devuelve las rutas nuevas, cambiadas o que ya
+    no se generan ([] si no cambió nada).
+    """
+    nuevo = {os.path.relpath(r).replace(os.sep, "/"): huella for r, huella in sorted(archivos.items())}
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            anterior = json.load(f)
+    except (OSError, ValueError):
+        anterior = None
+
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(nuevo, f, indent=1, sort_keys=True)
+    os.replace(ruta + ".tmp", ruta)
+
+    if anterior is None:
+        return sorted(nuevo)
+    return sorted(r for r in nuevo.keys() | anterior.keys() if nuevo.get(r) != anterior.get(r))
+
+
+def filas_hojas(hojas):
+    return sum(len(grilla) for _, grilla in hojas)
+
+
+def definir_etapas(sitio):
+    plano = Archivo(sitio.imagen)
+    script = Archivo(sitio.script)
+    return [
+        Etapa("imagen", etapa_imagen, entradas=[plano], cache=False,
+              contar=lambda img: img.shape[0] * img.shape[1], unidad="pixeles"),
+        Etapa("geometria", etapa_geometria, ["imagen"], codigo=["obras.geometria"],
+              contar=lambda g: len(g["casas_geometria"]), unidad="casas"),
+        Etapa("manzanas", etapa_manzanas, ["geometria"], entradas=[script], codigo=["obras.geometria"],
+              contar=lambda m: len(m["casas_por_manzana"]), unidad="manzanas"),
+        Etapa("numeracion", etapa_numeracion, ["manzanas"], entradas=[script], contar=len, unidad="casas"),
+        Etapa("hoja_cr", etapa_hoja_cr, entradas=[Planilla(sitio.planilla_cr)], contar=filas_hojas, unidad="filas"),
+        Etapa("hoja_partidas", etapa_hoja_partidas, entradas=[Planilla(sitio.planilla_partidas)],
+              contar=len, unidad="filas"),
+        Etapa("hoja_pre_f1", etapa_hoja_pre_f1, entradas=[Planilla(sitio.planilla_pre_f1)],
+              contar=filas_hojas, unidad="filas"),
+        Etapa("avance", etapa_avance, ["hoja_cr", "hoja_partidas", "hoja_pre_f1", "manzanas", "numeracion"],
+              entradas=[script], codigo=["obras.avance", "obras.modelo", "obras.llaves"],
+              contar=lambda a: len(a["detalles"]), unidad="casas"),
+        # Las grillas de tratos se descargan después de 'avance': las del CR ya se soltaron
+        Etapa("hoja_tratos", etapa_hoja_tratos, entradas=[Planilla(sitio.planilla_tratos)], contar=len, unidad="filas"),
+        Etapa("hoja_asignacion", etapa_hoja_asignacion, entradas=[Planilla(sitio.planilla_asignacion), script],
+              contar=lambda h: len(h["cuadrillas"]) + filas_hojas(h["manzanas"].items()), unidad="filas"),
+        Etapa("tratos", etapa_tratos, ["avance", "hoja_tratos", "hoja_asignacion"],
+              codigo=["obras.tratos", "obras.plata", "obras.llaves"],
+              contar=lambda t: len(t["estructura"]), unidad="tratos"),
+        Etapa("cuadrillas", etapa_cuadrillas, ["geometria", "manzanas", "numeracion", "avance", "tratos"],
+              codigo=["obras.tratos", "obras.mapa"], contar=lambda c: len(c["todas"]), unidad="cuadrillas"),
+        Etapa("mapa", etapa_mapa, ["geometria", "manzanas", "numeracion", "avance", "tratos", "cuadrillas"],
+              entradas=[plano, script], codigo=["obras.mapa", "obras.buscador", "obras.popups", "obras.plata", "obras.recursos"],
+              verificar=archivos_vigentes, contar=len, unidad="archivos"),
+        Etapa("exportar", etapa_exportar, ["geometria", "manzanas", "numeracion", "avance", "tratos", "cuadrillas"],
+              codigo=["obras.exportar", "obras.popups", "obras.plata"], verificar=archivos_vigentes, contar=len, unidad="archivos"),
+        Etapa("historial", etapa_historial, ["avance", "cuadrillas"], codigo=["obras.historial"],
+              verificar=m_historial.vigente, contar=lambda h: h["cambios"], unidad="cambios"),
+    ]
+
+
+def etapas_a_forzar(sitio, forzar):
+    """Valor de --forzar: None = ninguna, [] = todas, o las etapas indicadas."""
+    if forzar is None:
+        return ()
+    return forzar or [e.nombre for e in definir_etapas(sitio)]
+
+
+def construir(sitio, cache=None, forzar=(), objetivos=None, contexto=None, etapas=None):
+    """
+    Corre el pipeline del sitio sin pasar por la línea de comandos.
+
+    - cache: carpeta del caché de etapas (por defecto .cache_obra/<sitio>).
+    - forzar: etapas a recalcular aunque su caché siga vigente.
+    - objetivos: etapas que se quieren obtener (con sus dependencias); None = todas.
+    - contexto: Contexto de una corrida anterior, para reutilizar la conexión a Google.
+    - etapas: etapas a usar en vez de definir_etapas(sitio) (p. ej. desde una grabación).
+
+    Devuelve (pipeline, informe); `pipeline.salida(nombre)` entrega la salida
+    de cualquier etapa de la corrida.
+    """
+    pipeline = Pipeline(etapas or definir_etapas(sitio), cache or os.path.join(DIRECTORIO_CACHE, sitio.nombre))
+    informe = pipeline.ejecutar(contexto or Contexto(sitio), forzar=forzar, objetivos=objetivos)
+    return pipeline, informe
+
+
+def registrar(sitio, pipeline, informe, inicio, reporte=None):
+    """
+    Escribe build_report.json (con el tamaño del índice del buscador, ver
+    obras/buscador.py) y el manifiesto de lo publicado en el caché.
+    Devuelve los archivos publicados que cambiaron ([] si ninguno).
+    """
+    from obras import buscador as m_buscador  # importa obras.popups (jinja2): solo al terminar el build
+    publicados = {}
+    for nombre in ETAPAS_PUBLICADAS:
+        publicados.update(pipeline.salida(nombre))
+
+    ruta_reporte = reporte or os.path.join(pipeline.directorio, REPORTE)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"sitio": sitio.nombre, "inicio": inicio, **pipeline.reporte(informe),
+                   "buscador": m_buscador.informe(publicados)}, f, indent=1, ensure_ascii=False)
+    return actualizar_manifiesto(os.path.join(pipeline.directorio, MANIFIESTO), publicados)
+
+
+def correr(sitio, cache=None, forzar=(), explicar=False, reporte=None, contexto=None, etapas=None, perfil=False):
+    """
+    Build completo de un sitio como lo hace la línea de comandos: pipeline,
+    tablas de etapas y tiempos, build_report.json y manifiesto. Con `perfil`
+    el build corre bajo cProfile y tracemalloc (ver obras/perfil.py).
+    Devuelve (informe, archivos publicados que cambiaron).
+    """
+    inicio = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with m_perfil.perfilar(perfil) as perfilador:
+        pipeline, informe = construir(sitio, cache, forzar=forzar, contexto=contexto, etapas=etapas)
+
+    if explicar:
+        pipeline.explicar(informe)
+    pipeline.resumen(informe)
+    if perfilador:
+        m_perfil.escribir(perfilador, pipeline.directorio, informe)
+
+    cambios = registrar(sitio, pipeline, informe, inicio, reporte)
+    if cambios:
+        print(f"📦 {len(cambios)} archivo(s) publicados cambiaron: {', '.join(cambios[:5])}{' ...' if len(cambios) > 5 else ''}")
+    else:
+        print("📦 Sin cambios respecto de la corrida anterior.")
+    return informe, cambios
+
+
+def ejecutar(sitio, argv=None):
+    """
+    Punto de entrada de los scripts de obra: parsea la línea de comandos, corre
+    el pipeline y devuelve el código de salida (0, o SIN_CAMBIOS con
+    --estado-sin-cambios si no cambió nada publicado).
+    """
+    parser = argparse.ArgumentParser(description=f"Genera {sitio.salida} a partir del plano y las planillas.")
+    parser.add_argument("--explain", action="store_true",
+                        help="muestra por qué cada etapa se ejecutó o se reutilizó")
+    parser.add_argument("--forzar", nargs="*", metavar="ETAPA",
+                        help="recalcula las etapas indicadas (todas si no se indica ninguna)")
+    parser.add_argument("--cache", default=os.path.join(DIRECTORIO_CACHE, sitio.nombre),
+                        help="carpeta del caché de etapas")
+    parser.add_argument("--reporte", metavar="RUTA",
+                        help="dónde escribir el informe de tiempos (por defecto build_report.json en el caché)")
+    parser.add_argument("--estado-sin-cambios", action="store_true",
+                        help=f"termina con código {SIN_CAMBIOS} si los archivos publicados no cambiaron")
+    parser.add_argument("--profile", action="store_true",
+                        help="perfila el build (cProfile y tracemalloc) y deja los informes en el caché")
+    args = parser.parse_args(argv)
+
+    print(f"Directorio de trabajo actual: {os.getcwd()}")
+    _, cambios = correr(sitio, args.cache, forzar=etapas_a_forzar(sitio, args.forzar),
+                        explicar=args.explain, reporte=args.reporte, perfil=args.profile)
+    print("¡Proceso completado!")
+
+    return SIN_CAMBIOS if args.estado_sin_cambios and not cambios else 0
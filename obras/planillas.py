@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Acceso a Google Sheets: autenticación y descarga de pestañas.
+"""
+import json
+import os
+
+
+def conectar():
+    """
+    Cliente gspread autenticado.
+
+    En GitHub Actions las credenciales vienen en el Secreto GDRIVE_CREDENTIALS;
+    en local se busca el archivo 'GDRIVE_CREDENTIALS.json'.
+    """
+    import gspread  # solo al conectar: una corrida sin Google Sheets no lo carga
+    try:
+        if "GDRIVE_CREDENTIALS" in os.environ:
+            # Si existe la variable de entorno (GitHub Actions)
+            print("🔑 Detectado Secreto GDRIVE_CREDENTIALS. Iniciando sesión...")
+            creds_dict = json.loads(os.environ["GDRIVE_CREDENTIALS"])
+            gc = gspread.service_account_from_dict(creds_dict)
+        else:
+            # Fallback: Si no está la variable, intentamos buscar el archivo localmente (Para pruebas en tu PC)
+            print("⚠️ No se detectó variable de entorno. Buscando archivo 'GDRIVE_CREDENTIALS.json'...")
+            gc = gspread.service_account(filename='GDRIVE_CREDENTIALS.json')
+
+        print("✅ Autenticación exitosa.")
+        return gc
+
+    except Exception as e:
+        raise Exception(f"❌ Error crítico de autenticación: {e}. Revisa tus Secretos de GitHub.")
+
+
+def fecha_modificacion(sh):
+    """Fecha de última modificación en Drive ('modifiedTime') de una planilla abierta."""
+    propiedades = getattr(sh, "_properties", {})
+    return propiedades.get("modifiedTime") or sh.get_lastUpdateTime()
+
+
+def descargar_hojas(sh, marca):
+    """[(título, grilla)] de las pestañas cuyo título (en mayúsculas) contiene `marca`."""
+    return [(ws.title, ws.get_all_values()) for ws in sh.worksheets() if marca in ws.title.strip().upper()]
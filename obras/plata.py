@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Montos en pesos chilenos como enteros exactos.
+
+Los montos de la planilla de Tratos ("$ 123.456", "45.000,5") se convierten
+una sola vez a pesos enteros; las sumas se hacen en int64 con NumPy y el
+formato para mostrar vive solo aquí (formatear_plata).
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import numpy as np
+
+TIPOS_VIVIENDA = ("Tipo A1", "Tipo A1-N", "Tipo A2", "Tipo B", "Tipo C", "Tipo D")
+
+
+def parsear_monto(valor):
+    """'$ 1.234.567' o '1.234,5' -> 1234567 / 1235 (pesos enteros, redondeo al peso)."""
+    if not valor: return 0
+    txt = str(valor).replace('$', '').replace('.', '').replace(',', '.').strip()
+    try:
+        return int(Decimal(txt).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        return 0
+
+
+def sumar(montos):
+    """Suma exacta (int64) de una secuencia o arreglo de montos."""
+    return int(np.asarray(montos, dtype=np.int64).sum())
+
+
+def formatear_plata(valor):
+    if valor <= 0: return "$ -"
+    return f"${int(valor):,} pesos".replace(",", ".")
+
+
+class PreciosTratos:
+    """
+    Precio de cada partida de tratos por tipo de vivienda, en una matriz int64.
+
+    Las filas se identifican por el ID de trato del registro de llaves. Las
+    partidas sin precio valen 0.
+    """
+
+    __slots__ = ("tipos", "_col", "_fila", "_filas", "_matriz")
+
+    def __init__(self, tipos=TIPOS_VIVIENDA):
+        self.tipos = tuple(tipos)
+        self._col = {t: i for i, t in enumerate(self.tipos)}
+        self._fila = {}   # id_trato -> fila
+        self._filas = []
+        self._matriz = None
+
+    def agregar(self, id_trato, montos):
+        """`montos`: dict tipo -> pesos enteros. Si el trato ya existía se reemplaza."""
+        fila = [int(montos.get(t, 0)) for t in self.tipos]
+        if id_trato in self._fila:
+            self._filas[self._fila[id_trato]] = fila
+        else:
+            self._fila[id_trato] = len(self._filas)
+            self._filas.append(fila)
+        self._matriz = None
+
+    def __contains__(self, id_trato):
+        return id_trato in self._fila
+
+    def __len__(self):
+        return len(self._filas)
+
+    @property
+    def matriz(self):
+        """Matriz (n_tratos + 1, n_tipos); la última fila son ceros para tratos sin precio."""
+        if self._matriz is None:
+            self._matriz = np.zeros((len(self._filas) + 1, len(self.tipos)), dtype=np.int64)
+            if self._filas:
+                self._matriz[:-1] = np.asarray(self._filas, dtype=np.int64)
+        return self._matriz
+
+    def precio(self, id_trato, tipo):
+        fila = self._fila.get(id_trato)
+        col = self._col.get(tipo)
+        if fila is None or col is None: return 0
+        return int(self._filas[fila][col])
+
+    def filas(self, ids_trato):
+        """Índices de fila (arreglo) para una secuencia de IDs de trato."""
+        sin_precio = len(self._filas)
+        return np.fromiter((self._fila.get(i, sin_precio) for i in ids_trato), dtype=np.intp)
+
+    def vector(self, filas, tipo):
+        """Precios (int64) de las filas dadas para un tipo de vivienda."""
+        col = self._col.get(tipo)
+        if col is None: return np.zeros(len(filas), dtype=np.int64)
+        return self.matriz[filas, col]
+
+    def totales_por_tipo(self):
+        """Suma de cada columna de precios: tipo -> pesos."""
+        return {t: int(v) for t, v in zip(self.tipos, self.matriz.sum(axis=0))}
+
+
+# ========================================================
+# CONCILIACIÓN CONTRA LA PLANILLA DE TRATOS
+# ========================================================
+
+def leer_totales_planilla(datos, columnas_tipo, etiqueta, col_nombre=1):
+    """
+    Busca la fila de total de la hoja de tratos y devuelve tipo -> pesos.
+
+    La fila es la que dice exactamente `etiqueta` (sin importar mayúsculas,
+    espacios ni un ':' final): una partida como "TOTALIZADOR ..." no cuenta.
+    Devuelve {} si la hoja no tiene fila de total.
+    """
+    for fila in datos:
+        nombre = " ".join(str(fila[col_nombre]).upper().split()).rstrip(": ") if len(fila) > col_nombre else ""
+        if nombre == etiqueta:
+            return {t: parsear_monto(fila[c]) if c < len(fila) else 0 for t, c in columnas_tipo.items()}
+    return {}
+
+
+def conciliar(calculados, planilla):
+    """
+    Compara los totales calculados con los de la planilla (ambos tipo -> pesos).
+
+    Devuelve [(tipo, calculado, planilla, diferencia), ...] solo para los tipos
+    presentes en la planilla.
+    """
+    return [
+        (t, calculados.get(t, 0), total, calculados.get(t, 0) - total)
+        for t, total in planilla.items()
+    ]
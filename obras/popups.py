@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+HTML de los popups (avance físico y tratos) de cada vivienda.
+
+Los popups se generan con plantillas Jinja2 compiladas una vez; su HTML solo
+lleva clases y la hoja de estilos (ESTILOS_POPUPS) va una vez en la página.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+from jinja2 import Environment
+from markupsafe import escape
+
+from obras.etapas import huella_bytes
+from obras.plata import sumar, formatear_plata
+from obras.tratos import SIN_ESTADO_TRATO
+
+REGLAS_PARTIDAS = {
+    "B.4.4.1": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2"}},
+    "B.4.4.2": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2"}},
+    "B.5.3.1": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2"}},
+    "C.2.3.1.B": {"tipos": {"Tipo A1-N"}},
+    "C.5.4": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2", "Tipo B"}},
+    "C.7.1": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2"}},
+    "C.9.3.1": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2", "Tipo B"}},
+    "C.12.1.4": {"tipos": {"Tipos C", "Tipo D"}},
+    "C.EX.3":  {"tipos": {"Tipo A1-N", "Tipo D"}},
+    "C.EX.14.1": {"tipos": {"Tipo A1-N", "Tipo B", "Tipo C", "Tipo D"}},
+    "C.EX.15": {"tipos": {"Tipo A1-N", "Tipo B"}},
+    "C.EX.16": {"tipos": {"Tipo C", "Tipo D"}},
+    "C.EX.18": {"tipos": {"Tipo B", "Tipo C"}},
+    "D.1.2": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2", "Tipo B"}},
+    "D.1.3": {"tipos": {"Tipo C", "Tipo D"}},
+    "D.1.4": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2"}},
+    "D.1.5": {"tipos": {"Tipo B", "Tipo C", "Tipo D"}},
+    "D.1.7": {"tipos": {"Tipo A1", "Tipo A1-N", "Tipo A2", "Tipo B"}},
+    "D.1.8": {"tipos": {"Tipo C", "Tipo D"}},
+    "D.1.9": {"tipos": {"Tipo C", "Tipo D"}},
+    "D.1.10": {"tipos": {"Tipo C", "Tipo D"}},
+    "D.1.11": {"tipos": {"Tipo C", "Tipo D"}},
+    "D.1.12": {"tipos": {"Tipo C", "Tipo D"}},
+    "D.4.5.4": {"tipos": {"Tipo D"}},
+    "D.EX.3": {"tipos": {"Tipo A1-N", "Tipo D"}},
+    "D.EX.4": {"tipos": {"Tipo B"}},
+}
+
+# Tope de los cachés de textos de las planillas: con --vigilar o --servir el
+# proceso no termina, y cada comentario o nombre editado sería una entrada más
+MAX_CACHE_TEXTOS = 4096
+
+@lru_cache(maxsize=MAX_CACHE_TEXTOS)
+def extraer_codigo_partida(partida_raw):
+    if not partida_raw: return None
+    match = re.search(r'\[([A-Z0-9\.]+)\]', partida_raw)
+    return match.group(1) if match else None
+
+def partida_aplica(partida_raw, tipo_vivienda, manzana, casa):
+    codigo = extraer_codigo_partida(partida_raw)
+    if not codigo: return True
+    if codigo not in REGLAS_PARTIDAS: return True
+    regla = REGLAS_PARTIDAS[codigo]
+    if tipo_vivienda in regla.get("tipos", set()): return True
+    if "excepciones" in regla:
+        if (str(manzana), str(casa)) in regla["excepciones"]: return True
+    return False
+
+# ========================================================
+# PLANTILLAS
+# ========================================================
+
+# Estilos compartidos por todos los popups: se incluyen una sola vez en la
+# página (mapa.EstilosPopups) y el HTML de cada popup solo lleva clases.
+ESTILOS_POPUPS = """
+.pf, .pt { font-family: 'Segoe UI', Arial; background: white; margin: -15px -10px -10px -10px; }
+.pf { width: 520px; }
+.pt { width: 720px; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 15px rgba(0,0,0,0.2); }
+.pp-tabla { width: 100%; border-collapse: collapse; table-layout: fixed; }
+.pp-tit { background: #edeff0; }
+.pp-tit td { padding: 10px 5px; font-weight: bold; color: #2c3e50; border-top: 2px solid #2c3e50; }
+.pp-sub td { padding: 6px 8px; font-weight: bold; color: #7f8c8d; font-style: italic; border-bottom: 1px solid #eee; }
+.pp-fila { border-bottom: 1px solid #f2f2f2; }
+.pp-est { padding: 8px 5px; text-align: center; font-weight: bold; }
+.pp-est.ok { color: #27ae60; }
+.pp-est.no { color: #e74c3c; }
+.pp-est.obs { color: #d4a017; }
+.pp-ir { cursor: pointer; }
+.pp-barra { width: 100%; border-radius: 2px; }
+.pp-barra > div { height: 100%; border-radius: 2px; }
+
+.pf-cab { background: #2c3e50; color: white; padding: 15px 10px; display: flex; justify-content: space-between; align-items: center; }
+.pf-cab h4 { margin: 0; font-size: 16px; }
+.pf-avance { width: 160px; }
+.pf-avance b { display: block; font-size: 12px; text-align: right; }
+.pf-avance .pp-barra { background: #dcdde1; border-radius: 6px; height: 8px; overflow: hidden; }
+.pf-avance .pp-barra > div { border-radius: 0; background: linear-gradient(90deg, #2980b9, #27ae60); }
+.pf-cuerpo { display: flex; height: 380px; }
+.pf-lista { flex: 1.8; overflow-y: auto; padding: 10px; border-right: 1px solid #eee; }
+.pf .pp-sub { background: #f9f9f9; }
+.pf .pp-fila > td:first-child { padding: 8px 10px; vertical-align: top; }
+.pf .pp-est { font-size: 14px; }
+.pf-nombre { color: #444; font-size: 11px; }
+.pf-obs { color: #d4a017; }
+.pf details { margin-top: 4px; }
+.pf summary { cursor: pointer; color: #856404; font-size: 10px; font-weight: bold; }
+.pf-nota { margin-top: 4px; padding: 8px; background: #fff9e6; border-left: 3px solid #d4a017; color: #856404; font-size: 10px; line-height: 1.4; }
+.pf-indice { flex: 1.2; background: #f4f7f8; padding: 10px; overflow-y: auto; border-left: 1px solid #ddd; }
+.pf-indice-tit { font-size: 11px; font-weight: bold; color: #95a5a6; margin-bottom: 10px; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px; }
+.pf-idx { padding: 6px; background: #fff; border: 1px solid #dcdde1; border-radius: 4px; margin-bottom: 4px; }
+.pf-idx b { display: block; color: #2c3e50; font-size: 10px; }
+.pf-idx div { font-size: 9px; color: #27ae60; }
+.pf-idx.obs { background: #fff3cd; }
+.pf-idx.obs div { color: #856404; }
+.pf-idx-sub { padding: 4px 6px 4px 15px; margin-bottom: 3px; border-left: 2px solid #bdc3c7; font-size: 9px; color: #636e72; }
+.pf-idx-sub.obs { border-left-color: #f1c40f; color: #856404; font-weight: bold; }
+
+.pt-cab { background: #1abc9c; color: white; padding: 15px; display: flex; justify-content: space-between; align-items: center; }
+.pt-info { display: flex; align-items: center; gap: 25px; }
+.pt-cab h4 { margin: 0; font-size: 16px; line-height: 1.2; }
+.pt-cab h4 span { font-size: 12px; font-weight: normal; opacity: 0.9; }
+.pt-monto small { display: block; font-size: 11px; opacity: 0.9; text-transform: uppercase; }
+.pt-monto b { display: block; font-size: 17px; }
+.pt-presupuesto { border-left: 1px solid rgba(255,255,255,0.4); padding-left: 20px; }
+.pt-pago { text-align: right; }
+.pt-pago b { font-size: 22px; }
+.pt-cuerpo { display: flex; height: 450px; }
+.pt-lista { flex: 2; overflow-y: auto; padding: 10px; border-right: 1px solid #ddd; }
+.pt thead tr { background: #f4f7f8; font-size: 10px; color: #555; border-bottom: 2px solid #ddd; }
+.pt th { padding: 8px; }
+.pt th:first-child { text-align: left; }
+.pt .pp-sub { background: #fdfdfd; }
+.pt .pp-fila > td { padding: 8px 5px; text-align: center; }
+.pt .pp-fila > td.pt-partida { vertical-align: middle; text-align: left; color: #444; font-size: 10px; }
+.pt-precio { font-size: 10px; color: #555; font-weight: bold; }
+.pt-cuadrilla { font-size: 9px; color: #777; }
+.pt-cuadrilla span { color: #aaa; }
+.pt .pp-est { font-size: 12px; }
+.pt-indice { flex: 1.1; background: #f8f9fa; padding: 10px; overflow-y: auto; }
+.pt-indice-tit { font-size: 11px; font-weight: bold; color: #7f8c8d; margin-bottom: 12px; text-align: center; border-bottom: 1px solid #ccc; padding-bottom: 5px; }
+.pt-idx { padding: 8px; background: #2c3e50; border-radius: 4px; margin-bottom: 5px; color: white; }
+.pt-idx b { display: block; font-size: 10px; text-transform: uppercase; }
+.pt-idx div { font-size: 10px; color: #1abc9c; font-weight: bold; }
+.pt-idx .pp-barra { background: rgba(255,255,255,0.2); height: 4px; margin-top: 4px; }
+.pt-idx .pp-barra > div { background: #1abc9c; }
+.pt-idx-sub { padding: 6px 6px 6px 12px; background: white; border: 1px solid #dcdde1; border-radius: 4px; margin-bottom: 4px; margin-left: 10px; }
+.pt-idx-sub b { display: block; color: #34495e; font-size: 9px; }
+.pt-idx-sub div { font-size: 9px; color: #27ae60; }
+.pt-idx-sub .pp-barra { background: #eee; height: 3px; margin-top: 3px; }
+.pt-idx-sub .pp-barra > div { background: #27ae60; }
+"""
+
+# Los índices llaman a irA(ancla), definida una vez junto a los estilos
+SCRIPT_POPUPS = """
+function irA(ancla) {
+    var el = document.getElementById(ancla);
+    if (el) el.scrollIntoView({behavior: 'smooth'});
+}
+"""
+
+_entorno = Environment(trim_blocks=True, lstrip_blocks=True)
+_entorno.filters["plata"] = formatear_plata
+
+@lru_cache(maxsize=MAX_CACHE_TEXTOS)
+def _huella_ancla(texto):
+    # hash() de str cambia en cada proceso: con la huella del texto los IDs son los mismos en cada build
+    return huella_bytes(texto.encode("utf-8"))[:12]
+
+_entorno.filters["ancla"] = lambda texto, prefijo: f"{prefijo}_{_huella_ancla(texto)}"
+
+# Nombres de partidas, títulos y cuadrillas se repiten en todas las casas: se
+# escapan una vez (_texto) y las plantillas los reciben listos; el resto de los
+# textos se escapa en la plantilla con |e.
+@lru_cache(maxsize=MAX_CACHE_TEXTOS)
+def _texto(valor):
+    return str(escape(valor))
+
+# Las plantillas se compilan una sola vez, al importar el módulo
+PLANTILLA_FISICO = _entorno.from_string(
+    '<div class="pf">'
+    '<div class="pf-cab"><h4>MZ {{ manzana|e }} - Casa {{ casa }} - {{ tipo|e }}</h4>'
+    '<div class="pf-avance"><b>{{ avance }}%</b><div class="pp-barra"><div style="width: {{ avance }}%"></div></div></div></div>'
+    '<div class="pf-cuerpo"><div class="pf-lista" id="lista_partidas"><table class="pp-tabla">'
+    '<colgroup><col style="width: 85%"><col style="width: 15%"></colgroup>'
+    '{% for tit, sub, nombre, terminada, obs, comentario in filas %}'
+    '{% if tit %}<tr id="{{ tit|ancla("tit") }}" class="pp-tit"><td colspan="2">{{ tit|upper }}</td></tr>{% endif %}'
+    '{% if sub %}<tr id="{{ sub|ancla("sub") }}" class="pp-sub"><td colspan="2">↳ {{ sub }}</td></tr>{% endif %}'
+    '<tr class="pp-fila">'
+    '{% if obs %}'
+    '<td><b class="pf-obs">{{ nombre }}</b><details><summary>Ver nota [+]</summary><div class="pf-nota">{{ comentario|e }}</div></details></td>'
+    '<td class="pp-est obs">⚠️</td>'
+    '{% elif terminada %}<td><span class="pf-nombre">{{ nombre }}</span></td><td class="pp-est ok">✅</td>'
+    '{% else %}<td><span class="pf-nombre">{{ nombre }}</span></td><td class="pp-est no">❌</td>'
+    '{% endif %}</tr>'
+    '{% endfor %}'
+    '</table></div>'
+    '<div class="pf-indice"><div class="pf-indice-tit">ÍNDICE DE CONTROL</div>'
+    '{% for tit, datos in resumen %}'
+    '<div class="pp-ir pf-idx{{ " obs" if datos.obs }}" onclick="irA(\'{{ tit|ancla("tit") }}\')">'
+    '<b>{{ tit }}</b><div>{{ datos.listo }}/{{ datos.total }} completados</div></div>'
+    '{% for sub, sdatos in datos.subs.items() %}'
+    '<div class="pp-ir pf-idx-sub{{ " obs" if sdatos.obs }}" onclick="irA(\'{{ sub|ancla("sub") }}\')">{{ sub }}{{ " (!)" if sdatos.obs }}</div>'
+    '{% endfor %}'
+    '{% endfor %}'
+    '</div></div></div>'
+)
+
+PLANTILLA_TRATOS = _entorno.from_string(
+    '<div class="pt">'
+    '<div class="pt-cab"><div class="pt-info">'
+    '<h4>MZ {{ manzana|e }} - Casa {{ casa }}<br><span>{{ tipo|e }}</span></h4>'
+    '<div class="pt-monto pt-presupuesto"><small>Presupuesto Vivienda</small><b>{{ total|plata }}</b></div></div>'
+    '<div class="pt-monto pt-pago"><small>Pago Actual</small><b>{{ ganada|plata }}</b></div></div>'
+    '<div class="pt-cuerpo"><div class="pt-lista"><table class="pp-tabla">'
+    '<colgroup><col style="width: 45%"><col style="width: 20%"><col style="width: 25%"><col style="width: 10%"></colgroup>'
+    '<thead><tr><th>Partida</th><th>Precio</th><th>Cuadrilla</th><th>Est.</th></tr></thead><tbody>'
+    '{% for tit, sub, partida, precio, cuadrilla, fecha, terminada in filas %}'
+    '{% if tit %}<tr id="{{ tit|ancla("tratos_tit") }}" class="pp-tit"><td colspan="4">{{ tit|upper }}</td></tr>{% endif %}'
+    '{% if sub %}<tr id="{{ sub|ancla("tratos_sub") }}" class="pp-sub"><td colspan="4">↳ {{ sub }}</td></tr>{% endif %}'
+    '<tr class="fila-trato pp-fila" data-cuadrilla="{{ cuadrilla }}">'
+    '<td class="pt-partida">{{ partida }}</td><td class="pt-precio">{{ precio|plata }}</td>'
+    '<td class="pt-cuadrilla">{{ cuadrilla }}<br><span>{{ fecha }}</span></td>'
+    '{% if terminada %}<td class="pp-est ok">✅</td>{% else %}<td class="pp-est no">❌</td>{% endif %}</tr>'
+    '{% endfor %}'
+    '</tbody></table></div>'
+    '<div class="pt-indice"><div class="pt-indice-tit">RESUMEN Y SUBTOTALES</div>'
+    '{% for tit, datos in resumen if datos.total %}'
+    '<div class="btn-indice pp-ir pt-idx" onclick="irA(\'{{ tit|ancla("tratos_tit") }}\')">'
+    '<b>{{ tit }}</b><div>{{ datos.ganado|plata }}</div>'
+    '<div class="pp-barra"><div style="width: {{ datos.ganado / datos.total * 100 }}%"></div></div></div>'
+    '{% for sub, dsub in datos.subs.items() if dsub.total %}'
+    '{% set pct = dsub.ganado / dsub.total * 100 %}'
+    '<div class="btn-indice pp-ir pt-idx-sub" onclick="irA(\'{{ sub|ancla("tratos_sub") }}\')">'
+    '<b>↳ {{ sub }}</b><div>{{ dsub.ganado|plata }} / {{ pct|int }}%</div>'
+    '<div class="pp-barra"><div style="width: {{ pct }}%"></div></div></div>'
+    '{% endfor %}'
+    '{% endfor %}'
+    '</div></div></div>'
+)
+
+
+# ========================================================
+# AVANCE FÍSICO
+# ========================================================
+
+def _encabezados(tit, sub, actual):
+    """
+    Título y subtítulo que empiezan en esta fila de la tabla (None si sigue
+    el anterior). `actual` es [título, subtítulo] de la fila previa.
+    """
+    nuevo_tit = tit if tit != actual[0] else None
+    nuevo_sub = sub if sub != actual[1] and sub else None
+    actual[:] = tit, sub
+    return nuevo_tit, nuevo_sub
+
+def generar_html_popup(llaves, catalogo_partidas, id_casa, detalle, tipo_vivienda, avance):
+    """Popup de avance físico: partidas de la casa con su estado y un índice por título."""
+    manzana, casa_num = llaves.etiqueta_casa(id_casa)
+    filas = []  # (título nuevo, subtítulo nuevo, nombre, terminada, tiene_obs, comentario)
+    resumen = {}
+    actual = [None, None]
+    for p, terminada, tiene_obs, comentario in detalle.items(catalogo_partidas):
+        if not partida_aplica(p.nombre, tipo_vivienda, manzana, casa_num): continue
+        t, s = _texto(p.titulo), _texto(p.subtitulo)
+        filas.append((*_encabezados(t, s, actual), _texto(p.nombre), terminada, tiene_obs, comentario))
+
+        if t not in resumen: resumen[t] = {'total': 0, 'listo': 0, 'subs': {}, 'obs': False}
+        resumen[t]['total'] += 1
+        if terminada: resumen[t]['listo'] += 1
+        if tiene_obs: resumen[t]['obs'] = True
+        if s:
+            if s not in resumen[t]['subs']: resumen[t]['subs'][s] = {'total': 0, 'listo': 0, 'obs': False}
+            resumen[t]['subs'][s]['total'] += 1
+            if terminada: resumen[t]['subs'][s]['listo'] += 1
+            if tiene_obs: resumen[t]['subs'][s]['obs'] = True
+
+    return PLANTILLA_FISICO.render(
+        manzana=manzana, casa=casa_num, tipo=tipo_vivienda, avance=avance,
+        filas=filas, resumen=resumen.items(),
+    )
+
+
+# ========================================================
+# TRATOS
+# ========================================================
+
+def generar_html_popup_tratos(llaves, tratos, id_casa, tipo_vivienda):
+    """
+    Popup de tratos de una casa. `tratos` es la salida de la etapa de tratos
+    (precios, estructura, filas, estado y cuadrillas).
+
+    Devuelve (html, plata_ganada, plata_total) en pesos enteros.
+    """
+    manzana, casa_num = llaves.etiqueta_casa(id_casa)
+    precios_tratos = tratos["precios"]
+    estructura_tratos = tratos["estructura"]
+    estado_casa = tratos["estado"].get(id_casa, {})
+    cuadrillas_casa = tratos["cuadrillas"].get(id_casa, {})
+    resumen = {}
+    filas = []  # (título nuevo, subtítulo nuevo, partida, precio, cuadrilla, fecha, terminada)
+    actual = [None, None]
+
+    # Totales de la casa en pesos enteros (int64)
+    precios = precios_tratos.vector(tratos["filas"], tipo_vivienda)
+    estados = [estado_casa.get(item['id_trato'], SIN_ESTADO_TRATO) for item in estructura_tratos]
+    terminadas = np.fromiter((e["terminada"] for e in estados), dtype=bool, count=len(estados))
+    plata_total = sumar(precios)
+    plata_ganada = sumar(precios[terminadas])
+
+    for item, precio_partida, estado in zip(estructura_tratos, precios.tolist(), estados):
+        tit = _texto(item['titulo'])
+        sub = _texto(item['subtitulo'])
+        id_trato = item['id_trato']
+
+        if tit not in resumen:
+            resumen[tit] = {'total': 0, 'ganado': 0, 'subs': {}}
+
+        resumen[tit]['total'] += precio_partida
+        if estado["terminada"]:
+            resumen[tit]['ganado'] += precio_partida
+
+        if sub:
+            if sub not in resumen[tit]['subs']:
+                resumen[tit]['subs'][sub] = {'total': 0, 'ganado': 0}
+            resumen[tit]['subs'][sub]['total'] += precio_partida
+            if estado["terminada"]:
+                resumen[tit]['subs'][sub]['ganado'] += precio_partida
+
+        filas.append((*_encabezados(tit, sub, actual), _texto(llaves.nombre_trato(id_trato)),
+                      precio_partida, _texto(cuadrillas_casa.get(id_trato, "-")), _texto(estado["fecha"]),
+                      estado["terminada"]))
+
+    html = PLANTILLA_TRATOS.render(
+        manzana=manzana, casa=casa_num, tipo=tipo_vivienda, total=plata_total, ganada=plata_ganada,
+        filas=filas, resumen=resumen.items(),
+    )
+    return html, plata_ganada, plata_total
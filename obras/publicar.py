@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Poda de los archivos viejos en la carpeta que se publica en GitHub Pages.
+
+Los datos del plano llevan huella en el nombre (ver obras/recursos.py), así
+que cada corrida que cambia algo agrega archivos nuevos y los anteriores
+quedan sin uso. Recursos.limpiar los borra de la carpeta local, pero en la
+rama gh-pages se acumularían para siempre.
+
+El workflow arma la carpeta pública partiendo de lo que ya está publicado,
+copia encima lo nuevo y corre:
+
+    python -m obras.publicar public --cache .cache_obra
+
+Se lee el manifiesto de cada sitio (<cache>/<sitio>/manifiesto.json, ver
+obras/pipeline.py) y se agrega al registro de las últimas corridas
+(public/publicados.json). Dentro de las carpetas de datos y de exportación
+de los sitios se borra todo archivo que no esté en ninguna de las últimas
+CONSERVAR corridas: una página abierta antes de la actualización todavía
+encuentra sus popups, y lo de hace varias corridas desaparece. Lo que está
+fuera de esas carpetas (index.html, logos, los HTML de los planos) no se toca.
+"""
+import argparse
+import glob
+import json
+import os
+
+from obras.pipeline import DIRECTORIO_CACHE, MANIFIESTO
+
+REGISTRO = "publicados.json"
+CONSERVAR = 3  # corridas cuyos archivos siguen publicados
+
+
+def leer_manifiestos(cache):
+    """Rutas publicadas (relativas, con '/') según los manifiestos de todos los sitios del caché."""
+    rutas = set()
+    for ruta in sorted(glob.glob(os.path.join(cache, "*", MANIFIESTO))):
+        with open(ruta, encoding="utf-8") as f:
+            rutas.update(json.load(f))
+    return sorted(rutas)
+
+
+def registrar(publico, rutas, conservar=CONSERVAR):
+    """Agrega la corrida al registro (si cambió algo) y devuelve las últimas `conservar` corridas."""
+    ruta_registro = os.path.join(publico, REGISTRO)
+    try:
+        with open(ruta_registro, encoding="utf-8") as f:
+            corridas = json.load(f)
+    except (OSError, ValueError):
+        corridas = []
+    if not corridas or corridas[-1] != rutas:
+        corridas.append(rutas)
+    corridas = corridas[-conservar:]
+    with open(ruta_registro, "w", encoding="utf-8") as f:
+        json.dump(corridas, f, indent=1)
+    return corridas
+
+
+def podar(publico, corridas):
+    """Borra de las carpetas de los sitios los archivos que ninguna corrida referencia. Devuelve los borrados."""
+    vigentes = {r for corrida in corridas for r in corrida}
+    # Carpetas de los sitios: el primer nivel de cada ruta publicada dentro de una carpeta (…_datos, …_export)
+    carpetas = sorted({r.split("/", 1)[0] for r in vigentes if "/" in r})
+    borrados = []
+    for carpeta in carpetas:
+        for raiz, _, archivos in os.walk(os.path.join(publico, carpeta), topdown=False):
+            for archivo in archivos:
+                ruta = os.path.join(raiz, archivo)
+                relativa = os.path.relpath(ruta, publico).replace(os.sep, "/")
+                if relativa not in vigentes:
+                    os.remove(ruta)
+                    borrados.append(relativa)
+            if raiz != os.path.join(publico, carpeta) and not os.listdir(raiz):
+                os.rmdir(raiz)
+    return sorted(borrados)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Borra de la carpeta pública los archivos de corridas viejas.")
+    parser.add_argument("publico", help="carpeta que se publica (con lo ya publicado y lo nuevo copiado encima)")
+    parser.add_argument("--cache", default=DIRECTORIO_CACHE, help="carpeta base del caché (con los manifiestos)")
+    parser.add_argument("--conservar", type=int, default=CONSERVAR, help="corridas cuyos archivos se conservan")
+    args = parser.parse_args(argv)
+
+    rutas = leer_manifiestos(args.cache)
+    if not rutas:
+        print(f"⚠️ No hay manifiestos en {args.cache}: no se poda nada.")
+        return 1
+    corridas = registrar(args.publico, rutas, max(1, args.conservar))
+    borrados = podar(args.publico, corridas)
+    print(f"🧹 {len(borrados)} archivo(s) de corridas anteriores borrados; se conservan {len(corridas)} corrida(s).")
+    for ruta in borrados[:10]:
+        print(f"   - {ruta}")
+    if len(borrados) > 10:
+        print(f"   ... y {len(borrados) - 10} más")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Archivos que se publican junto al HTML (plano, popups por manzana).
+
+Cada archivo lleva en el nombre la huella de su contenido
+(`plano.3fa9c1d2e4.webp`, `popups_A.8b2e01f3aa.json`). El navegador y la CDN
+pueden guardarlos para siempre: si el contenido cambia, cambia el nombre y el
+HTML apunta al nuevo. No se escriben copias .gz / .br: GitHub Pages comprime
+por su cuenta y el servidor local (obras/servidor.py) comprime al servir.
+Las versiones viejas que quedan publicadas las poda obras/publicar.py.
+"""
+import glob
+import os
+
+import cv2
+import numpy as np
+
+from obras.etapas import huella_bytes
+
+LARGO_HUELLA = 10
+
+
+def nombre_con_huella(nombre, datos):
+    """'popups_A.json' + contenido -> 'popups_A.<huella>.json'."""
+    base, extension = os.path.splitext(nombre)
+    return f"{base}.{huella_bytes(datos)[:LARGO_HUELLA]}{extension}"
+
+
+def imagen_webp(ruta):
+    """
+    Contenido del plano como WebP sin pérdida: (nombre, bytes). Si OpenCV no
+    puede codificar WebP se devuelve el archivo original tal cual.
+    """
+    with open(ruta, "rb") as f:
+        original = f.read()
+    imagen = cv2.imdecode(np.frombuffer(original, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if imagen is not None:
+        ok, webp = cv2.imencode(".webp", imagen, [cv2.IMWRITE_WEBP_QUALITY, 101])  # > 100 = sin pérdida
+        if ok and len(webp) < len(original):
+            return "plano.webp", webp.tobytes()
+    return "plano" + os.path.splitext(ruta)[1].lower(), original
+
+
+class Recursos:
+    """Archivos con huella escritos en `carpeta` durante una corrida."""
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.rutas = []
+        os.makedirs(carpeta, exist_ok=True)
+
+    def escribir(self, nombre, datos):
+        """Guarda `datos` (bytes) con huella en el nombre. Devuelve el nombre final."""
+        final = nombre_con_huella(nombre, datos)
+        ruta = os.path.join(self.carpeta, final)
+        # Mismo nombre = mismo contenido: un archivo ya publicado no se reescribe
+        if not os.path.exists(ruta):
+            with open(ruta + ".tmp", "wb") as f:
+                f.write(datos)
+            os.replace(ruta + ".tmp", ruta)
+        self.rutas.append(ruta)
+        return final
+
+    def limpiar(self):
+        """Borra de la carpeta los archivos que esta corrida no escribió (versiones anteriores)."""
+        vigentes = {os.path.abspath(r) for r in self.rutas}
+        for ruta in glob.glob(os.path.join(self.carpeta, "*")):
+            if os.path.isfile(ruta) and os.path.abspath(ruta) not in vigentes:
+                os.remove(ruta)
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local de los planos con actualización en vivo (construir_obras.py --servir).
+
+Para cada obra sirve:
+  - /<sitio>/              el HTML generado, con un script extra que escucha los eventos
+  - /<sitio>/<datos>/...   plano y popups (comprimidos con br / gzip si el navegador los acepta)
+  - /<sitio>/casas.json    propiedades de cada casa (avance, plata, cuadrillas...)
+  - /<sitio>/eventos       Server-Sent Events con las casas que cambiaron
+
+Cuando el HTML de una obra cambia en disco (lo reescribe el modo vigilancia u
+otra corrida), el servidor lee las casas del HTML nuevo, las compara con las
+anteriores y envía solo las que cambiaron. El navegador recolorea esos
+polígonos y renueva los popups de sus manzanas y el índice del buscador sin
+recargar la página. Al conectarse recibe la versión actual: si el HTML que
+cargó es anterior, pide casas.json y se pone al día.
+Solo biblioteca estándar (asyncio). Está pensado para la red de la oficina
+de obra (p. ej. la TV), no para publicar en internet.
+
+Extra opcional: con el paquete 'brotli' instalado (`pip install brotli`, no
+está en requirements.txt porque el build y el workflow no lo usan) los
+archivos de texto se entregan con br; sin él, con gzip.
+"""
+import asyncio
+import gzip
+import html
+import json
+import mimetypes
+import os
+import re
+from urllib.parse import unquote, urlsplit
+
+from obras.mapa import carpeta_datos
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete 'brotli' los archivos se comprimen solo con gzip
+    brotli = None
+
+ESPERA_ARCHIVOS = 1.0  # segundos entre revisiones de los HTML en disco
+LATIDO = 15            # segundos sin eventos antes de mandar un comentario (mantiene viva la conexión)
+
+mimetypes.add_type("image/webp", ".webp")
+
+# Texto que vale la pena comprimir al servir (el build no deja copias .gz / .br, ver obras/recursos.py)
+EXTENSIONES_COMPRIMIBLES = (".json", ".js", ".css", ".svg", ".html")
+
+# Se agrega al final del HTML servido. %(capa)s es la variable de la capa de viviendas que declara
+# construir_mapa y %(version)s la versión del HTML: al conectarse, el servidor manda la suya y si no
+# coinciden (hubo un rebuild entre la carga de la página y la conexión) se piden todas las casas
+SCRIPT_EN_VIVO = """
+<script>
+(function() {
+    var capa = %(capa)s;
+    var version = %(version)s;
+    if (!window.EventSource) return;
+    var casas = capa.getLayers();  // en el orden de las features, igual que casas.json
+    function aplicar(d) {
+        Object.keys(d.casas).forEach(function(i) {
+            var capaCasa = casas[i];
+            if (!capaCasa) return;
+            capaCasa.feature.properties = d.casas[i];
+            capaCasa.setStyle(estiloVivienda(capaCasa.feature));
+        });
+        if (window.actualizarArchivosPopups) actualizarArchivosPopups(d.archivos);
+        if (window.actualizarBuscador) actualizarBuscador(d.buscador);
+    }
+    var eventos = new EventSource('eventos');
+    eventos.addEventListener('version', function(e) {
+        if (+e.data === version) return;
+        fetch('casas.json', {cache: 'no-store'}).then(function(r) { return r.json(); }).then(function(d) {
+            if (d.casas.length !== casas.length) return location.reload();
+            version = d.version;
+            aplicar(d);
+        });
+    });
+    eventos.addEventListener('casas', function(e) {
+        version = +e.lastEventId;
+        aplicar(JSON.parse(e.data));
+    });
+    // Cambió la cantidad de casas (otro plano): hay que cargar la página nueva
+    eventos.addEventListener('recargar', function() { location.reload(); });
+})();
+</script>
+"""
+
+
+def leer_casas(texto):
+    """
+    Desde un HTML generado por construir_mapa: {"capa": variable de la capa
+    de viviendas, "casas": propiedades de cada casa (en el orden del plano),
+    "archivos": manzana -> archivo de popups, "buscador": url del índice de
+    búsqueda}.
+    """
+    decodificador = json.JSONDecoder()
+    declaracion = re.search(r"\bvar (\w+) = L\.geoJson\(", texto)
+    capa, _ = decodificador.raw_decode(texto, declaracion.end())
+    archivos, _ = decodificador.raw_decode(texto, re.search(r"\bvar archivos = ", texto).end())
+    buscador, _ = decodificador.raw_decode(texto, re.search(r"\bvar urlIndice = ", texto).end())
+    return {"capa": declaracion.group(1), "casas": [f["properties"] for f in capa["features"]],
+            "archivos": archivos, "buscador": buscador}
+
+
+def _json(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+
+
+# ========================================================
+# ESTADO DE CADA OBRA
+# ========================================================
+
+class ObraEnVivo:
+    """HTML actual de una obra, sus casas y las conexiones de eventos abiertas."""
+
+    def __init__(self, sitio):
+        self.sitio = sitio
+        self.marca = None    # (mtime, tamaño) del HTML leído
+        self.html = None     # bytes servidos (con SCRIPT_EN_VIVO)
+        self.casas = []
+        self.archivos = {}
+        self.buscador = None
+        self.version = 0
+        self.clientes = set()  # una asyncio.Queue por navegador conectado
+
+    def leer(self):
+        """Lee el HTML si cambió (corre en un hilo). None si no cambió o si está a medio escribir."""
+        try:
+            st = os.stat(self.sitio.salida)
+            if (st.st_mtime_ns, st.st_size) == self.marca:
+                return None
+            with open(self.sitio.salida, encoding="utf-8") as f:
+                texto = f.read()
+            if not texto.rstrip().endswith("</html>"):
+                return None
+            return (st.st_mtime_ns, st.st_size), texto, leer_casas(texto)
+        except (OSError, AttributeError, ValueError):
+            return None  # se reintenta en la próxima revisión
+
+    def aplicar(self, marca, texto, leido):
+        """Adopta el HTML nuevo. Devuelve el evento para los navegadores: (nombre, datos) o None."""
+        anteriores, casas = self.casas, leido["casas"]
+        self.marca, self.casas, self.archivos, self.buscador = marca, casas, leido["archivos"], leido["buscador"]
+        self.version += 1
+        script = SCRIPT_EN_VIVO % {"capa": leido["capa"], "version": self.version}
+        self.html = texto.replace("</body>", script + "</body>", 1).encode("utf-8")
+        if self.version == 1:
+            return None
+        if len(casas) != len(anteriores):
+            return "recargar", {}
+        cambiadas = {i: p for i, p in enumerate(casas) if p != anteriores[i]}
+        return "casas", {**self.estado(), "casas": cambiadas}
+
+    def estado(self):
+        """Todas las casas, con los archivos de popups y el índice de búsqueda actuales."""
+        return {"version": self.version, "casas": self.casas, "archivos": self.archivos, "buscador": self.buscador}
+
+    def enviar(self, nombre, datos):
+        for cola in self.clientes:
+            cola.put_nowait((self.version, nombre, datos))
+
+
+# ========================================================
+# SERVIDOR HTTP
+# ========================================================
+
+class ServidorEnVivo:
+
+    def __init__(self, sitios):
+        self.obras = {nombre: ObraEnVivo(sitio) for nombre, sitio in sitios.items()}
+        self.comprimidos = {}  # (ruta, codificación) -> bytes
+
+    async def revisar_archivos(self):
+        """Relee los HTML que cambiaron y avisa a los navegadores conectados."""
+        while True:
+            for obra in self.obras.values():
+                nuevo = await asyncio.to_thread(obra.leer)
+                if nuevo is None: continue
+                evento = obra.aplicar(*nuevo)
+                if evento is None: continue
+                nombre, datos = evento
+                if nombre == "casas":
+                    print(f"📡 {obra.sitio.nombre}: {len(datos['casas'])} casa(s) cambiaron → {len(obra.clientes)} navegador(es)")
+                else:
+                    print(f"📡 {obra.sitio.nombre}: cambió el plano, los navegadores recargan la página")
+                obra.enviar(nombre, datos)
+            await asyncio.sleep(ESPERA_ARCHIVOS)
+
+    async def atender(self, lector, escritor):
+        try:
+            linea = (await lector.readline()).decode("latin-1")
+            cabeceras = {}
+            while True:
+                cabecera = (await lector.readline()).decode("latin-1")
+                if cabecera in ("\r\n", "\n", ""): break
+                clave, _, valor = cabecera.partition(":")
+                cabeceras[clave.strip().lower()] = valor.strip()
+
+            metodo, ruta, _ = linea.split(" ", 2)
+            if metodo != "GET":
+                return await self.responder(escritor, "405 Method Not Allowed", b"", "text/plain")
+            await self.despachar(unquote(urlsplit(ruta).path), cabeceras, escritor)
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def despachar(self, ruta, cabeceras, escritor):
+        if ruta == "/":
+            enlaces = "".join(f'<li><a href="/{n}/">{html.escape(n)}</a></li>' for n in self.obras)
+            return await self.responder(escritor, "200 OK", f"<ul>{enlaces}</ul>".encode("utf-8"), "text/html; charset=utf-8")
+
+        nombre, barra, resto = ruta.lstrip("/").partition("/")
+        obra = self.obras.get(nombre)
+        if obra is None or obra.html is None:
+            return await self.responder(escritor, "404 Not Found", b"", "text/plain")
+        if not barra:  # las rutas del HTML son relativas a /<sitio>/
+            return await self.responder(escritor, "301 Moved Permanently", b"", "text/plain", [f"Location: /{nombre}/"])
+
+        if resto == "":
+            return await self.responder(escritor, "200 OK", obra.html, "text/html; charset=utf-8", ["Cache-Control: no-cache"])
+        if resto == "casas.json":
+            return await self.responder(escritor, "200 OK", _json(obra.estado()).encode("utf-8"), "application/json",
+                                        ["Cache-Control: no-cache"])
+        if resto == "eventos":
+            return await self.eventos(obra, cabeceras.get("last-event-id"), escritor)
+        return await self.archivo(obra, resto, cabeceras, escritor)
+
+    async def archivo(self, obra, resto, cabeceras, escritor):
+        """Archivo de la carpeta de datos de la obra; sus nombres llevan huella, así que no caducan."""
+        datos = os.path.abspath(carpeta_datos(obra.sitio.salida))
+        ruta = os.path.abspath(os.path.join(os.path.dirname(datos), resto))
+        if os.path.commonpath([datos, ruta]) != datos or not os.path.isfile(ruta):
+            return await self.responder(escritor, "404 Not Found", b"", "text/plain")
+
+        extra = ["Cache-Control: public, max-age=31536000, immutable", "Vary: Accept-Encoding"]
+        codificacion = None
+        if ruta.endswith(EXTENSIONES_COMPRIMIBLES):
+            aceptadas = cabeceras.get("accept-encoding", "")
+            codificacion = next((c for c in ("br", "gzip") if c in aceptadas and (c != "br" or brotli)), None)
+        if codificacion:
+            extra.append(f"Content-Encoding: {codificacion}")
+            cuerpo = await asyncio.to_thread(self.comprimido, ruta, codificacion)
+        else:
+            with open(ruta, "rb") as f:
+                cuerpo = f.read()
+        tipo = mimetypes.guess_type(ruta)[0] or "application/octet-stream"
+        await self.responder(escritor, "200 OK", cuerpo, tipo, extra)
+
+    def comprimido(self, ruta, codificacion):
+        """Contenido de `ruta` comprimido; se guarda en memoria porque el nombre con huella no cambia de contenido."""
+        clave = (ruta, codificacion)
+        if clave not in self.comprimidos:
+            # Los archivos que borró Recursos.limpiar ya no se piden: se sueltan de memoria
+            for vieja in [c for c in self.comprimidos if not os.path.exists(c[0])]:
+                del self.comprimidos[vieja]
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            if codificacion == "br":
+                self.comprimidos[clave] = brotli.compress(datos, quality=11)
+            else:
+                self.comprimidos[clave] = gzip.compress(datos, compresslevel=9, mtime=0)
+        return self.comprimidos[clave]
+
+    async def eventos(self, obra, ultimo, escritor):
+        """Stream SSE de la obra hasta que el navegador se desconecta."""
+        escritor.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                       b"Connection: keep-alive\r\n\r\nretry: 3000\n\n")
+        cola = asyncio.Queue()
+        obra.clientes.add(cola)
+        try:
+            if ultimo is None:
+                # Primera conexión: la versión actual; si la página es de otra, el navegador pide casas.json
+                cola.put_nowait((obra.version, "version", obra.version))
+            elif ultimo != str(obra.version):
+                # Se reconectó y se perdió algún cambio: todas las casas
+                cola.put_nowait((obra.version, "casas", {**obra.estado(), "casas": dict(enumerate(obra.casas))}))
+            while True:
+                try:
+                    version, nombre, datos = await asyncio.wait_for(cola.get(), LATIDO)
+                    escritor.write(f"id: {version}\nevent: {nombre}\ndata: {_json(datos)}\n\n".encode("utf-8"))
+                except asyncio.TimeoutError:
+                    escritor.write(b": latido\n\n")
+                await escritor.drain()
+        finally:
+            obra.clientes.discard(cola)
+
+    async def responder(self, escritor, estado, cuerpo, tipo, extra=()):
+        cabeceras = [f"HTTP/1.1 {estado}", f"Content-Type: {tipo}", f"Content-Length: {len(cuerpo)}",
+                     "Connection: close", *extra]
+        escritor.write(("\r\n".join(cabeceras) + "\r\n\r\n").encode("latin-1") + cuerpo)
+        await escritor.drain()
+
+    async def correr(self, host, puerto):
+        servidor = await asyncio.start_server(self.atender, host, puerto)
+        print(f"🌐 Sirviendo en http://{host}:{puerto}/ : {', '.join(f'/{n}/' for n in self.obras)}")
+        async with servidor:
+            await asyncio.gather(servidor.serve_forever(), self.revisar_archivos())
+
+
+def servir(sitios, host="127.0.0.1", puerto=8000):
+    """Sirve las obras (nombre -> Sitio) hasta Ctrl+C."""
+    try:
+        asyncio.run(ServidorEnVivo(sitios).correr(host, puerto))
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido.")
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Todas las obras en una sola corrida (construir_obras.py).
+
+Carga el SITIO de cada script plano_*.py y los construye con el mismo
+pipeline que cada script por separado, ya sea uno tras otro en el mismo
+proceso o en procesos en paralelo (--procesos).
+
+Las planillas que leen varias obras con la misma etapa ('Partidas' y
+'Pre F1') se abren una sola vez. Solo se descargan si a algún sitio le falta
+en su caché la versión actual, y esa descarga se reparte a todos.
+Uno tras otro, los sitios comparten también la conexión a Google. En
+paralelo, cada proceso se autentica para sus propias planillas, porque la
+conexión no se puede pasar entre procesos.
+
+Al final se imprime el tiempo de cada sitio y el total, que también quedan
+en .cache_obra/build_report.json. Es lo que corre el workflow de GitHub
+(.github/workflows/actualizar_mapa.yml) para publicar todas las obras. Con --vigilar el proceso queda corriendo y
+reconstruye cada sitio cuando cambia (ver obras/vigilar.py); con --servir
+además sirve los planos y empuja a los navegadores las casas que cambiaron
+(ver obras/servidor.py).
+"""
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from obras.etapas import Pipeline, Planilla, pico_rss
+from obras.pipeline import DIRECTORIO_CACHE, REPORTE, SIN_CAMBIOS, Contexto, correr, definir_etapas, etapas_a_forzar
+from obras.vigilar import INTERVALO, vigilar
+
+# Etapas que leen libros comunes a todas las obras: su descarga se comparte
+ETAPAS_COMPARTIBLES = ("hoja_partidas", "hoja_pre_f1")
+
+
+def cargar_sitios(raiz):
+    """SITIO de cada script plano_*.py de `raiz`: nombre -> Sitio."""
+    if raiz not in sys.path:
+        sys.path.insert(0, raiz)
+    sitios = {}
+    for ruta in sorted(glob.glob(os.path.join(raiz, "plano_*.py"))):
+        sitio = importlib.import_module(os.path.splitext(os.path.basename(ruta))[0]).SITIO
+        sitios[sitio.nombre] = sitio
+    return sitios
+
+
+# ========================================================
+# PLANILLAS COMPARTIDAS
+# ========================================================
+
+def planillas_compartidas(sitios):
+    """titulo -> (etapa, [sitios]) de las planillas que dos o más sitios leen con la misma etapa."""
+    usos = {}
+    for sitio in sitios.values():
+        for etapa in definir_etapas(sitio):
+            if etapa.nombre not in ETAPAS_COMPARTIBLES: continue
+            for entrada in etapa.entradas:
+                if isinstance(entrada, Planilla):
+                    usos.setdefault((entrada.titulo, etapa.nombre), []).append(sitio)
+    return {titulo: (etapa, usuarios) for (titulo, etapa), usuarios in usos.items() if len(usuarios) > 1}
+
+
+def descargar_compartidas(contexto, sitios, caches, forzar):
+    """
+    Fecha de cada planilla compartida y, si algún sitio no tiene en caché esa
+    versión (o fuerza la etapa), su descarga. Devuelve titulo -> {"fecha", "datos"}
+    para Contexto; las planillas que no se pudieron abrir quedan fuera y cada
+    sitio las intenta por su cuenta.
+    """
+    compartidas = {}
+    for titulo, (nombre_etapa, usuarios) in planillas_compartidas(sitios).items():
+        try:
+            fecha = contexto.fecha_planilla(titulo)
+        except Exception as e:
+            print(f"⚠️ No se pudo abrir la planilla compartida '{titulo}': {e}")
+            continue
+
+        entrada = Planilla(titulo).nombre
+        vigente = nombre_etapa not in forzar and all(
+            Pipeline(definir_etapas(s), caches[s.nombre]).entradas_guardadas(nombre_etapa).get(entrada) == fecha
+            for s in usuarios
+        )
+        datos = None
+        if not vigente:
+            etapa = next(e for e in definir_etapas(usuarios[0]) if e.nombre == nombre_etapa)
+            datos = pickle.dumps(etapa.funcion(contexto.para(usuarios[0])), protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"🔗 '{titulo}' compartida por {', '.join(s.nombre for s in usuarios)}: "
+              f"{'descargada una vez' if datos else 'vigente en el caché'}")
+        compartidas[titulo] = {"fecha": fecha, "datos": datos}
+    return compartidas
+
+
+# ========================================================
+# CONSTRUCCIÓN
+# ========================================================
+
+def _construir_sitio(sitio, opciones, contexto):
+    """Build de un sitio; los errores se devuelven en vez de cortar los demás sitios."""
+    t0 = time.perf_counter()
+    try:
+        informe, cambios = correr(sitio, opciones["caches"][sitio.nombre], forzar=etapas_a_forzar(sitio, opciones["forzar"]),
+                                  explicar=opciones["explicar"], contexto=contexto, perfil=opciones["perfil"])
+        error = None
+        ejecutadas = sum(f["accion"] == "ejecutada" for f in informe.values())
+    except Exception:
+        cambios, error, ejecutadas = [], traceback.format_exc(), 0
+    # Uno tras otro es el pico del proceso hasta este sitio; en paralelo, el del proceso del sitio
+    return {"sitio": sitio.nombre, "segundos": time.perf_counter() - t0, "ejecutadas": ejecutadas,
+            "cambios": cambios, "error": error, "pico_rss": pico_rss()}
+
+
+def _construir_en_proceso(raiz, nombre, opciones, compartidas):
+    """Proceso hijo: carga el sitio por nombre (los Sitio tienen lambdas y no viajan en pickle)."""
+    sitio = cargar_sitios(raiz)[nombre]
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida):
+        resultado = _construir_sitio(sitio, opciones, Contexto(sitio, compartidas))
+    return dict(resultado, salida=salida.getvalue())
+
+
+def construir_todas(raiz, sitios, opciones, procesos=1):
+    """Construye `sitios`. Devuelve (resultado de cada sitio, titulos de las planillas compartidas)."""
+    primero = next(iter(sitios.values()))
+    contexto = Contexto(primero)
+    contexto.compartidas = descargar_compartidas(
+        contexto, sitios, opciones["caches"], set(etapas_a_forzar(primero, opciones["forzar"])))
+
+    resultados = []
+    if procesos <= 1:
+        for sitio in sitios.values():
+            print(f"\n🏗️ ===== {sitio.nombre} =====")
+            contexto = contexto.para(sitio)
+            resultados.append(_construir_sitio(sitio, opciones, contexto))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            futuros = [ejecutor.submit(_construir_en_proceso, raiz, nombre, opciones, contexto.compartidas)
+                       for nombre in sitios]
+            for futuro in futuros:
+                resultado = futuro.result()
+                print(f"\n🏗️ ===== {resultado['sitio']} =====")
+                print(resultado.pop("salida"), end="")
+                resultados.append(resultado)
+
+    for r in resultados:
+        if r["error"]:
+            print(f"\n❌ {r['sitio']} falló:\n{r['error']}")
+    return resultados, sorted(contexto.compartidas)
+
+
+def servir_y_vigilar(sitios, opciones, args):
+    """Modo vigilancia en un hilo y el servidor en vivo en el principal (ver obras/servidor.py)."""
+    from obras.servidor import servir  # importa obras.mapa (folium): solo si se pide --servir
+    detener = threading.Event()
+    hilo = threading.Thread(target=vigilar, args=({n: (s, definir_etapas(s)) for n, s in sitios.items()}, opciones["caches"]),
+                            kwargs=dict(intervalo=args.vigilar or INTERVALO, explicar=args.explain,
+                                        comando=args.al_cambiar, detener=detener))
+    hilo.start()
+    try:
+        servir(sitios, args.host, args.servir)
+    finally:
+        detener.set()
+        hilo.join()
+    return 0
+
+
+def ejecutar_todas(raiz, argv=None):
+    """Punto de entrada de construir_obras.py. Devuelve el código de salida."""
+    sitios = cargar_sitios(raiz)
+    parser = argparse.ArgumentParser(description="Genera los planos de todas las obras (plano_*.py) en una corrida.")
+    parser.add_argument("--sitio", nargs="+", choices=sorted(sitios), help="solo estos sitios")
+    parser.add_argument("--procesos", type=int, default=min(len(sitios), os.cpu_count() or 1),
+                        help="sitios construidos en paralelo (1 = uno tras otro, compartiendo la conexión)")
+    parser.add_argument("--explain", action="store_true",
+                        help="muestra por qué cada etapa se ejecutó o se reutilizó")
+    parser.add_argument("--forzar", nargs="*", metavar="ETAPA",
+                        help="recalcula las etapas indicadas (todas si no se indica ninguna)")
+    parser.add_argument("--cache", default=DIRECTORIO_CACHE,
+                        help="carpeta base del caché (cada sitio usa su subcarpeta)")
+    parser.add_argument("--estado-sin-cambios", action="store_true",
+                        help=f"termina con código {SIN_CAMBIOS} si ningún sitio cambió sus archivos publicados")
+    parser.add_argument("--profile", action="store_true",
+                        help="perfila el build de cada sitio (cProfile y tracemalloc); informes en su caché")
+    parser.add_argument("--vigilar", type=float, nargs="?", const=INTERVALO, metavar="SEGUNDOS",
+                        help=f"queda corriendo y reconstruye cada sitio cuando cambian sus planillas o archivos "
+                             f"(consulta cada {INTERVALO}s si no se indica)")
+    parser.add_argument("--al-cambiar", metavar="COMANDO",
+                        help="con --vigilar: comando a ejecutar cuando cambian los archivos publicados de un sitio")
+    parser.add_argument("--servir", type=int, nargs="?", const=8000, metavar="PUERTO",
+                        help="vigila y además sirve los planos con actualización en vivo (puerto 8000 si no se indica)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="con --servir: dirección donde escuchar (0.0.0.0 para la red de la obra)")
+    args = parser.parse_args(argv)
+
+    if args.sitio:
+        sitios = {n: s for n, s in sitios.items() if n in args.sitio}
+    opciones = {
+        "caches": {n: os.path.join(args.cache, n) for n in sitios},
+        "forzar": args.forzar,
+        "explicar": args.explain,
+        "perfil": args.profile,
+    }
+
+    print(f"Directorio de trabajo actual: {os.getcwd()}")
+    if args.servir is not None:
+        return servir_y_vigilar(sitios, opciones, args)
+    if args.vigilar is not None:
+        return vigilar({n: (s, definir_etapas(s)) for n, s in sitios.items()}, opciones["caches"],
+                       args.vigilar, args.explain, args.al_cambiar)
+
+    inicio = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    t0 = time.perf_counter()
+    procesos = max(1, min(args.procesos, len(sitios)))
+    resultados, compartidas = construir_todas(raiz, sitios, opciones, procesos)
+    total = time.perf_counter() - t0
+
+    print(f"\n⏱️ {'Sitio':<22}{'real':>8}{'etapas':>8}  archivos cambiados")
+    for r in resultados:
+        estado = "ERROR" if r["error"] else len(r["cambios"])
+        print(f"   {r['sitio']:<22}{r['segundos']:>7.2f}s{r['ejecutadas']:>8}  {estado}")
+    print(f"   {'TOTAL':<22}{total:>7.2f}s  ({procesos} proceso(s))")
+
+    os.makedirs(args.cache, exist_ok=True)
+    with open(os.path.join(args.cache, REPORTE), "w", encoding="utf-8") as f:
+        json.dump({"inicio": inicio, "segundos": total, "procesos": procesos, "pico_rss": pico_rss(), "compartidas": compartidas,
+                   "sitios": [dict(r, error=bool(r["error"])) for r in resultados]},
+                  f, indent=1, ensure_ascii=False)
+
+    if any(r["error"] for r in resultados):
+        return 1
+    if args.estado_sin_cambios and not any(r["cambios"] for r in resultados):
+        return SIN_CAMBIOS
+    return 0
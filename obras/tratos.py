@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Tratos: precios por tipo de vivienda (hoja 'TRATOS VIVIENDA') y asignación
+de cuadrillas por casa (planilla de Asignación, pestañas 'CUADRILLAS' y
+'MZ X').
+"""
+from obras.llaves import canon_numero, canon_partida
+from obras.plata import PreciosTratos, parsear_monto, sumar, formatear_plata, leer_totales_planilla, conciliar
+
+# Columna de la hoja 'TRATOS VIVIENDA' con el precio de cada tipo de vivienda
+COLUMNAS_PRECIO_TRATOS = {
+    "Tipo A1": 5, "Tipo A1-N": 5, "Tipo A2": 9,
+    "Tipo B": 13, "Tipo C": 17, "Tipo D": 21
+}
+
+# Lista extendida de títulos para asegurar que no se escape ninguno
+TITULOS_TRATOS = [
+    "OBRA GRUESA",
+    "OBRAS DE TERMINACIÓN",
+    "INSTALACIONES"
+]
+
+# Texto de la fila con el presupuesto total por tipo, para conciliar los precios al peso
+FILA_TOTAL_TRATOS = "TOTAL"
+
+# Filas de las pestañas 'MZ X' que son encabezados y no partidas
+FILAS_NO_TRATO = ["TRATO", "FUNDACIONES", "RADIER", "MUROS 1ER PISO", "TERMINACIONES"]
+
+SIN_ESTADO_TRATO = {"terminada": False, "fecha": "-"}
+
+
+def leer_precios_tratos(datos_tratos, llaves):
+    """
+    Matriz de precios y estructura (título / subtítulo) de la hoja de tratos.
+
+    Devuelve {"precios": PreciosTratos, "estructura": [...], "filas": arreglo
+    de filas de la matriz para cada partida de la estructura, en orden}.
+    """
+    precios_tratos = PreciosTratos() # pesos enteros por (id_trato, tipo de vivienda)
+    estructura_tratos = []
+    titulo_actual = ""
+    subtitulo_actual = ""
+
+    for i, fila in enumerate(datos_tratos):
+        # Empezamos a leer desde la fila 7 (índice 6)
+        if i < 6: continue
+
+        nombre_col = str(fila[1]).strip() if len(fila) > 1 else ""
+        if not nombre_col: continue
+
+        unidad = str(fila[3]).strip() if len(fila) > 3 else ""
+
+        # 1. Prioridad 1: ¿Es un Título Principal?
+        # (Ignoramos la unidad porque "OBRA GRUESA" tiene "A-1" en esa columna)
+        if nombre_col.upper() in TITULOS_TRATOS:
+            titulo_actual = nombre_col.upper()
+            subtitulo_actual = ""
+            continue
+
+        # 2. Prioridad 2: ¿Es un Subtítulo?
+        # (Unidad vacía y texto en mayúsculas suele ser subtítulo como "FUNDACIONES")
+        if unidad == "" and nombre_col.isupper():
+            subtitulo_actual = nombre_col
+            continue
+
+        # 3. Prioridad 3: ¿Es una Partida?
+        # (Si tiene unidad y no es un título de los de arriba, es cobrable)
+        if unidad != "" and unidad not in ["A-1", "A-2", "B", "C", "D"]:
+            id_trato = llaves.trato(nombre_col)
+            precios_tratos.agregar(id_trato, {
+                tipo: parsear_monto(fila[col]) if col < len(fila) else 0
+                for tipo, col in COLUMNAS_PRECIO_TRATOS.items()
+            })
+            estructura_tratos.append({
+                "titulo": titulo_actual,
+                "subtitulo": subtitulo_actual,
+                "id_trato": id_trato
+            })
+
+    # Fila de la matriz de precios para cada partida de la estructura (en orden)
+    filas_estructura_tratos = precios_tratos.filas(item['id_trato'] for item in estructura_tratos)
+
+    # Conciliación al peso: presupuesto por tipo calculado vs fila TOTAL de la planilla
+    totales_planilla = leer_totales_planilla(datos_tratos, COLUMNAS_PRECIO_TRATOS, FILA_TOTAL_TRATOS)
+    if totales_planilla:
+        totales_calculados = {
+            tipo: sumar(precios_tratos.vector(filas_estructura_tratos, tipo)) for tipo in COLUMNAS_PRECIO_TRATOS
+        }
+        for tipo, calculado, planilla, diferencia in conciliar(totales_calculados, totales_planilla):
+            if diferencia == 0:
+                print(f"✅ Tratos {tipo}: {formatear_plata(calculado)} cuadra con la planilla.")
+            else:
+                print(f"⚠️ Tratos {tipo}: calculado {formatear_plata(calculado)} vs planilla {formatear_plata(planilla)} (diferencia {diferencia} pesos)")
+
+    return {"precios": precios_tratos, "estructura": estructura_tratos, "filas": filas_estructura_tratos}
+
+
+def leer_asignacion(datos_cuadrillas, hojas_mz, llaves):
+    """
+    Estado y cuadrilla de cada trato por casa.
+
+    `datos_cuadrillas` es la pestaña 'CUADRILLAS' y `hojas_mz` un dict
+    letra -> grilla de la pestaña 'MZ letra'. Devuelve {"estado": id_casa ->
+    {id_trato: {"terminada", "fecha"}}, "cuadrillas": id_casa -> {id_trato:
+    nombre_cuadrilla}, "info_maestra": NOMBRE -> {"representante", "id"}}.
+    """
+    # CAMBIO: Usamos f[0] (Columna CUADRILLA) en lugar de f[1] (JEFE CUADRILLA)
+    dict_maestro_cuadrillas = {str(f[2]).strip(): str(f[0]).strip() for f in datos_cuadrillas[1:] if len(f) >= 3 and f[2]}
+
+    estado_tratos = {}     # id_casa -> {id_trato: {"terminada", "fecha"}}
+    cuadrillas_tratos = {} # id_casa -> {id_trato: nombre_cuadrilla}
+
+    for letra, datos_mz in hojas_mz.items():
+        try:
+            if len(datos_mz) < 3: continue
+
+            encabezados = datos_mz[2]
+
+            # Normalización de los nombres de partida (una vez por fila, no por casa)
+            filas_partidas = []
+            for fila in datos_mz[3:]:
+                if not fila or not fila[0].strip(): continue
+                partida_nombre = canon_partida(fila[0])
+                if partida_nombre in FILAS_NO_TRATO:
+                    continue
+                filas_partidas.append((llaves.trato(partida_nombre), fila))
+
+            for i in range(1, len(encabezados), 2):
+                casa_num = canon_numero(encabezados[i])
+                if casa_num is None: continue
+                id_casa = llaves.casa(letra, casa_num)
+                estado_casa = estado_tratos.setdefault(id_casa, {})
+                cuadrillas_casa = cuadrillas_tratos.setdefault(id_casa, {})
+
+                for id_trato, fila in filas_partidas:
+                    id_en_celda = str(fila[i]).strip() if i < len(fila) else ""
+                    fecha_en_celda = str(fila[i+1]).strip() if (i+1) < len(fila) and str(fila[i+1]).strip() else "-"
+
+                    if id_en_celda and id_en_celda != "0":
+                        nombre_cuadrilla = dict_maestro_cuadrillas.get(id_en_celda, f"ID: {id_en_celda}")
+                        estado_casa[id_trato] = {"terminada": True, "fecha": fecha_en_celda}
+                        cuadrillas_casa[id_trato] = nombre_cuadrilla
+                    else:
+                        estado_casa[id_trato] = {"terminada": False, "fecha": "-"}
+                        cuadrillas_casa[id_trato] = "-"
+
+        except Exception as e:
+            print(f"Aviso en MZ {letra}: {e}")
+
+    # Datos de cada cuadrilla para el panel lateral
+    dict_info_maestra_cuadrillas = {}
+    for fila in datos_cuadrillas[1:]:
+        if len(fila) >= 3:
+            c_name = str(fila[0]).strip().upper()
+            dict_info_maestra_cuadrillas[c_name] = {
+                "representante": str(fila[1]).strip(),
+                "id": str(fila[2]).strip()
+            }
+
+    return {"estado": estado_tratos, "cuadrillas": cuadrillas_tratos, "info_maestra": dict_info_maestra_cuadrillas}
+
+
+def cuadrillas_por_casa(cuadrillas_tratos):
+    """Cuadrillas (nombre en mayúsculas) que trabajaron en cada casa: id_casa -> set, y el conjunto total."""
+    dict_cuadrillas_por_casa = {}
+    todas_cuadrillas_set = set()
+
+    for id_casa, cuadrillas_casa in cuadrillas_tratos.items():
+        for cuad in cuadrillas_casa.values():
+            if cuad and cuad != "-":
+                c_limpia = str(cuad).strip().upper()
+                if id_casa not in dict_cuadrillas_por_casa:
+                    dict_cuadrillas_por_casa[id_casa] = set()
+                dict_cuadrillas_por_casa[id_casa].add(c_limpia)
+                todas_cuadrillas_set.add(c_limpia)
+
+    return dict_cuadrillas_por_casa, todas_cuadrillas_set
+
+
+def desglose_cuadrilla(c_nombre, cuadrillas_casa, precios_tratos, tipo_v, llaves):
+    """Monto y partidas que una cuadrilla hizo en una casa: (monto, [{"nombre", "precio"}])."""
+    monto = 0
+    desglose_partidas = []
+    for id_trato, cuad_asig in cuadrillas_casa.items():
+        if str(cuad_asig).strip().upper() == c_nombre:
+            if id_trato in precios_tratos:
+                valor_p = precios_tratos.precio(id_trato, tipo_v)
+                monto += valor_p
+                desglose_partidas.append({"nombre": llaves.nombre_trato(id_trato), "precio": valor_p})
+    return monto, desglose_partidas
+
+
+def resumir_cuadrillas(casas, dict_tipos_vivienda, tratos, llaves):
+    """
+    Datos del panel de cuadrillas.
+
+    `casas` recorre (manzana, número, id_casa) en el orden del plano, que es
+    el orden en que se listan las casas de cada cuadrilla. Devuelve
+    {"por_casa": id_casa -> [nombres], "todas": [nombres ordenados], "info":
+    nombre -> {"representante", "id", "total_pagado", "tratos_realizados"}}.
+
+    Cada trato se paga al precio del tipo real de la casa (Tipo A1 solo si la
+    casa no tiene tipo), igual que el recorrido de las casas que publicaban
+    los scripts originales. La búsqueda por ("MZ X", n) que siempre caía en
+    Tipo A1 era de una pasada previa cuyo resultado se descartaba.
+    """
+    dict_cuadrillas_por_casa, todas_cuadrillas_set = cuadrillas_por_casa(tratos["cuadrillas"])
+    todas_cuadrillas = sorted(list(todas_cuadrillas_set))
+    # Lista ordenada: el orden de un set de textos cambia entre procesos (hash aleatorio)
+    dict_cuadrillas_por_casa = {id_casa: sorted(s) for id_casa, s in dict_cuadrillas_por_casa.items()}
+
+    info_cuadrillas_js = {}
+    for c in todas_cuadrillas:
+        info_m = tratos["info_maestra"].get(c, {"representante": "No asignado", "id": "-"})
+        info_cuadrillas_js[c] = {"representante": info_m["representante"], "id": info_m["id"], "total_pagado": 0, "tratos_realizados": []}
+
+    for mz, num, key in casas:
+        tipo_v = dict_tipos_vivienda.get(key, "Tipo A1")
+        cuadrillas_casa = tratos["cuadrillas"].get(key, {})
+
+        for c_nombre in dict_cuadrillas_por_casa.get(key, []):
+            if c_nombre not in info_cuadrillas_js: continue
+            monto_cuadrilla_en_esta_casa, desglose_partidas = desglose_cuadrilla(
+                c_nombre, cuadrillas_casa, tratos["precios"], tipo_v, llaves
+            )
+            if monto_cuadrilla_en_esta_casa > 0:
+                info_cuadrillas_js[c_nombre]["total_pagado"] += monto_cuadrilla_en_esta_casa
+                info_cuadrillas_js[c_nombre]["tratos_realizados"].append({
+                    "casa": f"Mz {mz} - Casa {num}",
+                    "mzn_sort": str(mz).upper().strip(),
+                    "num_sort": int(num),
+                    "monto_total": monto_cuadrilla_en_esta_casa,
+                    "partidas": desglose_partidas
+                })
+
+    return {"por_casa": dict_cuadrillas_por_casa, "todas": todas_cuadrillas, "info": info_cuadrillas_js}
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Modo vigilancia (construir_obras.py --vigilar): un proceso que queda
+corriendo y reconstruye una obra pocos segundos después de que cambia una de
+sus planillas o de sus archivos.
+
+Cada `intervalo` segundos se consulta:
+  - Drive: la fecha de modificación de todas las planillas visibles, con una
+    sola llamada (la misma lista que usa gc.open para abrir por título).
+  - Disco: fecha y tamaño de los archivos de entrada (plano, script del
+    sitio, grabaciones).
+
+Solo se reconstruyen los sitios con alguna entrada cambiada y en el mismo
+proceso, así que los imports, la autenticación y las planillas que no
+cambiaron ya están listos. Las planillas que cambiaron se vuelven a abrir, y
+el caché de etapas decide qué más recalcular.
+
+Un sitio cuyo build falla (Drive caído, una planilla a medio editar) queda
+pendiente y se reintenta en las vueltas siguientes con espera creciente
+(REINTENTO_MINIMO, el doble cada vez, hasta REINTENTO_MAXIMO), o apenas
+cambia alguna de sus entradas.
+"""
+import os
+import subprocess
+import threading
+import time
+import traceback
+
+from obras.etapas import Archivo, Planilla
+from obras.pipeline import Contexto, correr
+
+INTERVALO = 5  # segundos entre consultas por defecto
+REINTENTO_MINIMO = 30   # segundos hasta el primer reintento de un sitio que falló
+REINTENTO_MAXIMO = 600  # tope de la espera entre reintentos
+
+
+def entradas_de(etapas):
+    """Entradas externas de las etapas: clave -> entrada (ruta para archivos, nombre para planillas)."""
+    entradas = {}
+    for etapa in etapas:
+        for entrada in etapa.entradas:
+            entradas.setdefault(entrada.ruta if isinstance(entrada, Archivo) else entrada.nombre, entrada)
+    return entradas
+
+
+def marcas_archivos(rutas):
+    """ruta -> (mtime, tamaño), o None si el archivo no existe."""
+    marcas = {}
+    for ruta in rutas:
+        try:
+            st = os.stat(ruta)
+            marcas[ruta] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            marcas[ruta] = None
+    return marcas
+
+
+def marcas_drive(gc):
+    """'planilla:<título>' -> 'id@modifiedTime' de todas las planillas visibles, en una consulta a Drive."""
+    marcas = {}
+    for archivo in gc.list_spreadsheet_files():
+        # Como gc.open: con títulos repetidos vale la primera planilla
+        marcas.setdefault(Planilla(archivo["name"]).nombre, f"{archivo['id']}@{archivo['modifiedTime']}")
+    return marcas
+
+
+def vigilar(obras, caches, intervalo=INTERVALO, explicar=False, comando=None, detener=None):
+    """
+    Construye todas las `obras` (nombre -> (Sitio, etapas)) y después, cada
+    `intervalo` segundos, las que tengan alguna entrada cambiada, hasta Ctrl+C
+    o hasta que se active `detener` (threading.Event).
+
+    Si `comando` no es None, se ejecuta en la shell cada vez que cambian los
+    archivos publicados de un sitio (con OBRA_SITIO=<nombre> en el entorno),
+    p. ej. para sincronizarlos a donde se sirven.
+    """
+    detener = detener or threading.Event()
+    entradas = {nombre: entradas_de(etapas) for nombre, (_, etapas) in obras.items()}
+    todas = {clave: e for es in entradas.values() for clave, e in es.items()}
+    archivos = [clave for clave, e in todas.items() if isinstance(e, Archivo)]
+    planillas = {clave: e for clave, e in todas.items() if isinstance(e, Planilla)}
+    base = Contexto(next(iter(obras.values()))[0])
+
+    def consultar(anteriores):
+        marcas = marcas_archivos(archivos)
+        if planillas:
+            try:
+                en_drive = marcas_drive(base.gc)
+                marcas.update({clave: en_drive.get(clave) for clave in planillas})
+            except Exception as e:
+                # Sin respuesta de Drive las planillas se dan por iguales y se reintenta en la próxima vuelta
+                print(f"⚠️ No se pudo consultar Drive: {e}")
+                marcas.update({clave: anteriores.get(clave) for clave in planillas})
+        return marcas
+
+    print(f"👀 Vigilando {len(archivos)} archivo(s) y {len(planillas)} planilla(s) cada {intervalo:g}s (Ctrl+C para salir).")
+    marcas = consultar({})
+    pendientes = list(obras)
+    fallidos = {}  # nombre -> (intentos fallidos seguidos, time.monotonic() del próximo reintento)
+    try:
+        while True:
+            for nombre in pendientes:
+                sitio, etapas = obras[nombre]
+                print(f"\n🏗️ ===== {nombre} =====")
+                t0 = time.perf_counter()
+                try:
+                    _, cambios = correr(sitio, caches[nombre], explicar=explicar, contexto=base.para(sitio), etapas=etapas)
+                except Exception:
+                    traceback.print_exc()
+                    intentos = fallidos.get(nombre, (0, 0))[0] + 1
+                    espera = min(REINTENTO_MAXIMO, REINTENTO_MINIMO * 2 ** (intentos - 1))
+                    fallidos[nombre] = (intentos, time.monotonic() + espera)
+                    print(f"❌ {nombre} falló (intento {intentos}): se reintenta en {espera:g}s o cuando cambie una entrada")
+                    continue
+                fallidos.pop(nombre, None)
+                print(f"✅ {nombre} actualizado en {time.perf_counter() - t0:.1f}s")
+                if cambios and comando:
+                    subprocess.run(comando, shell=True, env=dict(os.environ, OBRA_SITIO=nombre))
+
+            if detener.wait(intervalo):
+                return 0
+            nuevas = consultar(marcas)
+            cambiadas = {clave for clave in todas if nuevas.get(clave) != marcas.get(clave)}
+            marcas = nuevas
+            ahora = time.monotonic()
+            pendientes = [nombre for nombre in obras
+                          if cambiadas & entradas[nombre].keys() or (nombre in fallidos and fallidos[nombre][1] <= ahora)]
+            if cambiadas:
+                base.olvidar(planillas[clave].titulo for clave in cambiadas if clave in planillas)
+                print(f"\n🔔 {time.strftime('%H:%M:%S')} cambió: {', '.join(sorted(todas[c].nombre for c in cambiadas))}")
+    except KeyboardInterrupt:
+        print("\n👋 Vigilancia detenida.")
+        return 0